@@ -12,16 +12,23 @@ socketio = SocketIO()
 
 def create_app(config_class=Config):
     app = Flask(__name__)
-    app.config.from_object(config_class)
+    app.config.from_mapping(config_class().settings)
 
+    from app.utils.socket_queue import socketio_options
+    
     # Initialize extensions
     db.init_app(app)
     mail.init_app(app)
     CORS(app)
-    socketio.init_app(app, cors_allowed_origins="*")
+    socketio.init_app(app, cors_allowed_origins="*", **socketio_options(app.config))
 
     # Register blueprints
     from app.routes import register_routes
     register_routes(app)
 
+    # Full-text ride location search, where the database supports it
+    from app.utils.location_index import ensure_location_index
+    with app.app_context():
+        ensure_location_index()
+
     return app 
\ No newline at end of file
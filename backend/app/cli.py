@@ -0,0 +1,183 @@
+import os
+import random
+import tempfile
+import threading
+import time
+import click
+from flask import Flask, current_app
+from flask.cli import with_appcontext
+from app.models import db, User, Chat, Message
+from app.services.chat_service import send_message
+from app.services.message_writer import set_message_writer, MessageWriter
+from app.utils.observer_pattern import NotificationSubject, Observer
+from app.utils.socket_queue import LocalPubSubBroker
+
+@click.command('bench-messages')
+@click.option('--messages', default=5000, type=int, help='Messages sent per mode')
+@click.option('--senders', default=8, type=int, help='Concurrent sending threads')
+@click.option('--chats', default=20, type=int, help='Chats the messages are spread over')
+@click.option('--id-block-size', default=None, type=int, help='Message IDs reserved per round trip (default MESSAGE_ID_BLOCK_SIZE)')
+@with_appcontext
+def bench_messages_command(messages, senders, chats, id_block_size):
+    """Compare chat messages per second with synchronous and write-behind persistence on a scratch database"""
+    settings = dict(current_app.config)
+    if id_block_size is None:
+        id_block_size = settings.get('MESSAGE_ID_BLOCK_SIZE', 1000)
+
+    with tempfile.TemporaryDirectory() as directory:
+        bench_app = Flask(__name__)
+        bench_app.config.from_mapping(settings)
+        bench_app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(directory, 'bench.sqlite')
+        db.init_app(bench_app)
+
+        with bench_app.app_context():
+            db.create_all()
+            sender = User(name="Bench User", email="bench@ride2gather.com", phone="0000000000", password="-")
+            db.session.add(sender)
+            db.session.add_all([Chat() for _ in range(chats)])
+            db.session.commit()
+            user_id = sender.user_id
+            chat_ids = [chat_id for (chat_id,) in db.session.query(Chat.chat_id)]
+
+        def run(label, writer):
+            previous = set_message_writer(writer)
+            latencies = []
+            errors = []
+            lock = threading.Lock()
+            barrier = threading.Barrier(senders + 1)
+
+            def send(count):
+                with bench_app.app_context():
+                    barrier.wait()
+                    for index in range(count):
+                        start = time.perf_counter()
+                        _, error = send_message(random.choice(chat_ids), user_id, f"Benchmark message {index}")
+                        elapsed = time.perf_counter() - start
+                        with lock:
+                            latencies.append(elapsed)
+                            if error:
+                                errors.append(error)
+                    db.session.remove()
+
+            threads = [
+                threading.Thread(target=send, args=(messages // senders + (1 if index < messages % senders else 0),))
+                for index in range(senders)
+            ]
+            for thread in threads:
+                thread.start()
+            barrier.wait()
+            start = time.perf_counter()
+            for thread in threads:
+                thread.join()
+            acknowledged_seconds = time.perf_counter() - start
+            if writer is not None:
+                writer.flush()
+            written_seconds = time.perf_counter() - start
+            set_message_writer(previous)
+
+            latencies.sort()
+            p50 = latencies[len(latencies) // 2] * 1000
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+            click.echo(
+                f"{label}: {messages / acknowledged_seconds:.0f} msg/s acknowledged, "
+                f"{messages / written_seconds:.0f} msg/s written, "
+                f"p50 {p50:.2f} ms, p99 {p99:.2f} ms, {len(errors)} error(s)"
+            )
+
+        run("Synchronous", None)
+
+        writer = MessageWriter(
+            bench_app,
+            batch_size=bench_app.config.get('MESSAGE_WRITE_BATCH_SIZE', 200),
+            flush_interval=bench_app.config.get('MESSAGE_WRITE_FLUSH_INTERVAL', 0.05),
+            max_queue_size=bench_app.config.get('MESSAGE_WRITE_QUEUE_SIZE', 10000),
+            id_block_size=id_block_size
+        )
+        writer.start()
+        run(f"Write-behind (ID block size {id_block_size})", writer)
+        writer.stop()
+
+        with bench_app.app_context():
+            click.echo(f"Messages stored: {Message.query.count()} of {2 * messages}")
+            db.engine.dispose()
+
+@click.command('socketio-broker')
+@click.option('--host', default='127.0.0.1', help='Interface to listen on')
+@click.option('--port', default=6380, type=int, help='Port to listen on')
+def socketio_broker_command(host, port):
+    """Run the local Socket.IO message broker used with SOCKETIO_MESSAGE_QUEUE=local://host:port"""
+    broker = LocalPubSubBroker(host, port)
+    click.echo(f"Socket.IO broker listening on {host}:{port}")
+    try:
+        broker.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        broker.server_close()
+
+@click.command('bench-notifications')
+@click.option('--users', default=100000, type=int, help='Users registered on the subject')
+@click.option('--notifications', default=10000, type=int, help='Notifications sent')
+def bench_notifications_command(users, notifications):
+    """Measure notification dispatch with many registered users (no database access)"""
+    class CountingObserver(Observer):
+        def __init__(self, user_id):
+            self.user_id = user_id
+            self.topic = user_id
+            self.received = 0
+
+        def update(self, data):
+            if data.get('user_id') == self.user_id:
+                self.received += 1
+
+    targets = [random.randrange(users) for _ in range(notifications)]
+
+    subject = NotificationSubject(max_topics=users)
+    observers = [CountingObserver(user_id) for user_id in range(users)]
+    start = time.perf_counter()
+    for observer in observers:
+        subject.attach(observer)
+    attach_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for user_id in targets:
+        subject.notify({'user_id': user_id})
+    keyed_seconds = time.perf_counter() - start
+    delivered = sum(observer.received for observer in observers)
+
+    # The previous subject called every observer for every notification
+    baseline_count = min(notifications, 100)
+    start = time.perf_counter()
+    for user_id in targets[:baseline_count]:
+        data = {'user_id': user_id}
+        for observer in observers:
+            observer.update(data)
+    linear_seconds = (time.perf_counter() - start) / baseline_count * notifications
+
+    click.echo(f"Attached {users} users in {attach_seconds:.3f}s")
+    click.echo(
+        f"Keyed dispatch: {notifications} notifications in {keyed_seconds:.4f}s "
+        f"({keyed_seconds / notifications * 1e6:.2f} us each), {delivered} delivered"
+    )
+    click.echo(
+        f"Linear broadcast (extrapolated from {baseline_count}): {linear_seconds:.2f}s "
+        f"({linear_seconds / notifications * 1e6:.0f} us each)"
+    )
+    click.echo(f"Subject metrics: {subject.metrics()}")
+
+# Operational commands that don't belong to the serving application
+COMMANDS = [
+    bench_messages_command,
+    socketio_broker_command,
+    bench_notifications_command,
+]
+
+def register_commands(app):
+    """
+    Add the operational commands to the flask CLI of an application
+
+    Args:
+        app (Flask): The application
+    """
+    for command in COMMANDS:
+        app.cli.add_command(command)
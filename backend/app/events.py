@@ -1,5 +1,35 @@
 from flask_socketio import emit, join_room, leave_room
+from flask import session
 from app import socketio
+from app.utils.room_events import room_event_log, user_room
+from app.utils.jwt_handler import decode_token
+from app.utils.principal_cache import resolve_principal
+from app.utils.ride_rooms import GLOBAL_RIDES_ROOM, rooms_from_buckets
+
+def _replay_missed_events(room, data):
+    """
+    Send a rejoining client the room events it missed
+    
+    Clients pass the last seq (and epoch) they received as since_seq. If the
+    missed events are no longer buffered, the client gets a resync event and
+    should refetch over REST. Replayed events may overlap with live ones, so
+    clients ignore any seq they have already seen.
+    """
+    since_seq = data.get('since_seq') if isinstance(data, dict) else None
+    if not isinstance(since_seq, int):
+        return
+    
+    events = room_event_log.since(room, since_seq, data.get('epoch'))
+    if events is None:
+        emit('resync', {
+            'room': room,
+            'seq': room_event_log.current_seq(room),
+            'epoch': room_event_log.epoch
+        })
+        return
+    
+    for seq, event, payload in events:
+        emit(event, payload)
 
 @socketio.on('connect')
 def handle_connect():
@@ -8,12 +38,23 @@ def handle_connect():
 
 @socketio.on('join')
 def handle_join(data):
-    """Handle client joining a chat room"""
+    """
+    Handle client joining a chat room
+    
+    The confirmation only goes to the joining client: broadcast to the room
+    it would be numbered and buffered like a message, pushing messages out of
+    the replay buffer and into other clients' replays.
+    """
     chat_id = data.get('chat_id')
     if chat_id:
         room = f'chat_{chat_id}'
         join_room(room)
-        emit('joined', {'chat_id': chat_id}, room=room)
+        _replay_missed_events(room, data)
+        emit('joined', {
+            'chat_id': chat_id,
+            'seq': room_event_log.current_seq(room),
+            'epoch': room_event_log.epoch
+        })
 
 @socketio.on('leave')
 def handle_leave(data):
@@ -22,7 +63,61 @@ def handle_leave(data):
     if chat_id:
         room = f'chat_{chat_id}'
         leave_room(room)
-        emit('left', {'chat_id': chat_id}, room=room)
+        emit('left', {'chat_id': chat_id})
+
+@socketio.on('join_user')
+def handle_join_user(data):
+    """
+    Handle client joining its private user room for notification pushes
+    
+    The client proves who it is with its JWT; the room is named from the
+    token's subject, never from client input. The user is resolved like in
+    token_required, so tokens of deleted users are refused. since_seq and
+    epoch replay missed pushes as for the other rooms.
+    """
+    token = data.get('token') if isinstance(data, dict) else None
+    if not token:
+        emit('joined_user', {'status': 'error', 'message': 'Token is missing'})
+        return
+    
+    payload, error = decode_token(token)
+    if error:
+        emit('joined_user', {'status': 'error', 'message': error})
+        return
+    
+    try:
+        user_id = int(payload['sub'])
+    except (KeyError, ValueError, TypeError):
+        emit('joined_user', {'status': 'error', 'message': 'Invalid token: missing user ID'})
+        return
+    
+    if resolve_principal(user_id, payload) is None:
+        emit('joined_user', {'status': 'error', 'message': 'User not found'})
+        return
+    
+    # A socket follows one user; switching accounts leaves the previous room
+    previous_user_id = session.get('user_id')
+    if previous_user_id is not None and previous_user_id != user_id:
+        leave_room(user_room(previous_user_id))
+    session['user_id'] = user_id
+    
+    room = user_room(user_id)
+    join_room(room)
+    _replay_missed_events(room, data)
+    emit('joined_user', {
+        'status': 'success',
+        'userID': user_id,
+        'seq': room_event_log.current_seq(room),
+        'epoch': room_event_log.epoch
+    })
+
+@socketio.on('leave_user')
+def handle_leave_user():
+    """Handle client leaving its user room, e.g. on logout"""
+    user_id = session.pop('user_id', None)
+    if user_id is not None:
+        leave_room(user_room(user_id))
+    emit('left_user', {'status': 'success'})
 
 @socketio.on('disconnect')
 def handle_disconnect():
@@ -30,14 +125,66 @@ def handle_disconnect():
     pass  # Add any cleanup if needed
 
 # New event handler for ride updates
+def _requested_ride_rooms(data):
+    """
+    Get the ride rooms a join_rides or leave_rides payload refers to
+    
+    Without buckets this is the global rides room, as before buckets existed.
+    
+    Raises:
+        ValueError: If the buckets are invalid
+    """
+    buckets = data.get('buckets') if isinstance(data, dict) else None
+    if buckets is None:
+        return [GLOBAL_RIDES_ROOM]
+    return rooms_from_buckets(buckets)
+
 @socketio.on('join_rides')
-def handle_join_rides():
-    """Handle client joining the rides room"""
-    join_room('rides')
-    emit('joined_rides', {'status': 'success'})
+def handle_join_rides(data=None):
+    """
+    Handle client joining ride rooms, replaying the events it missed
+    
+    Clients may pass buckets, a list of {startingLocation, date} objects
+    (date is optional, YYYY-MM-DD), to only get the rides leaving from those
+    places. Without buckets the client joins the global rides room. A client
+    in several ride rooms gets a ride once per room and dedupes by rideID.
+    
+    For replay, clients pass the epoch and either since, mapping room names to
+    the last seq received there, or since_seq for the global room.
+    """
+    data = data if isinstance(data, dict) else {}
+    try:
+        rooms = _requested_ride_rooms(data)
+    except ValueError as e:
+        emit('joined_rides', {'status': 'error', 'message': str(e)})
+        return
+    
+    since = data.get('since') if isinstance(data.get('since'), dict) else {}
+    for room in rooms:
+        join_room(room)
+        since_seq = since.get(room)
+        if since_seq is None and room == GLOBAL_RIDES_ROOM:
+            since_seq = data.get('since_seq')
+        _replay_missed_events(room, {'since_seq': since_seq, 'epoch': data.get('epoch')})
+    
+    seqs = {room: room_event_log.current_seq(room) for room in rooms}
+    emit('joined_rides', {
+        'status': 'success',
+        'rooms': rooms,
+        'seqs': seqs,
+        'seq': seqs.get(GLOBAL_RIDES_ROOM, 0),
+        'epoch': room_event_log.epoch
+    })
 
 @socketio.on('leave_rides')
-def handle_leave_rides():
-    """Handle client leaving the rides room"""
-    leave_room('rides')
-    emit('left_rides', {'status': 'success'}) 
\ No newline at end of file
+def handle_leave_rides(data=None):
+    """Handle client leaving the given ride buckets, or the global rides room"""
+    try:
+        rooms = _requested_ride_rooms(data)
+    except ValueError as e:
+        emit('left_rides', {'status': 'error', 'message': str(e)})
+        return
+    
+    for room in rooms:
+        leave_room(room)
+    emit('left_rides', {'status': 'success', 'rooms': rooms})
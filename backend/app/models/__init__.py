@@ -3,8 +3,10 @@ from flask_sqlalchemy import SQLAlchemy
 db = SQLAlchemy()
 
 from .user import User, UserRole, Admin, Donor, Passenger, Driver
-from .notification import Notification
+from .notification import Notification, UnreadNotificationCount, NotificationArchive
 from .ride import Ride, PassengerRide
 from .donation import Donation
 from .feedback import Feedback
-from .message import Message, Chat
+from .message import Message, Chat, ChatSummary, MessageDeadLetter
+from .sequence import IdSequence
+from .periodic_job import PeriodicJobRun
@@ -1,6 +1,6 @@
 from . import db
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 
 class Donation(db.Model):
@@ -14,5 +14,11 @@ class Donation(db.Model):
     description = Column(String(255))
     payment_method = Column(String(50), default='stripe')
     
+    # Backs donation histories of donors and recipients ordered by date
+    __table_args__ = (
+        Index('ix_donation_donor_id_date', 'donor_id', 'date'),
+        Index('ix_donation_user_id_date', 'user_id', 'date'),
+    )
+    
     # Relationship with User is defined in User model
     # Relationship with Donor is defined in Donor model 
\ No newline at end of file
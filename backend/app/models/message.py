@@ -1,6 +1,6 @@
 from . import db
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 
 class Chat(db.Model):
@@ -11,6 +11,10 @@ class Chat(db.Model):
     
     # Relationships
     messages = relationship("Message", backref="chat")
+    
+    __table_args__ = (
+        Index('ix_chat_ride_id', 'ride_id'),
+    )
 
 class Message(db.Model):
     __tablename__ = 'message'
@@ -21,4 +25,42 @@ class Message(db.Model):
     content = Column(Text, nullable=False)
     send_time = Column(DateTime, default=datetime.utcnow)
     
-    # Relationships are defined in User and Chat models 
\ No newline at end of file
+    # Backs chat history windows ordered and paged by (send_time, message_id);
+    # SQLite appends the message_id rowid to the index
+    __table_args__ = (
+        Index('ix_message_chat_id_send_time', 'chat_id', 'send_time'),
+    )
+    
+    # Relationships are defined in User and Chat models
+
+class ChatSummary(db.Model):
+    __tablename__ = 'chat_summary'
+    
+    # One row per chat, kept up to date by chat_service.send_message so the
+    # inbox never has to scan the message table
+    chat_id = Column(Integer, ForeignKey('chat.chat_id'), primary_key=True)
+    ride_id = Column(Integer, ForeignKey('ride.ride_id'))
+    last_message_id = Column(Integer, ForeignKey('message.message_id'))
+    last_send_time = Column(DateTime)
+    message_count = Column(Integer, default=0, nullable=False)
+    
+    # Backs the inbox: a user's rides ordered by recent activity
+    __table_args__ = (
+        Index('ix_chat_summary_ride_id_last_send_time', 'ride_id', 'last_send_time'),
+    )
+
+class MessageDeadLetter(db.Model):
+    __tablename__ = 'message_dead_letter'
+    
+    # Messages the write-behind writer could not insert. They were already
+    # acknowledged and emitted, so they are kept here for inspection and
+    # replay instead of being dropped. No foreign keys, since a missing chat
+    # or user can be why the insert failed.
+    dead_letter_id = Column(Integer, primary_key=True)
+    message_id = Column(Integer, nullable=False)
+    chat_id = Column(Integer)
+    user_id = Column(Integer)
+    content = Column(Text)
+    send_time = Column(DateTime)
+    error = Column(Text)
+    failed_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,163 @@
+import logging
+from sqlalchemy import inspect, text
+from . import db
+
+logger = logging.getLogger(__name__)
+
+# Indexes dropped from the models, removed from existing databases by table
+OBSOLETE_INDEXES = {
+    # The ride board filters on status != 'completed', which a status-leading index can't seek
+    'ride': ['ix_ride_status_request_time_available_seats'],
+    # Message IDs interleave between processes, so history is paged by send time
+    'message': ['ix_message_chat_id_message_id'],
+}
+
+def _column_ddl(column, dialect):
+    """Build the column definition used by ALTER TABLE ... ADD COLUMN"""
+    ddl = f"{column.name} {column.type.compile(dialect=dialect)}"
+
+    # Only scalar defaults can be expressed in DDL; others are filled in by the caller
+    default = column.default
+    if default is not None and default.is_scalar:
+        value = default.arg
+        if isinstance(value, bool):
+            value = int(value)
+        if isinstance(value, str):
+            value = "'" + value.replace("'", "''") + "'"
+        ddl += f" DEFAULT {value}"
+
+    return ddl
+
+def add_missing_columns():
+    """
+    Add model columns that are missing from existing tables
+
+    db.create_all() only creates missing tables, so columns added to a model
+    after its table was created have to be added here.
+
+    Returns:
+        list: Names of the added columns as 'table.column'
+    """
+    engine = db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+
+    with engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+
+                ddl = _column_ddl(column, engine.dialect)
+                connection.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN {ddl}'))
+                added.append(f"{table.name}.{column.name}")
+                logger.info(f"Added column {table.name}.{column.name}")
+
+    return added
+
+def create_missing_indexes():
+    """
+    Create model indexes that are missing from existing tables
+
+    Returns:
+        list: Names of the created indexes
+    """
+    engine = db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+
+            index.create(bind=engine, checkfirst=True)
+            created.append(index.name)
+            logger.info(f"Created index {index.name} on {table.name}")
+
+    return created
+
+def drop_obsolete_indexes():
+    """
+    Drop indexes that were removed from the models
+
+    Returns:
+        list: Names of the dropped indexes
+    """
+    engine = db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    dropped = []
+
+    with engine.begin() as connection:
+        for table_name, index_names in OBSOLETE_INDEXES.items():
+            if table_name not in existing_tables:
+                continue
+
+            existing_indexes = {index['name'] for index in inspector.get_indexes(table_name)}
+            for index_name in index_names:
+                if index_name not in existing_indexes:
+                    continue
+
+                connection.execute(text(f'DROP INDEX "{index_name}"'))
+                dropped.append(index_name)
+                logger.info(f"Dropped index {index_name} on {table_name}")
+
+    return dropped
+
+def close_duplicate_notification_groups():
+    """
+    Leave one unread notification per user and group key open
+
+    Databases written before uq_notification_user_id_open_group_key existed
+    can hold several, which would keep the index from being created. The
+    newest stays open; the others lose their group key and are no longer
+    merged into, which doesn't change the unread count.
+
+    Returns:
+        int: Number of notifications closed
+    """
+    engine = db.engine
+    inspector = inspect(engine)
+    if not inspector.has_table('notification'):
+        return 0
+    existing_indexes = {index['name'] for index in inspector.get_indexes('notification')}
+    if 'uq_notification_user_id_open_group_key' in existing_indexes:
+        return 0
+
+    with engine.begin() as connection:
+        result = connection.execute(text(
+            'UPDATE notification SET group_key = NULL '
+            'WHERE NOT read AND group_key IS NOT NULL AND notification_id NOT IN ('
+            'SELECT MAX(notification_id) FROM notification '
+            'WHERE NOT read AND group_key IS NOT NULL GROUP BY user_id, group_key)'
+        ))
+
+    if result.rowcount:
+        logger.info(f"Closed {result.rowcount} duplicate open notification groups")
+    return result.rowcount
+
+def upgrade_schema():
+    """
+    Bring an existing database up to date with the models
+
+    Returns:
+        dict: Added columns, created indexes and dropped indexes
+    """
+    columns = add_missing_columns()
+    close_duplicate_notification_groups()
+    return {
+        "columns": columns,
+        "indexes": create_missing_indexes(),
+        "dropped_indexes": drop_obsolete_indexes()
+    }
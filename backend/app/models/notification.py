@@ -1,6 +1,6 @@
 from . import db
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Index, and_
 from sqlalchemy.orm import relationship
 
 class Notification(db.Model):
@@ -12,4 +12,53 @@ class Notification(db.Model):
     read = Column(Boolean, default=False)
     time = Column(DateTime, default=datetime.utcnow)
     
-    # Relationship with User is defined in User model 
\ No newline at end of file
+    # Notifications of the same kind about the same ride share a group key;
+    # while unread, later ones are merged into the row and counted here
+    group_key = Column(String(64), nullable=True)
+    group_count = Column(Integer, default=1)
+    
+    # Backs per-user listings, unread filters and ordering by time, the
+    # retention purge, which scans by read state and age, and finding the
+    # open group a new notification is merged into. A user has at most one
+    # unread row per group key, so concurrent workers cannot both open a group.
+    __table_args__ = (
+        Index('ix_notification_user_id_read_time', 'user_id', 'read', 'time'),
+        Index('ix_notification_read_time', 'read', 'time'),
+        Index(
+            'uq_notification_user_id_open_group_key', 'user_id', 'group_key',
+            unique=True,
+            sqlite_where=and_(read == False, group_key.isnot(None)),
+            postgresql_where=and_(read == False, group_key.isnot(None))
+        ),
+    )
+    
+    # Relationship with User is defined in User model
+
+class UnreadNotificationCount(db.Model):
+    __tablename__ = 'unread_notification_count'
+    
+    # One row per user, kept up to date by notification_service so the unread
+    # badge never has to count the notification table
+    user_id = Column(Integer, ForeignKey('user.user_id'), primary_key=True)
+    unread_count = Column(Integer, default=0, nullable=False)
+
+class NotificationArchive(db.Model):
+    __tablename__ = 'notification_archive'
+    
+    # Notifications moved out of the notification table by the retention
+    # purge, keyed by the month they were sent in. It has its own key because
+    # SQLite can hand out a purged notification's ID again.
+    archive_id = Column(Integer, primary_key=True)
+    notification_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    message = Column(String(255), nullable=False)
+    read = Column(Boolean, default=False)
+    time = Column(DateTime)
+    archive_month = Column(String(7), nullable=False)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Backs lookups of a user's archive by month and purging old months
+    __table_args__ = (
+        Index('ix_notification_archive_user_id_archive_month', 'user_id', 'archive_month'),
+        Index('ix_notification_archive_archive_month', 'archive_month'),
+    )
@@ -0,0 +1,10 @@
+from . import db
+from sqlalchemy import Column, String, DateTime
+
+class PeriodicJobRun(db.Model):
+    __tablename__ = 'periodic_job_run'
+    
+    # Last start of each periodic job in any process; a process claims a run
+    # by moving it forward, so one process runs the job per interval
+    name = Column(String(50), primary_key=True)
+    last_run_at = Column(DateTime, nullable=False)
@@ -1,8 +1,12 @@
 from . import db
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, PrimaryKeyConstraint
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, PrimaryKeyConstraint, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
+def _initial_available_seats(context):
+    """All seats of a new ride are available"""
+    return context.get_current_parameters().get('passenger_count') or 0
+
 class Ride(db.Model):
     __tablename__ = 'ride'
     
@@ -14,11 +18,22 @@ class Ride(db.Model):
     status = Column(String(20), default="pending")  # pending, active, completed, cancelled
     passenger_count = Column(Integer, default=0)
     
+    # Seat counters maintained by the ride service whenever a passenger is approved
+    # or leaves the approved state; rebuilt by ride_service.reconcile_seat_counters
+    approved_count = Column(Integer, default=0)
+    available_seats = Column(Integer, default=_initial_available_seats)
+    
     # Relationships
     driver = relationship("Driver", foreign_keys=[driver_id])
     passenger_rides = relationship("PassengerRide", backref="ride")
     feedback = relationship("Feedback", backref="ride")
     chats = relationship("Chat", backref="ride")
+    
+    # Indexes backing the ride board search and its keyset pagination
+    __table_args__ = (
+        Index('ix_ride_request_time_ride_id', 'request_time', 'ride_id'),
+        Index('ix_ride_driver_id', 'driver_id'),
+    )
 
 class PassengerRide(db.Model):
     __tablename__ = 'passenger_ride'
@@ -27,7 +42,9 @@ class PassengerRide(db.Model):
     ride_id = Column(Integer, ForeignKey('ride.ride_id'), nullable=False)
     status = Column(String(20), default="pending")  # pending, accepted, rejected, completed
     
-    # Create a composite primary key
+    # Create a composite primary key and the lookup indexes per ride and per passenger
     __table_args__ = (
         PrimaryKeyConstraint('user_id', 'ride_id'),
+        Index('ix_passenger_ride_ride_id_status', 'ride_id', 'status'),
+        Index('ix_passenger_ride_user_id_status', 'user_id', 'status'),
     ) 
\ No newline at end of file
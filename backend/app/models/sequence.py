@@ -0,0 +1,10 @@
+from . import db
+from sqlalchemy import Column, Integer, String
+
+class IdSequence(db.Model):
+    __tablename__ = 'id_sequence'
+    
+    # Next unreserved ID per sequence; processes reserve blocks of IDs from it
+    # so they can assign primary keys before the row is written
+    name = Column(String(50), primary_key=True)
+    next_value = Column(Integer, nullable=False)
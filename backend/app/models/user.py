@@ -1,6 +1,6 @@
 from . import db
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -13,6 +13,10 @@ class User(db.Model):
     phone = Column(String(20))
     password = Column(String(255), nullable=False)
     
+    # Last change to the user's profile, roles or driver status (UTC); tokens
+    # issued before it are authorized from the database, not their claims
+    principal_changed_at = Column(DateTime)
+    
     # Relationships
     roles = relationship("UserRole", backref="user")
     notifications = relationship("Notification", backref="user")
@@ -30,6 +34,10 @@ class UserRole(db.Model):
     role_id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('user.user_id'))
     role_name = Column(String(50), nullable=False)
+    
+    __table_args__ = (
+        Index('ix_user_role_user_id_role_name', 'user_id', 'role_name'),
+    )
 
     def __init__(self, role_name):
         self.role_name = role_name
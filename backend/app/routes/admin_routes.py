@@ -1,5 +1,7 @@
 from flask import Blueprint, jsonify, request
 from app.services import admin_service
+from app.services.notification_dispatcher import get_notification_dispatcher
+from app.utils.principal_cache import get_principal_cache
 
 # Create a blueprint for admin routes
 admin_bp = Blueprint('admin', __name__)
@@ -119,4 +121,18 @@ def get_user_by_id(user_id):
         # Error encountered but continue with available data
         pass
     
-    return jsonify({"user": user_data}), 200 
\ No newline at end of file
+    return jsonify({"user": user_data}), 200 
+
+@admin_bp.route('/notification-queue', methods=['GET'])
+def get_notification_queue_metrics():
+    """Get the depth, lag and delivery counts of the background notification queue"""
+    dispatcher = get_notification_dispatcher()
+    if not dispatcher:
+        return jsonify({"enabled": False}), 200
+    
+    return jsonify(dict(dispatcher.metrics(), enabled=True)), 200
+
+@admin_bp.route('/principal-cache', methods=['GET'])
+def get_principal_cache_metrics():
+    """Get the size and hit counts of the authenticated user cache"""
+    return jsonify(get_principal_cache().metrics()), 200
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from app.services import auth_service
 import datetime
 from app.utils.jwt_handler import token_required
+from app.utils.principal_cache import invalidate_principal
 import jwt
 from flask import current_app
 from datetime import datetime, timedelta
@@ -570,6 +571,9 @@ def update_donor_profile():
     try:
         db.session.commit()
         
+        # The cached principal still has the old name
+        invalidate_principal(user_id)
+        
         # Return updated user data
         return jsonify({
             "id": user.user_id,
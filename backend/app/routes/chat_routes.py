@@ -20,8 +20,30 @@ def get_chat_by_ride(ride_id):
 @chat_bp.route('/<int:chat_id>/messages', methods=['GET'])
 @token_required
 def get_messages(chat_id):
-    """Get all messages for a chat"""
-    messages_data, error = chat_service.get_messages(chat_id)
+    """
+    Get messages for a chat
+    
+    Query parameters:
+    - before: Return messages older than this message ID
+    - after: Return messages newer than this message ID
+    - limit: Number of messages (default: 50, max: 200)
+    
+    Without before or after the most recent messages are returned.
+    """
+    try:
+        before = int(request.args['before']) if request.args.get('before') else None
+        after = int(request.args['after']) if request.args.get('after') else None
+        limit = int(request.args.get('limit', chat_service.DEFAULT_MESSAGE_WINDOW))
+    except ValueError:
+        return jsonify({'error': 'Invalid pagination parameters'}), 400
+    
+    if before is not None and after is not None:
+        return jsonify({'error': 'Use either before or after, not both'}), 400
+    
+    if limit < 1:
+        return jsonify({'error': 'Limit must be a positive integer'}), 400
+    
+    messages_data, error = chat_service.get_messages(chat_id, before=before, after=after, limit=limit)
     
     if error:
         return jsonify({'error': error}), 404
@@ -64,6 +86,9 @@ def send_message(chat_id):
         content=data['content']
     )
     
+    if error == chat_service.MESSAGE_QUEUE_FULL_ERROR:
+        return jsonify({'error': error}), 503
+    
     if error:
         return jsonify({'error': error}), 400
     
@@ -72,8 +97,25 @@ def send_message(chat_id):
 @chat_bp.route('/user/<int:user_id>/chats', methods=['GET'])
 @token_required
 def get_user_chats(user_id):
-    """Get all chats for a user (rides where user is driver or passenger)"""
-    chats_data, error = chat_service.get_user_chats(user_id)
+    """
+    Get the chats of a user's rides, most recently active first
+    
+    Query parameters:
+    - page: Page number (default: 1)
+    - size: Page size (default: 20)
+    
+    Further pages are requested with pagination.nextPage until it is null.
+    """
+    try:
+        page = int(request.args.get('page', 1))
+        size = int(request.args.get('size', 20))
+    except ValueError:
+        return jsonify({'error': 'Invalid pagination parameters'}), 400
+    
+    if page < 1 or size < 1:
+        return jsonify({'error': 'Page and size must be positive integers'}), 400
+    
+    chats_data, error = chat_service.get_user_chats(user_id, page=page, size=size)
     
     if error:
         return jsonify({'error': error}), 404
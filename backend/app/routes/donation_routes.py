@@ -54,16 +54,13 @@ def create_donation():
         if error:
             return jsonify({"error": error}), 400
         
-        # Get recipient and donor info for notification
-        recipient = User.query.get(data['userId'])
-        donor = User.query.get(data['donorId'])
-        
-        if recipient and donor:
-            # Create notification for the recipient
-            notification_service.create_notification(
-                user_id=data['userId'],
-                message=f"You received a donation of RM {amount:.2f} from {donor.name} via {payment_method.capitalize()}."
-            )
+        # Create notification for the recipient; the dispatcher looks up the donor's name
+        notification_service.notify_donation_received(
+            recipient_id=data['userId'],
+            donor_id=data['donorId'],
+            amount=amount,
+            payment_method=payment_method
+        )
         
         return jsonify(donation_data), 201
     except Exception as e:
@@ -33,6 +33,14 @@ def get_user_notifications():
     
     return jsonify(notifications_data), 200
 
+@notification_bp.route('/unread-count', methods=['GET'])
+@token_required
+def get_unread_count():
+    """Get the unread notification count of the authenticated user"""
+    user_id = request.user.user_id
+    
+    return jsonify({"unreadCount": notification_service.get_unread_count(user_id)}), 200
+
 @notification_bp.route('/read-all', methods=['PUT'])
 @token_required
 def mark_all_notifications_read():
@@ -1,16 +1,25 @@
 from flask import Blueprint, request, jsonify
 from app.services import ride_service, notification_service, chat_service
 from app.utils.jwt_handler import token_required, role_required
-from app.models import User, db, Ride, Driver, PassengerRide, Passenger
+from app.models import User, db, Ride, Driver, PassengerRide
 from datetime import datetime
 import logging
-from app.utils.filter_strategies import get_filter_context_instance, FILTER_STRATEGY_MAP
+from app.utils.filter_strategies import build_filter_context, FILTER_STRATEGY_MAP
 
 ride_bp = Blueprint('rides', __name__)
 
 @ride_bp.route('', methods=['GET'])
 def get_rides():
-    """Get all rides with pagination and filtering (excluding completed rides)"""
+    """
+    Get all rides with pagination and filtering (excluding completed rides)
+    
+    Passing a cursor parameter (empty for the first page) switches to keyset
+    pagination: the response carries pagination.nextCursor instead of page
+    numbers, and the total is only counted when include_total=true.
+    
+    search_mode=fulltext matches location tokens through the location index
+    and, in page mode, orders rides by match relevance.
+    """
     # Get pagination parameters
     try:
         page = int(request.args.get('page', 1))
@@ -27,6 +36,29 @@ def get_rides():
     dropoff_location = request.args.get('dropoff_location', None)
     request_time = request.args.get('request_time', None)
     seats = request.args.get('seats', None)
+    search_mode = request.args.get('search_mode', None)
+    
+    if search_mode not in [None, 'substring', 'fulltext']:
+        return jsonify({"error": "search_mode must be either 'substring' or 'fulltext'"}), 400
+    
+    # Cursor mode for scrolling clients
+    if 'cursor' in request.args:
+        include_total = request.args.get('include_total', 'false').lower() == 'true'
+        
+        rides_data, error = ride_service.get_rides_by_cursor(
+            cursor=request.args.get('cursor'),
+            size=size,
+            starting_location=starting_location,
+            dropoff_location=dropoff_location,
+            seats=seats,
+            include_total=include_total,
+            search_mode=search_mode
+        )
+        
+        if error:
+            return jsonify({"error": error}), 400
+        
+        return jsonify(rides_data), 200
     
     # Get rides with filters applied
     rides_data = ride_service.get_all_rides(
@@ -35,7 +67,8 @@ def get_rides():
         starting_location, 
         dropoff_location, 
         request_time, 
-        seats
+        seats,
+        search_mode
     )
     
     return jsonify(rides_data), 200
@@ -45,19 +78,19 @@ def get_rides():
 def get_ride_by_id(ride_id):
     """Get a specific ride by ID"""
     try:
-        # Query the ride
-        ride = Ride.query.get(ride_id)
+        # Load the ride with its driver, car and passenger requests
+        ride = ride_service.load_ride_aggregate(ride_id)
         
         # Check if ride exists
         if not ride:
             return jsonify({"error": f"Ride with ID {ride_id} not found"}), 404
         
         # Get driver info
-        driver = User.query.join(Driver).filter(Driver.user_id == ride.driver_id).first()
+        driver_info = ride.driver
+        driver = driver_info.user if driver_info else None
         driver_name = driver.name if driver else "Unknown"
         
         # Get driver's car information
-        driver_info = Driver.query.filter_by(user_id=ride.driver_id).first()
         car_number = driver_info.car_number if driver_info else "Unknown"
         car_type = driver_info.car_type if driver_info else "Unknown"
         car_color = driver_info.car_color if driver_info else "Unknown"
@@ -67,17 +100,14 @@ def get_ride_by_id(ride_id):
 
         # Default status is the ride's status
         status = ride.status
-        # Check if the user is a passenger by querying the Passenger table
-        is_passenger = Passenger.query.filter_by(user_id=user_id).first() is not None
-        # If the user is a passenger, get their specific status for this ride
-        if is_passenger:
-            passenger_ride = PassengerRide.query.filter_by(
-                ride_id=ride_id,
-                user_id=user_id
-            ).first()
-            
-            if passenger_ride:
-                status = passenger_ride.status
+        # If the user has requested this ride, show their own request status;
+        # only passengers can request rides, so no profile lookup is needed
+        passenger_ride = next(
+            (pr for pr in ride.passenger_rides if pr.user_id == user_id),
+            None
+        )
+        if passenger_ride:
+            status = passenger_ride.status
         # Format the response
         ride_data = {
             "rideID": ride.ride_id,
@@ -87,7 +117,8 @@ def get_ride_by_id(ride_id):
             "dropoffLocation": ride.dropoff_location,
             "requestTime": ride.request_time.isoformat(),
             "Passenger_count": ride.passenger_count,
-            "seatsOccupied": ride.seats_occupied if hasattr(ride, 'seats_occupied') else 0,
+            "seatsOccupied": ride.approved_count,
+            "availableSeats": ride.available_seats,
             "status": status,
             "carNumber": car_number,
             "carType": car_type,
@@ -140,20 +171,12 @@ def approve_ride_request():
     if error:
         return jsonify({"error": error}), 400
     
-    # Get ride and user details for notification
-    ride = Ride.query.get(ride_id)
-    driver = User.query.get(driver_id)
-    
-    if ride and driver:
-        # Create notification for the passenger
-        notification_service.notify_ride_request_approved(
-            ride_id=ride_id,
-            driver_id=driver_id,
-            driver_name=driver.name,
-            passenger_id=passenger_id,
-            from_location=ride.starting_location,
-            to_location=ride.dropoff_location
-        )
+    # Create notification for the passenger; the dispatcher looks up the ride and driver
+    notification_service.notify_ride_request_approved(
+        ride_id=ride_id,
+        driver_id=driver_id,
+        passenger_id=passenger_id
+    )
     
     return jsonify({"message": "Ride request approved successfully"}), 200
 
@@ -185,20 +208,12 @@ def reject_ride_request():
     if error:
         return jsonify({"error": error}), 400
     
-    # Get ride and user details for notification
-    ride = Ride.query.get(ride_id)
-    driver = User.query.get(driver_id)
-    
-    if ride and driver:
-        # Create notification for the passenger
-        notification_service.notify_ride_request_rejected(
-            ride_id=ride_id,
-            driver_id=driver_id,
-            driver_name=driver.name,
-            passenger_id=passenger_id,
-            from_location=ride.starting_location,
-            to_location=ride.dropoff_location
-        )
+    # Create notification for the passenger; the dispatcher looks up the ride and driver
+    notification_service.notify_ride_request_rejected(
+        ride_id=ride_id,
+        driver_id=driver_id,
+        passenger_id=passenger_id
+    )
     
     return jsonify({"message": "Ride request rejected successfully"}), 200
 
@@ -262,27 +277,17 @@ def request_ride():
     if error:
         return jsonify({"error": error}), 400
     
-    # Get ride details for notification
-    ride = Ride.query.get(data['rideID'])
-    passenger = User.query.get(data['passengerID'])
-    
-    if ride and passenger:
-        # Create notification for the driver
-        notification_service.notify_ride_request(
-            ride_id=data['rideID'],
-            driver_id=ride.driver_id,
-            passenger_id=data['passengerID'],
-            passenger_name=passenger.name,
-            from_location=ride.starting_location,
-            to_location=ride.dropoff_location
-        )
-        
-        # Create notification for the passenger
-        notification_service.notify_ride_request_submitted(
-            passenger_id=data['passengerID'],
-            from_location=ride.starting_location,
-            to_location=ride.dropoff_location
-        )
+    # Create notification for the driver; the dispatcher looks up the ride and passenger
+    notification_service.notify_ride_request(
+        ride_id=data['rideID'],
+        passenger_id=data['passengerID']
+    )
+    
+    # Create notification for the passenger
+    notification_service.notify_ride_request_submitted(
+        ride_id=data['rideID'],
+        passenger_id=data['passengerID']
+    )
     
     return jsonify(request_data), 201
 
@@ -358,18 +363,12 @@ def create_ride():
         else:
             logging.info(f"Chat created for ride {ride_data['rideID']}")
         
-        # Get driver details for notification
-        driver = User.query.get(driver_id)
-        
-        if driver:
-            # Create notification for the driver about ride publication
-            notification_service.notify_ride_published(
-                driver_id=driver_id,
-                driver_name=driver.name,
-                from_location=data['startingLocation'],
-                to_location=data['dropoffLocation']
-            )
-            logging.info(f"Notification sent for ride publication: driver={driver_id}")
+        # Create notification for the driver about ride publication
+        notification_service.notify_ride_published(
+            ride_id=ride_data['rideID'],
+            driver_id=driver_id
+        )
+        logging.info(f"Notification queued for ride publication: driver={driver_id}")
         
         return jsonify(ride_data), 201
     except Exception as e:
@@ -379,7 +378,12 @@ def create_ride():
 @ride_bp.route('/user-history', methods=['GET'])
 @token_required
 def get_user_ride_history():
-    """Get ride history for the authenticated user"""
+    """
+    Get ride history for the authenticated user
+    
+    Passing a cursor parameter (empty for the first page) switches to keyset
+    pagination, as on GET /api/rides.
+    """
     # Get the user ID from the authenticated user
     user_id = request.user.user_id
     
@@ -399,6 +403,23 @@ def get_user_ride_history():
     if role not in [None, 'driver', 'passenger']:
         return jsonify({"error": "Role must be either 'driver' or 'passenger'"}), 400
     
+    # Cursor mode for scrolling clients
+    if 'cursor' in request.args:
+        include_total = request.args.get('include_total', 'false').lower() == 'true'
+        
+        history_data, error = ride_service.get_user_ride_history_by_cursor(
+            user_id=user_id,
+            cursor=request.args.get('cursor'),
+            size=size,
+            role=role,
+            include_total=include_total
+        )
+        
+        if error:
+            return jsonify({"error": error}), 400
+        
+        return jsonify(history_data), 200
+    
     # Get user ride history
     history_data = ride_service.get_user_ride_history(
         user_id=user_id,
@@ -418,12 +439,12 @@ def get_ride_details_with_passengers(ride_id):
     
     # Determine user role by checking if they're a driver for this ride
     user_role = 'passenger'  # Default role
-    ride = Ride.query.get(ride_id)
+    ride = ride_service.load_ride_aggregate(ride_id)
     if ride and ride.driver_id == user_id:
         user_role = 'driver'
     
     # Get detailed ride information based on user role
-    ride_details = ride_service.get_ride_details_with_passengers(ride_id, user_role)
+    ride_details = ride_service.get_ride_details_with_passengers(ride_id, user_role, ride=ride)
     
     if not ride_details:
         return jsonify({"error": "Ride not found"}), 404
@@ -463,27 +484,17 @@ def cancel_ride_request(ride_id):
     if error:
         return jsonify({"error": error}), 400
     
-    # Get ride and user details for notification
-    ride = Ride.query.get(ride_id)
-    passenger = User.query.get(passenger_id)
+    # Create notification for the driver; the dispatcher looks up the ride and passenger
+    notification_service.notify_ride_request_cancelled(
+        ride_id=ride_id,
+        passenger_id=passenger_id
+    )
     
-    if ride and passenger:
-        # Create notification for the driver
-        notification_service.notify_ride_request_cancelled(
-            ride_id=ride_id,
-            driver_id=ride.driver_id,
-            passenger_id=passenger_id,
-            passenger_name=passenger.name,
-            from_location=ride.starting_location,
-            to_location=ride.dropoff_location
-        )
-        
-        # Create notification for the passenger
-        notification_service.notify_ride_request_cancelled_passenger(
-            passenger_id=passenger_id,
-            from_location=ride.starting_location,
-            to_location=ride.dropoff_location
-        )
+    # Create notification for the passenger
+    notification_service.notify_ride_request_cancelled_passenger(
+        ride_id=ride_id,
+        passenger_id=passenger_id
+    )
     
     return jsonify({"message": "Ride request cancelled successfully"}), 200
 
@@ -505,16 +516,11 @@ def complete_ride(ride_id):
     
     # Create notification for the driver
     try:
-        # Get ride details
-        ride = Ride.query.get(ride_id)
-        passenger = User.query.get(passenger_id)
-        
-        if ride and passenger:
-            # Create notification for the driver
-            notification_service.create_notification(
-                user_id=ride.driver_id,
-                message=f"{passenger.name} has completed the ride from {ride.starting_location} to {ride.dropoff_location}."
-            )
+        # The dispatcher looks up the ride, its driver and the passenger
+        notification_service.notify_ride_completed(
+            ride_id=ride_id,
+            passenger_id=passenger_id
+        )
     except Exception as e:
         # Log the error but don't fail the request
         logging.error(f"Error creating notification: {str(e)}")
@@ -546,8 +552,10 @@ def filter_rides():
     Query parameters:
     - filter_type: The type of filter to apply ('status', 'time', 'date')
     - criteria: The filter criteria value
+    - status, time, date: Criteria for several filters at once, combined with AND
     - page: Page number (default: 1)
     - size: Page size (default: 20)
+    - cursor: Switches to keyset pagination (empty for the first page)
     """
     try:
         # Get the user ID from the authenticated user
@@ -567,67 +575,52 @@ def filter_rides():
         if page < 1 or size < 1:
             return jsonify({"error": "Page and size must be positive integers"}), 400
         
-        # Get user ride history
+        # Collect the requested filters
+        filters = []
+        if filter_type and criteria:
+            # Check if the filter type exists in the map
+            if filter_type not in FILTER_STRATEGY_MAP:
+                return jsonify({"error": f"Invalid filter type: {filter_type}. Valid types are: {', '.join(FILTER_STRATEGY_MAP.keys())}"}), 400
+            filters.append((filter_type, criteria))
+        
+        for strategy_type in FILTER_STRATEGY_MAP:
+            if request.args.get(strategy_type):
+                filters.append((strategy_type, request.args.get(strategy_type)))
+        
+        # Each request gets its own filter context, compiled into the history query
+        ride_filter = None
+        if filters:
+            filter_context = build_filter_context(filters)
+            ride_filter = lambda columns: filter_context.to_predicate(columns, None)
+        
+        # Cursor mode for scrolling clients
+        if 'cursor' in request.args:
+            include_total = request.args.get('include_total', 'false').lower() == 'true'
+            
+            history_data, error = ride_service.get_user_ride_history_by_cursor(
+                user_id=user_id,
+                cursor=request.args.get('cursor'),
+                size=size,
+                ride_filter=ride_filter,
+                include_total=include_total
+            )
+            
+            if error:
+                return jsonify({"error": error}), 400
+            
+            return jsonify(history_data), 200
+        
+        # Get the filtered page of the user's ride history
         history_data = ride_service.get_user_ride_history(
             user_id=user_id,
-            page=1,  # Get all rides for filtering, we'll paginate after filtering
-            size=1000,  # Use a large number to get all rides
-            role=None  # Don't filter by role, get all rides for the user
+            page=page,
+            size=size,
+            role=None,  # Don't filter by role, get all rides for the user
+            ride_filter=ride_filter
         )
         
-        rides = history_data.get('rides', [])
-        
-        # If no filter type or criteria is provided, return the unfiltered rides with pagination
-        if not filter_type or not criteria:
-            # Apply pagination after getting all rides
-            start_idx = (page - 1) * size
-            end_idx = start_idx + size
-            paginated_rides = rides[start_idx:end_idx] if start_idx < len(rides) else []
-            
-            return jsonify({
-                "rides": paginated_rides,
-                "pagination": {
-                    "currentPage": page,
-                    "pageSize": size,
-                    "totalPages": (len(rides) + size - 1) // size if rides else 1,
-                    "totalRides": len(rides),
-                    "nextPage": page + 1 if end_idx < len(rides) else None,
-                    "prevPage": page - 1 if page > 1 else None
-                }
-            }), 200
-        
-        # Check if the filter type exists in the map
-        if filter_type not in FILTER_STRATEGY_MAP:
-            return jsonify({"error": f"Invalid filter type: {filter_type}. Valid types are: {', '.join(FILTER_STRATEGY_MAP.keys())}"}), 400
-        
-        # Get the global filter context instance
-        filter_context = get_filter_context_instance()
-        
-        # Set the appropriate filter strategy based on the filter type
-        filter_strategy_class = FILTER_STRATEGY_MAP[filter_type]
-        filter_context.set_filter_strategy(filter_strategy_class())
-        
-        # Filter the rides using the selected strategy
-        filtered_rides = filter_context.filter_rides(rides, criteria)
-        
-        # Apply pagination after filtering
-        start_idx = (page - 1) * size
-        end_idx = start_idx + size
-        paginated_rides = filtered_rides[start_idx:end_idx] if start_idx < len(filtered_rides) else []
-        
-        return jsonify({
-            "rides": paginated_rides,
-            "pagination": {
-                "currentPage": page,
-                "pageSize": size,
-                "totalPages": (len(filtered_rides) + size - 1) // size if filtered_rides else 1,
-                "totalRides": len(filtered_rides),
-                "nextPage": page + 1 if end_idx < len(filtered_rides) else None,
-                "prevPage": page - 1 if page > 1 else None
-            }
-        }), 200
+        return jsonify(history_data), 200
     except Exception as e:
         logging.error(f"Error in filter_rides route: {str(e)}")
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
 
- 
\ No newline at end of file
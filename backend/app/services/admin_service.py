@@ -1,5 +1,6 @@
 import logging
 from app.models import User, Driver, UserRole, db
+from app.utils.principal_cache import invalidate_principal
 from math import ceil
 
 # Configure logging
@@ -150,10 +151,14 @@ def delete_user(user_id):
             # Delete ride related data
             from app.models import Ride, PassengerRide
             
-            # Delete passenger ride relations
+            from app.services.ride_service import adjust_seat_counters
+            
+            # Delete passenger ride relations, releasing seats the user held on other rides
             passenger_rides = PassengerRide.query.filter_by(user_id=user_id).all()
             for p_ride in passenger_rides:
                 logger.info(f"Deleting passenger ride for user {p_ride.user_id} and ride {p_ride.ride_id}")
+                if p_ride.status == "approved":
+                    adjust_seat_counters(p_ride.ride_id, -1)
                 db.session.delete(p_ride)
             
             # Get all rides where user is the driver
@@ -177,15 +182,17 @@ def delete_user(user_id):
                 logger.info(f"Deleting ride ID {ride.ride_id}")
                 db.session.delete(ride)
             
-            # Delete notifications
-            from app.models import Notification
+            # Delete notifications, archived ones and their unread counter
+            from app.models import Notification, UnreadNotificationCount, NotificationArchive
             notifications = Notification.query.filter_by(user_id=user_id).all()
             for notification in notifications:
                 logger.info(f"Deleting notification ID {notification.notification_id}")
                 db.session.delete(notification)
+            UnreadNotificationCount.query.filter_by(user_id=user_id).delete()
+            NotificationArchive.query.filter_by(user_id=user_id).delete()
                 
             # Delete chat messages
-            from app.models import Message, Chat
+            from app.models import Message, Chat, ChatSummary
             
             # First get all chats associated with user's rides (as driver)
             driver_chat_ids = db.session.query(Chat.chat_id).join(Ride, Chat.ride_id == Ride.ride_id).filter(Ride.driver_id == user_id).all()
@@ -197,6 +204,12 @@ def delete_user(user_id):
                 (Message.chat_id.in_(driver_chat_ids) if driver_chat_ids else False)
             ).all()
             
+            # Summaries of other chats lose messages; they are rebuilt after the commit
+            affected_chat_ids = {message.chat_id for message in messages} - set(driver_chat_ids)
+            summary_chat_ids = affected_chat_ids | set(driver_chat_ids)
+            if summary_chat_ids:
+                ChatSummary.query.filter(ChatSummary.chat_id.in_(summary_chat_ids)).delete(synchronize_session=False)
+            
             for message in messages:
                 logger.info(f"Deleting message ID {message.message_id}")
                 db.session.delete(message)
@@ -232,6 +245,13 @@ def delete_user(user_id):
         db.session.commit()
         logger.info(f"Successfully completed cascade deletion for user ID {user_id}")
         
+        # Tokens of the deleted user must not authenticate from the cache or their claims
+        invalidate_principal(user_id)
+        
+        if affected_chat_ids:
+            from app.services.chat_service import reconcile_chat_summaries
+            reconcile_chat_summaries(chat_ids=affected_chat_ids)
+        
         return True, None
     except Exception as e:
         db.session.rollback()
@@ -258,6 +278,9 @@ def update_driver_verification_status(driver_id, status):
         driver.verification_status = status
         db.session.commit()
         
+        # The driver's cached principal and token claims are out of date
+        invalidate_principal(driver_id)
+        
         return True, None
     except Exception as e:
         db.session.rollback()
@@ -189,10 +189,17 @@ def generate_token(user):
     """Generate JWT token"""
     logger.info(f"Generating token for user: {user.user_id} ({user.name})")
     
+    # Roles and driver status travel as claims, so token_required and
+    # role_required can authorize the request without querying them
+    roles = [role.role_name for role in UserRole.query.filter_by(user_id=user.user_id).all()]
+    driver = Driver.query.filter_by(user_id=user.user_id).first()
+    
     payload = {
         'sub': str(user.user_id),  # Convert user_id to string to satisfy PyJWT requirements
         'name': user.name,
         'email': user.email,
+        'roles': roles,
+        'driverStatus': driver.verification_status if driver else None,
         'iat': datetime.datetime.utcnow(),
         'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)
     }
@@ -1,10 +1,152 @@
 from app.models import db
-from app.models.message import Chat, Message
+from app.models.message import Chat, Message, ChatSummary
 from app.models.ride import Ride
 from app.models.user import User
+from app.utils.loaders import get_user_loader
+from app.services.message_writer import get_message_writer
 from datetime import datetime
+from sqlalchemy import update, case, or_, func, union, tuple_
 from app import socketio
 
+# Number of messages returned when a chat is opened, and the largest window allowed
+DEFAULT_MESSAGE_WINDOW = 50
+MAX_MESSAGE_WINDOW = 200
+
+# Returned by send_message when the write-behind queue stays full
+MESSAGE_QUEUE_FULL_ERROR = "Too many messages are being sent, please try again"
+
+def _record_messages_in_summary(chat_id, ride_id, count, last_message_id, last_send_time):
+    """
+    Fold new messages into their chat's summary row
+    
+    The update runs in the caller's transaction. The last message only moves
+    forward in (send_time, message_id) order, so concurrent senders
+    committing out of order keep the newest one.
+    
+    Args:
+        chat_id (int): The chat the messages were sent in
+        ride_id (int): The chat's ride
+        count (int): Number of new messages
+        last_message_id (int): ID of the newest of the new messages
+        last_send_time (datetime): Send time of the newest of the new messages
+    """
+    is_newer = or_(
+        ChatSummary.last_message_id.is_(None),
+        ChatSummary.last_send_time.is_(None),
+        tuple_(ChatSummary.last_send_time, ChatSummary.last_message_id) < tuple_(last_send_time, last_message_id)
+    )
+    
+    result = db.session.execute(
+        update(ChatSummary).where(
+            ChatSummary.chat_id == chat_id
+        ).values(
+            last_message_id=case((is_newer, last_message_id), else_=ChatSummary.last_message_id),
+            last_send_time=case((is_newer, last_send_time), else_=ChatSummary.last_send_time),
+            message_count=ChatSummary.message_count + count
+        ).execution_options(synchronize_session=False)
+    )
+    
+    if result.rowcount == 0:
+        # Chat created before summaries existed and not reconciled yet
+        db.session.add(ChatSummary(
+            chat_id=chat_id,
+            ride_id=ride_id,
+            last_message_id=last_message_id,
+            last_send_time=last_send_time,
+            message_count=Message.query.filter_by(chat_id=chat_id).count()
+        ))
+
+def reconcile_chat_summaries(dry_run=False, chat_ids=None):
+    """
+    Rebuild chat summaries from the message table
+    
+    Creates missing summary rows (chats that existed before the table) and
+    fixes rows whose counters drifted.
+    
+    Args:
+        dry_run (bool): Only report drift without fixing it (default: False)
+        chat_ids (iterable, optional): Only check these chats
+        
+    Returns:
+        list: Drift found, one entry per chat whose summary was missing or wrong
+    """
+    # The count and the newest message of each chat in one pass
+    ranked = db.session.query(
+        Message.chat_id.label('chat_id'),
+        Message.message_id.label('message_id'),
+        func.count().over(partition_by=Message.chat_id).label('message_count'),
+        func.row_number().over(
+            partition_by=Message.chat_id,
+            order_by=(Message.send_time.desc(), Message.message_id.desc())
+        ).label('position')
+    ).subquery()
+    message_stats = db.session.query(
+        ranked.c.chat_id,
+        ranked.c.message_count,
+        ranked.c.message_id.label('last_message_id')
+    ).filter(
+        ranked.c.position == 1
+    ).subquery()
+    
+    expected_count = func.coalesce(message_stats.c.message_count, 0)
+    
+    query = db.session.query(
+        Chat.chat_id,
+        Chat.ride_id,
+        ChatSummary.chat_id,
+        ChatSummary.message_count,
+        ChatSummary.last_message_id,
+        expected_count,
+        message_stats.c.last_message_id
+    ).outerjoin(
+        ChatSummary, ChatSummary.chat_id == Chat.chat_id
+    ).outerjoin(
+        message_stats, message_stats.c.chat_id == Chat.chat_id
+    ).filter(
+        or_(
+            ChatSummary.chat_id.is_(None),
+            ChatSummary.message_count != expected_count,
+            ChatSummary.last_message_id.is_distinct_from(message_stats.c.last_message_id)
+        )
+    )
+    
+    if chat_ids is not None:
+        query = query.filter(Chat.chat_id.in_(list(chat_ids)))
+    
+    drifted = query.all()
+    
+    drift = []
+    for chat_id, ride_id, summary_id, message_count, last_message_id, expected_message_count, expected_last_message_id in drifted:
+        drift.append({
+            "chatID": chat_id,
+            "missing": summary_id is None,
+            "messageCount": message_count,
+            "expectedMessageCount": expected_message_count,
+            "lastMessageID": last_message_id,
+            "expectedLastMessageID": expected_last_message_id
+        })
+        
+        if dry_run:
+            continue
+        
+        last_message = Message.query.get(expected_last_message_id) if expected_last_message_id else None
+        values = {
+            "ride_id": ride_id,
+            "message_count": expected_message_count,
+            "last_message_id": expected_last_message_id,
+            "last_send_time": last_message.send_time if last_message else None
+        }
+        
+        if summary_id is None:
+            db.session.add(ChatSummary(chat_id=chat_id, **values))
+        else:
+            db.session.query(ChatSummary).filter(ChatSummary.chat_id == chat_id).update(values)
+    
+    if not dry_run:
+        db.session.commit()
+    
+    return drift
+
 def create_chat_for_ride(ride_id):
     """
     Create a new chat for a ride
@@ -34,6 +176,10 @@ def create_chat_for_ride(ride_id):
     try:
         new_chat = Chat(ride_id=ride_id)
         db.session.add(new_chat)
+        db.session.flush()
+        
+        # Start the chat's inbox summary in the same transaction
+        db.session.add(ChatSummary(chat_id=new_chat.chat_id, ride_id=ride_id, message_count=0))
         db.session.commit()
         
         return {
@@ -72,41 +218,89 @@ def get_chat_by_ride_id(ride_id):
         'ride_id': chat.ride_id
     }, None
 
-def get_messages(chat_id):
+def get_messages(chat_id, before=None, after=None, limit=DEFAULT_MESSAGE_WINDOW):
     """
-    Get all messages for a chat
+    Get a window of messages for a chat
+    
+    Without a cursor the most recent messages are returned. `before` pages
+    back through older messages and `after` fetches messages newer than the
+    last one the client has. Messages are ordered by (send_time, message_id):
+    with write-behind, processes hand out IDs from separate blocks, so IDs
+    alone do not follow send order. They are always returned oldest first,
+    with the sender's name joined in.
     
     Args:
         chat_id (int): The ID of the chat
+        before (int, optional): Only return messages sent before this message
+        after (int, optional): Only return messages sent after this message
+        limit (int): Maximum number of messages to return
         
     Returns:
         tuple: (messages_data, error)
-            - messages_data: List of messages if successful
+            - messages_data: Messages and hasMore if successful; hasMore tells
+              whether more messages exist beyond the window in the paging direction
             - error: Error message if unsuccessful, None otherwise
     """
-    # Check if chat exists
-    chat = Chat.query.get(chat_id)
-    if not chat:
+    if before is not None and after is not None:
+        return None, "Use either before or after, not both"
+    
+    limit = max(1, min(limit, MAX_MESSAGE_WINDOW))
+    
+    # Get one message more than requested to know if there are more
+    query = db.session.query(
+        Message,
+        User.name
+    ).outerjoin(
+        User, Message.user_id == User.user_id
+    ).filter(
+        Message.chat_id == chat_id
+    )
+    
+    cursor_id = after if after is not None else before
+    if cursor_id is not None:
+        cursor_time = db.session.query(Message.send_time).filter(
+            Message.chat_id == chat_id,
+            Message.message_id == cursor_id
+        ).scalar()
+        if cursor_time is None:
+            # Also the case for a message still queued for a write-behind write
+            return None, "Message not found"
+        cursor = tuple_(cursor_time, cursor_id)
+    
+    position = tuple_(Message.send_time, Message.message_id)
+    if after is not None:
+        query = query.filter(position > cursor).order_by(Message.send_time.asc(), Message.message_id.asc())
+    else:
+        if before is not None:
+            query = query.filter(position < cursor)
+        query = query.order_by(Message.send_time.desc(), Message.message_id.desc())
+    
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    # Only an empty window needs to tell a missing chat from a quiet one
+    if not rows and not Chat.query.get(chat_id):
         return None, "Chat not found"
     
-    # Get all messages for this chat
-    messages = Message.query.filter_by(chat_id=chat_id).order_by(Message.send_time).all()
+    if after is None:
+        rows.reverse()
     
     # Format messages
     messages_list = []
-    for message in messages:
-        user = User.query.get(message.user_id)
+    for message, username in rows:
         messages_list.append({
             'message_id': message.message_id,
             'user_id': message.user_id,
-            'username': user.name if user else 'Unknown',
+            'username': username or 'Unknown',
             'content': message.content,
             'send_time': message.send_time.isoformat()
         })
     
     return {
         'chat_id': chat_id,
-        'messages': messages_list
+        'messages': messages_list,
+        'hasMore': has_more
     }, None
 
 def send_message(chat_id, user_id, content):
@@ -123,6 +317,10 @@ def send_message(chat_id, user_id, content):
             - message_data: Dictionary containing message information if successful
             - error: Error message if unsuccessful, None otherwise
     """
+    writer = get_message_writer()
+    if writer is not None:
+        return _send_message_write_behind(writer, chat_id, user_id, content)
+    
     # Check if chat exists
     chat = Chat.query.get(chat_id)
     if not chat:
@@ -143,6 +341,10 @@ def send_message(chat_id, user_id, content):
         )
         
         db.session.add(new_message)
+        db.session.flush()
+        
+        # Keep the inbox summary current in the same transaction
+        _record_messages_in_summary(chat_id, chat.ride_id, 1, new_message.message_id, new_message.send_time)
         db.session.commit()
         
         # Format message data
@@ -165,56 +367,129 @@ def send_message(chat_id, user_id, content):
         db.session.rollback()
         return None, f"Error sending message: {str(e)}"
 
-def get_user_chats(user_id):
+def _send_message_write_behind(writer, chat_id, user_id, content):
+    """
+    Send a message and leave writing it to the background message writer
+    
+    The message gets its ID immediately and is emitted before it is written,
+    so the only database work here is one lookup of the chat and sender.
+    """
+    row = db.session.query(
+        Chat.ride_id,
+        User.name
+    ).filter(
+        Chat.chat_id == chat_id,
+        User.user_id == user_id
+    ).first()
+    
+    if row is None:
+        if not Chat.query.get(chat_id):
+            return None, "Chat not found"
+        return None, "User not found"
+    
+    ride_id, username = row
+    # The ID and send time are taken together so they agree on this process's send order
+    message_id, send_time = writer.id_allocator.allocate()
+    message = {
+        'message_id': message_id,
+        'chat_id': chat_id,
+        'ride_id': ride_id,
+        'user_id': user_id,
+        'content': content,
+        'send_time': send_time
+    }
+    
+    if not writer.submit(message):
+        return None, MESSAGE_QUEUE_FULL_ERROR
+    
+    message_data = {
+        'message_id': message['message_id'],
+        'user_id': user_id,
+        'username': username,
+        'content': content,
+        'send_time': message['send_time'].isoformat()
+    }
+    
+    # Emit the new message to all clients in the chat room
+    socketio.emit('new_message', {
+        'chat_id': chat_id,
+        'message': message_data
+    }, room=f'chat_{chat_id}')
+    
+    return message_data, None
+
+def get_user_chats(user_id, page=1, size=20):
     """
-    Get all chats for a user (rides where user is driver or passenger)
+    Get the chats of a user's rides (as driver or passenger), most recently active first
     
     Args:
         user_id (int): The ID of the user
+        page (int): Page number (default: 1)
+        size (int): Page size (default: 20)
         
     Returns:
         tuple: (chats_data, error)
-            - chats_data: List of chats if successful
+            - chats_data: Chats and pagination info if successful
             - error: Error message if unsuccessful, None otherwise
     """
     from app.models.ride import Ride, PassengerRide
     
-    # Check if user exists
-    user = User.query.get(user_id)
-    if not user:
-        return None, "User not found"
-    
     try:
-        # Get rides where user is driver
-        driver_rides = Ride.query.filter_by(driver_id=user_id).all()
+        # Rides where the user is the driver or a passenger
+        user_rides = union(
+            db.session.query(Ride.ride_id).filter(Ride.driver_id == user_id),
+            db.session.query(PassengerRide.ride_id).filter(PassengerRide.user_id == user_id)
+        )
         
-        # Get rides where user is passenger
-        passenger_rides = db.session.query(Ride).join(
-            PassengerRide, Ride.ride_id == PassengerRide.ride_id
-        ).filter(PassengerRide.user_id == user_id).all()
+        # Get one chat more than requested to know if there is a next page
+        offset = (page - 1) * size
+        rows = db.session.query(
+            ChatSummary.chat_id,
+            Ride.ride_id,
+            Ride.starting_location,
+            Ride.dropoff_location,
+            Message.content,
+            ChatSummary.last_send_time,
+            ChatSummary.message_count
+        ).join(
+            Ride, Ride.ride_id == ChatSummary.ride_id
+        ).outerjoin(
+            Message, Message.message_id == ChatSummary.last_message_id
+        ).filter(
+            ChatSummary.ride_id.in_(user_rides)
+        ).order_by(
+            ChatSummary.last_send_time.desc().nulls_last(),
+            ChatSummary.chat_id.desc()
+        ).offset(offset).limit(size + 1).all()
         
-        # Combine and deduplicate rides
-        all_rides = list(set(driver_rides + passenger_rides))
+        # Only an empty inbox needs to tell a missing user from one without chats
+        if not rows and not User.query.get(user_id):
+            return None, "User not found"
+        
+        has_more = len(rows) > size
         
-        # Get chats for these rides
         chats = []
-        for ride in all_rides:
-            chat = Chat.query.filter_by(ride_id=ride.ride_id).first()
-            if chat:
-                # Get last message
-                last_message = Message.query.filter_by(chat_id=chat.chat_id).order_by(Message.send_time.desc()).first()
-                
-                chats.append({
-                    'chat_id': chat.chat_id,
-                    'ride_id': ride.ride_id,
-                    'starting_location': ride.starting_location,
-                    'dropoff_location': ride.dropoff_location,
-                    'last_message': {
-                        'content': last_message.content if last_message else None,
-                        'send_time': last_message.send_time.isoformat() if last_message else None
-                    }
-                })
-        
-        return {'chats': chats}, None
+        for chat_id, ride_id, starting_location, dropoff_location, content, last_send_time, message_count in rows[:size]:
+            chats.append({
+                'chat_id': chat_id,
+                'ride_id': ride_id,
+                'starting_location': starting_location,
+                'dropoff_location': dropoff_location,
+                'message_count': message_count,
+                'last_message': {
+                    'content': content,
+                    'send_time': last_send_time.isoformat() if last_send_time else None
+                }
+            })
+        
+        return {
+            'chats': chats,
+            'pagination': {
+                'currentPage': page,
+                'pageSize': size,
+                'nextPage': page + 1 if has_more else None,
+                'prevPage': page - 1 if page > 1 else None
+            }
+        }, None
     except Exception as e:
-        return None, f"Error getting user chats: {str(e)}" 
\ No newline at end of file
+        return None, f"Error getting user chats: {str(e)}"
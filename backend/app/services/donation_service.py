@@ -2,6 +2,7 @@ from app.models import db, Donation, User, Donor
 from datetime import datetime
 import logging
 from app.utils.payment_adapter import get_payment_client
+from app.utils.loaders import get_user_loader
 from sqlalchemy import func, desc
 
 def create_donation(user_id, donor_id, amount, payment_method='stripe', description=None):
@@ -98,11 +99,14 @@ def get_user_donations(user_id, page=1, size=20):
     # Get paginated donations
     donations = donations_query.offset(offset).limit(size).all()
     
+    # Look up all donors with one query
+    donors = get_user_loader().load_many(donation.donor_id for donation in donations)
+    
     # Format donations
     donations_data = []
     for donation in donations:
         # Get donor info
-        donor = User.query.get(donation.donor_id)
+        donor = donors.get(donation.donor_id)
         donor_name = donor.name if donor else "Anonymous"
         
         donations_data.append({
@@ -156,11 +160,14 @@ def get_donor_donations(donor_id, page=1, size=20):
     # Get paginated donations
     donations = donations_query.offset(offset).limit(size).all()
     
+    # Look up all recipients with one query
+    recipients = get_user_loader().load_many(donation.user_id for donation in donations)
+    
     # Format donations
     donations_data = []
     for donation in donations:
         # Get recipient info
-        recipient = User.query.get(donation.user_id)
+        recipient = recipients.get(donation.user_id)
         recipient_name = recipient.name if recipient else "Unknown"
         
         donations_data.append({
@@ -248,11 +255,14 @@ def get_system_donations(page=1, size=20):
     # Get paginated donations
     donations = donations_query.offset(offset).limit(size).all()
     
+    # Look up all donors with one query
+    donors = get_user_loader().load_many(donation.donor_id for donation in donations)
+    
     # Format donations
     donations_data = []
     for donation in donations:
         # Get donor info
-        donor = User.query.get(donation.donor_id)
+        donor = donors.get(donation.donor_id)
         donor_name = donor.name if donor else "Anonymous"
         
         donations_data.append({
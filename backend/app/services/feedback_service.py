@@ -1,6 +1,7 @@
 import logging
 from app.models import db, Feedback, User, Ride
 from sqlalchemy.exc import SQLAlchemyError
+from app.utils.loaders import get_user_loader
 
 # Configure logging
 logger = logging.getLogger('feedback_service')
@@ -57,6 +58,9 @@ def get_all_feedback():
             Ride, Feedback.ride_id == Ride.ride_id
         ).all()
         
+        # Look up all drivers with one query
+        drivers = get_user_loader().load_many(result[2] for result in feedback_query)
+        
         # Format feedback data
         feedback_list = []
         for result in feedback_query:
@@ -65,7 +69,7 @@ def get_all_feedback():
             driver_id = result[2]
             
             # Get driver name
-            driver = User.query.get(driver_id)
+            driver = drivers.get(driver_id)
             driver_name = driver.name if driver else f"Unknown Driver (ID: {driver_id})"
             
             feedback_list.append({
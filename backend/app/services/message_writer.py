@@ -0,0 +1,371 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+from app.models import db, Message, MessageDeadLetter, IdSequence
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of the queue when the writer stops
+_STOP = object()
+
+class IdAllocator:
+    """
+    Hand out primary keys before rows are written
+
+    IDs are reserved from the id_sequence table in blocks, so processes
+    sharing a database never hand out the same ID and only one round trip is
+    needed per block. IDs from different processes interleave, so they do
+    not follow send time; messages are ordered by (send_time, message_id).
+    """
+    def __init__(self, app, name, column, block_size=1000):
+        """
+        Args:
+            app (Flask): Application whose database holds the sequence
+            name (str): Name of the sequence row
+            column: Primary key column the IDs are for; reservations always
+                start above its current maximum
+            block_size (int): Number of IDs reserved per round trip
+        """
+        self.app = app
+        self.name = name
+        self.column = column
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+
+    def allocate(self):
+        """
+        Get the next unused ID and the time it was handed out
+
+        Both are taken under one lock, so within a process IDs and times
+        increase together and messages sent in the same microsecond keep
+        their order.
+
+        Returns:
+            tuple: (id, allocated_at) where allocated_at is a naive UTC datetime
+        """
+        with self._lock:
+            if self._next >= self._end:
+                self._next = self._reserve_block()
+                self._end = self._next + self.block_size
+            value = self._next
+            self._next += 1
+            return value, datetime.utcnow()
+
+    def _reserve_block(self):
+        """Reserve the next block of IDs and return its first ID"""
+        with self.app.app_context():
+            engine = db.engine
+
+        while True:
+            try:
+                with engine.begin() as connection:
+                    # Never reuse IDs taken by rows written without the allocator
+                    max_id = connection.execute(select(func.max(self.column))).scalar() or 0
+                    current = connection.execute(
+                        select(IdSequence.next_value).where(IdSequence.name == self.name)
+                    ).scalar()
+
+                    if current is None:
+                        start = max_id + 1
+                        connection.execute(insert(IdSequence).values(
+                            name=self.name,
+                            next_value=start + self.block_size
+                        ))
+                        return start
+
+                    start = max(current, max_id + 1)
+                    result = connection.execute(
+                        update(IdSequence).where(
+                            IdSequence.name == self.name,
+                            IdSequence.next_value == current
+                        ).values(next_value=start + self.block_size)
+                    )
+                    if result.rowcount == 1:
+                        return start
+            except IntegrityError:
+                # Another process created the sequence row first
+                pass
+
+class MessageWriter:
+    """
+    Persist chat messages in batches on a background thread
+
+    send_message assigns the message ID, queues the row and returns without
+    touching the database. The writer inserts queued messages in batches of
+    up to batch_size, or whatever arrived within flush_interval seconds, and
+    updates the chat summaries in the same transaction. Messages that cannot
+    be written end up in the message_dead_letter table rather than being lost.
+    """
+    def __init__(self, app, batch_size=200, flush_interval=0.05, max_queue_size=10000,
+                 enqueue_timeout=1.0, max_retries=5, id_block_size=1000):
+        """
+        Args:
+            app (Flask): Application whose database the messages are written to
+            batch_size (int): Most messages written per transaction
+            flush_interval (float): Longest time in seconds a message waits for its batch
+            max_queue_size (int): Most messages waiting to be written
+            enqueue_timeout (float): How long a sender waits for room in a full queue
+            max_retries (int): Attempts per batch on database errors
+            id_block_size (int): Message IDs reserved per round trip
+        """
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.max_retries = max_retries
+        self.id_allocator = IdAllocator(app, 'message', Message.message_id, block_size=id_block_size)
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+        self._stopped = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the background writer thread"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='message-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def submit(self, message):
+        """
+        Queue a message for writing
+
+        Blocks up to enqueue_timeout while the queue is full, which slows
+        senders down to the rate the database can absorb.
+
+        Args:
+            message (dict): Message column values including message_id and the
+                chat's ride_id
+
+        Returns:
+            bool: False if the queue stayed full or the writer is stopped
+        """
+        if self._stopped:
+            return False
+        try:
+            self._queue.put(message, timeout=self.enqueue_timeout)
+            return True
+        except queue.Full:
+            logger.warning("Message write queue is full")
+            return False
+
+    def pending(self):
+        """Number of messages waiting to be written"""
+        return self._queue.qsize()
+
+    def flush(self):
+        """Block until every queued message has been written"""
+        self._queue.join()
+
+    def stop(self, timeout=None):
+        """
+        Write all queued messages and stop the writer
+
+        Called automatically at interpreter exit, so a clean shutdown does
+        not lose messages that were already acknowledged.
+        """
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            thread = self._thread
+
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+        # Messages queued by senders racing with the stop
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._queue.task_done()
+            if item is not _STOP:
+                leftovers.append(item)
+        if leftovers:
+            self._write_batch(leftovers)
+
+        logger.info("Message writer stopped")
+
+    def _run(self):
+        """Collect messages into batches and write them until stopped"""
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._queue.task_done()
+                    stopping = True
+                    break
+                batch.append(item)
+
+            try:
+                self._write_batch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, batch):
+        """
+        Write a batch of messages, isolating rows the database rejects
+
+        A batch failing with anything but a transient database error is split
+        in halves until the offending messages are alone; those, and batches
+        still failing after max_retries, go to the dead-letter table.
+        """
+        error = self._insert_batch(batch)
+        if error is None:
+            return
+
+        if len(batch) > 1 and not isinstance(error, OperationalError):
+            middle = len(batch) // 2
+            self._write_batch(batch[:middle])
+            self._write_batch(batch[middle:])
+            return
+
+        self._dead_letter(batch, error)
+
+    def _insert_batch(self, batch):
+        """
+        Insert a batch of messages and fold them into the chat summaries
+
+        Returns:
+            Exception: The error of the last attempt, or None if written
+        """
+        from app.services.chat_service import _record_messages_in_summary
+
+        for attempt in range(1, self.max_retries + 1):
+            with self.app.app_context():
+                try:
+                    db.session.execute(insert(Message), [
+                        {
+                            'message_id': message['message_id'],
+                            'chat_id': message['chat_id'],
+                            'user_id': message['user_id'],
+                            'content': message['content'],
+                            'send_time': message['send_time']
+                        }
+                        for message in batch
+                    ])
+
+                    # One summary update per chat in the batch
+                    chats = {}
+                    for message in batch:
+                        chats.setdefault(message['chat_id'], []).append(message)
+                    for chat_id, messages in chats.items():
+                        last_message = max(messages, key=lambda message: (message['send_time'], message['message_id']))
+                        _record_messages_in_summary(
+                            chat_id,
+                            messages[0]['ride_id'],
+                            len(messages),
+                            last_message['message_id'],
+                            last_message['send_time']
+                        )
+
+                    db.session.commit()
+                    return None
+                except OperationalError as e:
+                    db.session.rollback()
+                    logger.warning(f"Writing {len(batch)} messages failed (attempt {attempt}): {str(e)}")
+                    error = e
+                    if attempt < self.max_retries:
+                        time.sleep(min(0.05 * 2 ** attempt, 2.0))
+                except Exception as e:
+                    db.session.rollback()
+                    logger.warning(f"Writing {len(batch)} messages failed: {str(e)}")
+                    return e
+
+        return error
+
+    def _dead_letter(self, batch, error):
+        """Keep messages that could not be written in the dead-letter table"""
+        message_ids = [message['message_id'] for message in batch]
+
+        with self.app.app_context():
+            try:
+                db.session.execute(insert(MessageDeadLetter), [
+                    {
+                        'message_id': message['message_id'],
+                        'chat_id': message.get('chat_id'),
+                        'user_id': message.get('user_id'),
+                        'content': message.get('content'),
+                        'send_time': message.get('send_time'),
+                        'error': str(error)
+                    }
+                    for message in batch
+                ])
+                db.session.commit()
+                logger.error(f"Moved messages {message_ids} to the dead-letter table: {str(error)}")
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Lost messages {message_ids}, the dead-letter table is unavailable too: {str(e)}")
+
+# Writer used by chat_service.send_message, None while write-behind is disabled
+_writer = None
+
+def init_message_writer(app):
+    """
+    Start write-behind message persistence if MESSAGE_WRITE_BEHIND is enabled
+
+    Args:
+        app (Flask): The application
+
+    Returns:
+        MessageWriter: The started writer, or None if disabled
+    """
+    global _writer
+
+    if not app.config.get('MESSAGE_WRITE_BEHIND'):
+        return None
+
+    _writer = MessageWriter(
+        app,
+        batch_size=app.config.get('MESSAGE_WRITE_BATCH_SIZE', 200),
+        flush_interval=app.config.get('MESSAGE_WRITE_FLUSH_INTERVAL', 0.05),
+        max_queue_size=app.config.get('MESSAGE_WRITE_QUEUE_SIZE', 10000),
+        id_block_size=app.config.get('MESSAGE_ID_BLOCK_SIZE', 1000)
+    )
+    _writer.start()
+    logger.info("Write-behind message persistence enabled")
+    return _writer
+
+def get_message_writer():
+    """Get the running message writer, or None if write-behind is disabled"""
+    return _writer
+
+def set_message_writer(writer):
+    """
+    Replace the writer used by chat_service.send_message
+
+    Args:
+        writer (MessageWriter): The writer, or None to write messages synchronously
+
+    Returns:
+        MessageWriter: The writer used before
+    """
+    global _writer
+
+    previous = _writer
+    _writer = writer
+    return previous
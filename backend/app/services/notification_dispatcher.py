@@ -0,0 +1,246 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from sqlalchemy.exc import OperationalError
+from app.models import db
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of the queue for one worker when the dispatcher stops
+_STOP = object()
+
+class NotificationDispatcher:
+    """
+    Store and push notifications on a pool of background workers
+
+    Routes queue (user_id, message, group) entries, or Notice objects the
+    workers word, and return at once. Each worker takes about batch_size
+    queued notifications, or whatever arrived within flush_interval seconds,
+    looks up what the notices refer to, stores them with one validation
+    query and one multi-row insert, and then pushes them to the users'
+    socket rooms.
+    Transient database errors are retried with backoff.
+    """
+    def __init__(self, app, workers=2, batch_size=200, flush_interval=0.05, max_queue_size=10000,
+                 enqueue_timeout=0.1, max_retries=5):
+        """
+        Args:
+            app (Flask): Application whose database stores the notifications
+            workers (int): Number of worker threads
+            batch_size (int): Most notifications stored per transaction
+            flush_interval (float): Longest time in seconds a notification waits for its batch
+            max_queue_size (int): Most submissions waiting to be delivered
+            enqueue_timeout (float): How long a route waits for room in a full queue
+            max_retries (int): Attempts per batch on database errors
+        """
+        self.app = app
+        self.workers = workers
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.max_retries = max_retries
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._threads = []
+        self._stopped = False
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._enqueued = 0
+        self._delivered = 0
+        self._failed = 0
+        self._last_lag = 0.0
+        self._max_lag = 0.0
+
+    def start(self):
+        """Start the worker threads"""
+        with self._lock:
+            if self._threads:
+                return
+            for number in range(self.workers):
+                thread = threading.Thread(
+                    target=self._run,
+                    name=f'notification-worker-{number}',
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+            atexit.register(self.stop)
+
+    def submit(self, entries):
+        """
+        Queue notifications for delivery
+
+        Args:
+            entries (list): (user_id, message, group) triples or Notice
+                objects, see notification_service._store_notifications
+
+        Returns:
+            bool: False if the queue stayed full or the dispatcher is stopped
+        """
+        if self._stopped:
+            return False
+
+        # One queue item per submission, so it is either queued whole or not at all
+        try:
+            self._queue.put((list(entries), time.monotonic()), timeout=self.enqueue_timeout)
+        except queue.Full:
+            logger.warning("Notification queue is full")
+            return False
+
+        with self._stats_lock:
+            self._enqueued += len(entries)
+        return True
+
+    def flush(self):
+        """Block until every queued notification has been delivered"""
+        self._queue.join()
+
+    def stop(self, timeout=None):
+        """
+        Deliver all queued notifications and stop the workers
+
+        Called automatically at interpreter exit.
+        """
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            threads = list(self._threads)
+
+        for _ in threads:
+            self._queue.put(_STOP)
+        for thread in threads:
+            thread.join(timeout)
+
+        # Notifications queued by routes racing with the stop
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._queue.task_done()
+            if item is not _STOP:
+                leftovers.append(item)
+        if leftovers:
+            self._deliver_batch(leftovers)
+
+        logger.info("Notification dispatcher stopped")
+
+    def metrics(self):
+        """
+        Get queue depth, lag and delivery counts
+
+        Returns:
+            dict: depth (submissions waiting), lagSeconds (time the oldest
+                notification of the last batch waited), maxLagSeconds, and the
+                enqueued, delivered and failed counts
+        """
+        with self._stats_lock:
+            return {
+                'depth': self._queue.qsize(),
+                'workers': len(self._threads),
+                'lagSeconds': round(self._last_lag, 4),
+                'maxLagSeconds': round(self._max_lag, 4),
+                'enqueued': self._enqueued,
+                'delivered': self._delivered,
+                'failed': self._failed
+            }
+
+    def _run(self):
+        """Collect notifications into batches and deliver them until stopped"""
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                break
+
+            batch = [item]
+            size = len(item[0])
+            deadline = time.monotonic() + self.flush_interval
+            while size < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._queue.task_done()
+                    stopping = True
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            try:
+                self._deliver_batch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _deliver_batch(self, batch):
+        """Store a batch of submissions, retrying transient errors, then push them"""
+        from app.services.notification_service import _store_notifications, _publish_notifications
+
+        lag = time.monotonic() - min(enqueued_at for _, enqueued_at in batch)
+        entries = [entry for submission, _ in batch for entry in submission]
+
+        for attempt in range(1, self.max_retries + 1):
+            with self.app.app_context():
+                try:
+                    created = _store_notifications(entries)
+                except OperationalError as e:
+                    db.session.rollback()
+                    logger.warning(f"Storing {len(entries)} notifications failed (attempt {attempt}): {str(e)}")
+                    time.sleep(min(0.05 * 2 ** attempt, 2.0))
+                    continue
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Storing {len(entries)} notifications failed: {str(e)}")
+                    break
+
+                _publish_notifications(created)
+
+            with self._stats_lock:
+                self._delivered += len(entries)
+                self._last_lag = lag
+                self._max_lag = max(self._max_lag, lag)
+            return
+
+        with self._stats_lock:
+            self._failed += len(entries)
+        logger.error(f"Dropped {len(entries)} notifications after failed writes")
+
+# Dispatcher used by notification_service.queue_notification, None while disabled
+_dispatcher = None
+
+def init_notification_dispatcher(app):
+    """
+    Start background notification delivery if NOTIFICATION_ASYNC is enabled
+
+    Args:
+        app (Flask): The application
+
+    Returns:
+        NotificationDispatcher: The started dispatcher, or None if disabled
+    """
+    global _dispatcher
+
+    if not app.config.get('NOTIFICATION_ASYNC'):
+        return None
+
+    _dispatcher = NotificationDispatcher(
+        app,
+        workers=app.config.get('NOTIFICATION_WORKERS', 2),
+        batch_size=app.config.get('NOTIFICATION_BATCH_SIZE', 200),
+        flush_interval=app.config.get('NOTIFICATION_FLUSH_INTERVAL', 0.05),
+        max_queue_size=app.config.get('NOTIFICATION_QUEUE_SIZE', 10000)
+    )
+    _dispatcher.start()
+    logger.info("Background notification delivery enabled")
+    return _dispatcher
+
+def get_notification_dispatcher():
+    """Get the running notification dispatcher, or None if disabled"""
+    return _dispatcher
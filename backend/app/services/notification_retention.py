@@ -0,0 +1,184 @@
+import logging
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, insert
+from app.models import db, Notification, NotificationArchive
+from app.services.notification_service import _adjust_unread_counts
+
+logger = logging.getLogger(__name__)
+
+def _retention_rules(config, now):
+    """
+    Build the retention rules from the configuration
+
+    Returns:
+        list: (name, condition) pairs selecting the notifications to move out
+            of the notification table; rules whose age is 0 are disabled
+    """
+    rules = []
+
+    read_days = config.get('NOTIFICATION_READ_RETENTION_DAYS', 30)
+    if read_days:
+        rules.append(('read', (Notification.read == True) & (Notification.time < now - timedelta(days=read_days))))
+
+    unread_days = config.get('NOTIFICATION_UNREAD_RETENTION_DAYS', 180)
+    if unread_days:
+        rules.append(('unread', (Notification.read == False) & (Notification.time < now - timedelta(days=unread_days))))
+
+    return rules
+
+def _archive_cutoff_month(config, now):
+    """First month kept in the archive, or None to keep every month"""
+    months = config.get('NOTIFICATION_ARCHIVE_RETENTION_MONTHS', 12)
+    if not months:
+        return None
+
+    month_index = now.year * 12 + now.month - 1 - months
+    return f"{month_index // 12:04d}-{month_index % 12 + 1:02d}"
+
+def _move_chunk(condition, archive, batch_size, now):
+    """
+    Move one chunk of expired notifications out of the notification table
+
+    The rows are deleted with their condition checked again, so a
+    notification read meanwhile is not moved by the unread rule, and only the
+    rows actually deleted are archived and taken off the unread counters.
+    Each chunk is its own short transaction.
+
+    Returns:
+        tuple: (rows moved, whether more rows may be left)
+    """
+    ids = [
+        notification_id for (notification_id,) in
+        db.session.query(Notification.notification_id).filter(
+            condition
+        ).order_by(
+            Notification.notification_id
+        ).limit(batch_size).all()
+    ]
+    if not ids:
+        return 0, False
+
+    rows = db.session.execute(
+        delete(Notification).where(
+            Notification.notification_id.in_(ids),
+            condition
+        ).returning(
+            Notification.notification_id,
+            Notification.user_id,
+            Notification.message,
+            Notification.read,
+            Notification.time
+        ).execution_options(synchronize_session=False)
+    ).all()
+
+    if archive and rows:
+        db.session.execute(insert(NotificationArchive), [
+            {
+                'notification_id': notification_id,
+                'user_id': user_id,
+                'message': message,
+                'read': read,
+                'time': sent_at,
+                'archive_month': (sent_at or now).strftime('%Y-%m'),
+                'archived_at': now
+            }
+            for notification_id, user_id, message, read, sent_at in rows
+        ])
+
+    unread_deltas = {}
+    for _, user_id, _, read, _ in rows:
+        if not read:
+            unread_deltas[user_id] = unread_deltas.get(user_id, 0) - 1
+    _adjust_unread_counts(unread_deltas)
+
+    db.session.commit()
+    return len(rows), len(ids) == batch_size
+
+def _purge_archive_chunk(cutoff_month, batch_size):
+    """Delete one chunk of archived notifications from months before the cutoff"""
+    ids = [
+        archive_id for (archive_id,) in
+        db.session.query(NotificationArchive.archive_id).filter(
+            NotificationArchive.archive_month < cutoff_month
+        ).limit(batch_size).all()
+    ]
+    if not ids:
+        return 0, False
+
+    result = db.session.execute(
+        delete(NotificationArchive).where(
+            NotificationArchive.archive_id.in_(ids)
+        ).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount, len(ids) == batch_size
+
+def purge_notifications(dry_run=False, now=None):
+    """
+    Apply the notification retention policies
+
+    Read notifications older than NOTIFICATION_READ_RETENTION_DAYS and unread
+    ones older than NOTIFICATION_UNREAD_RETENTION_DAYS leave the notification
+    table. They are moved to notification_archive, or simply deleted when
+    NOTIFICATION_ARCHIVE is off. Archived months older than
+    NOTIFICATION_ARCHIVE_RETENTION_MONTHS are deleted.
+
+    Work is done in chunks of NOTIFICATION_PURGE_BATCH_SIZE rows, each in its
+    own transaction, with NOTIFICATION_PURGE_PAUSE seconds between chunks, so
+    the purge never holds write locks for long.
+
+    Args:
+        dry_run (bool): Only count what would be purged (default: False)
+        now (datetime, optional): Reference time (default: now)
+
+    Returns:
+        dict: Number of notifications moved per rule, archived rows deleted,
+            and chunks committed
+    """
+    config = current_app.config
+    now = now or datetime.utcnow()
+    archive = config.get('NOTIFICATION_ARCHIVE', True)
+    batch_size = config.get('NOTIFICATION_PURGE_BATCH_SIZE', 500)
+    pause = config.get('NOTIFICATION_PURGE_PAUSE', 0.05)
+    cutoff_month = _archive_cutoff_month(config, now)
+
+    stats = {'read': 0, 'unread': 0, 'archivePurged': 0, 'chunks': 0}
+
+    if dry_run:
+        for name, condition in _retention_rules(config, now):
+            stats[name] = Notification.query.filter(condition).count()
+        if cutoff_month:
+            stats['archivePurged'] = NotificationArchive.query.filter(
+                NotificationArchive.archive_month < cutoff_month
+            ).count()
+        return stats
+
+    chunks = [
+        (name, lambda condition=condition: _move_chunk(condition, archive, batch_size, now))
+        for name, condition in _retention_rules(config, now)
+    ]
+    if cutoff_month:
+        chunks.append(('archivePurged', lambda: _purge_archive_chunk(cutoff_month, batch_size)))
+
+    for name, run_chunk in chunks:
+        more = True
+        while more:
+            try:
+                count, more = run_chunk()
+            except Exception:
+                db.session.rollback()
+                raise
+            stats[name] += count
+            if count:
+                stats['chunks'] += 1
+            if more and pause:
+                time.sleep(pause)
+
+    if stats['chunks']:
+        logger.info(
+            f"Notification retention: {stats['read']} read and {stats['unread']} unread moved out, "
+            f"{stats['archivePurged']} archived deleted in {stats['chunks']} chunk(s)"
+        )
+    return stats
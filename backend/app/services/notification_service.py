@@ -1,37 +1,231 @@
-from datetime import datetime
-from sqlalchemy import desc
-from app.models import db, Notification, User
-from app.utils.observer_pattern import get_notification_subject, UserNotificationObserver
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import desc, func, insert, update, or_
+from sqlalchemy.exc import IntegrityError
+from app.models import db, Notification, User, Ride, UnreadNotificationCount
+from app.utils.observer_pattern import get_notification_subject, WILDCARD
+from app.utils.room_events import user_room
+from app import socketio
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Observer pattern implementation
-notification_observers = {}
+# Times _store_notifications looks for open groups again after a concurrent
+# worker opened one of the same groups first
+MAX_GROUP_CONFLICT_ATTEMPTS = 3
 
-def get_or_create_observer(user_id):
+def _format_notification(notification):
+    """Format a notification for API responses and socket events"""
+    return {
+        "id": notification.notification_id,
+        "message": notification.message,
+        "read": notification.read,
+        "time": notification.time.isoformat(),
+        "count": notification.group_count or 1
+    }
+
+def _count_unread(user_id):
+    """Count a user's unread notifications in the notification table"""
+    return Notification.query.filter(
+        Notification.user_id == user_id,
+        Notification.read == False
+    ).count()
+
+def _create_unread_count(user_id, delta):
+    """
+    Create a missing unread counter from the notification table
+    
+    The count includes the caller's flushed changes. If another transaction
+    created the row first, the change is applied to that row instead.
+    """
+    try:
+        with db.session.begin_nested():
+            db.session.add(UnreadNotificationCount(user_id=user_id, unread_count=_count_unread(user_id)))
+    except IntegrityError:
+        db.session.execute(
+            update(UnreadNotificationCount).where(
+                UnreadNotificationCount.user_id == user_id
+            ).values(
+                unread_count=UnreadNotificationCount.unread_count + delta
+            ).execution_options(synchronize_session=False)
+        )
+
+def _adjust_unread_counts(deltas):
+    """
+    Apply changes to users' unread counters in the caller's transaction
+    
+    Users with the same change are updated by one statement, so a fan-out
+    to many users costs one UPDATE.
+    
+    Args:
+        deltas (dict): Change in unread notifications per user ID
+    """
+    by_delta = {}
+    for user_id, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(user_id)
+    
+    for delta, user_ids in by_delta.items():
+        result = db.session.execute(
+            update(UnreadNotificationCount).where(
+                UnreadNotificationCount.user_id.in_(user_ids)
+            ).values(
+                unread_count=UnreadNotificationCount.unread_count + delta
+            ).execution_options(synchronize_session=False)
+        )
+        if result.rowcount == len(user_ids):
+            continue
+        
+        # Users notified before the counters existed, or never notified
+        existing = {
+            user_id for (user_id,) in
+            db.session.query(UnreadNotificationCount.user_id).filter(
+                UnreadNotificationCount.user_id.in_(user_ids)
+            ).all()
+        }
+        for user_id in user_ids:
+            if user_id not in existing:
+                _create_unread_count(user_id, delta)
+
+def _count_unread_many(user_ids):
+    """
+    Get the unread counts of several users from their counters
+    
+    Users without a counter yet are counted from the notification table.
+    """
+    unread = dict(
+        db.session.query(
+            UnreadNotificationCount.user_id,
+            UnreadNotificationCount.unread_count
+        ).filter(UnreadNotificationCount.user_id.in_(user_ids)).all()
+    )
+    
+    missing = [user_id for user_id in user_ids if user_id not in unread]
+    if missing:
+        unread.update(dict.fromkeys(missing, 0))
+        unread.update(
+            db.session.query(
+                Notification.user_id,
+                func.count(Notification.notification_id)
+            ).filter(
+                Notification.user_id.in_(missing),
+                Notification.read == False
+            ).group_by(Notification.user_id).all()
+        )
+    
+    return unread
+
+def get_unread_count(user_id):
     """
-    Get or create a notification observer for a user
+    Get a user's unread notification count from their counter
     
     Args:
         user_id (int): ID of the user
         
     Returns:
-        UserNotificationObserver: The observer for the user
+        int: Number of unread notifications
     """
-    global notification_observers
+    return _count_unread_many([user_id])[user_id]
+
+def reconcile_unread_counts(dry_run=False, user_ids=None):
+    """
+    Rebuild unread counters from the notification table
+    
+    Creates missing counters and fixes drifted ones. A counter is only
+    overwritten if it still holds the value that was checked, so changes
+    committed meanwhile are never lost; they are checked again next run.
+    
+    Args:
+        dry_run (bool): Only report drift without fixing it (default: False)
+        user_ids (iterable, optional): Only check these users
+        
+    Returns:
+        list: Drift found, one entry per user whose counter was missing or wrong
+    """
+    unread_stats = db.session.query(
+        Notification.user_id.label('user_id'),
+        func.count(Notification.notification_id).label('unread_count')
+    ).filter(
+        Notification.read == False
+    ).group_by(
+        Notification.user_id
+    ).subquery()
+    
+    expected_count = func.coalesce(unread_stats.c.unread_count, 0)
+    
+    query = db.session.query(
+        User.user_id,
+        UnreadNotificationCount.user_id,
+        UnreadNotificationCount.unread_count,
+        expected_count
+    ).outerjoin(
+        UnreadNotificationCount, UnreadNotificationCount.user_id == User.user_id
+    ).outerjoin(
+        unread_stats, unread_stats.c.user_id == User.user_id
+    ).filter(
+        or_(
+            # Users without notifications don't need a counter
+            (UnreadNotificationCount.user_id.is_(None)) & (expected_count > 0),
+            UnreadNotificationCount.unread_count != expected_count
+        )
+    )
     
-    if user_id not in notification_observers:
-        observer = UserNotificationObserver(user_id)
-        notification_subject = get_notification_subject()
-        notification_subject.attach(observer)
-        notification_observers[user_id] = observer
+    if user_ids is not None:
+        query = query.filter(User.user_id.in_(list(user_ids)))
     
-    return notification_observers[user_id]
+    drift = []
+    for user_id, counter_id, unread_count, expected_unread_count in query.all():
+        drift.append({
+            "userID": user_id,
+            "missing": counter_id is None,
+            "unreadCount": unread_count,
+            "expectedUnreadCount": expected_unread_count
+        })
+        
+        if dry_run:
+            continue
+        
+        if counter_id is None:
+            _create_unread_count(user_id, 0)
+        else:
+            db.session.execute(
+                update(UnreadNotificationCount).where(
+                    UnreadNotificationCount.user_id == user_id,
+                    UnreadNotificationCount.unread_count == unread_count
+                ).values(
+                    unread_count=expected_unread_count
+                ).execution_options(synchronize_session=False)
+            )
+    
+    if not dry_run:
+        db.session.commit()
+    
+    if drift:
+        logger.warning(f"Unread notification counters drifted for {len(drift)} user(s)")
+    
+    return drift
+
+def _push_to_user(user_id, event, data, unread_count=None):
+    """
+    Send an event to the sockets of a user, with their current unread count
+    
+    Pushing is best effort: the notification is already stored, and clients
+    reconcile with GET /api/notifications, so errors are only logged.
+    """
+    try:
+        if unread_count is None:
+            unread_count = get_unread_count(user_id)
+        socketio.emit(event, dict(data, unreadCount=unread_count), room=user_room(user_id))
+    except Exception as e:
+        logger.error(f"Error pushing {event} to user {user_id}: {str(e)}")
 
 def create_notification(user_id, message):
     """
-    Create a new notification for a user using the observer pattern
+    Create a new notification for a user and push it to their sockets
+    
+    The row is stored here rather than by an observer, so it does not depend
+    on the user still being registered on the notification subject; the
+    wildcard observers are told once it is stored.
     
     Args:
         user_id (int): ID of the user
@@ -41,31 +235,429 @@ def create_notification(user_id, message):
         tuple: (notification, error)
     """
     try:
-        # Check if user exists
-        user = User.query.get(user_id)
-        if not user:
-            return None, f"User with ID {user_id} not found"
-            
-        # Use the observer pattern to create the notification
-        notification_subject = get_notification_subject()
-        
-        # Ensure the user has an observer
-        get_or_create_observer(user_id)
-        
-        # Notify all observers (only the matching user_id observer will process it)
-        notification_subject.notify({
-            'user_id': user_id,
-            'message': message,
-            'time': datetime.utcnow()
-        })
+        created = _store_notifications([(user_id, message, None)])
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error creating notification: {str(e)}")
+        return None, str(e)
+    
+    if not created:
+        return None, f"User with ID {user_id} not found"
+    
+    _publish_notifications(created)
+    
+    return db.session.get(Notification, created[0][1]["id"]), None
+
+def _close_expired_groups(pairs, since):
+    """
+    Stop merging into unread notifications whose group was last updated before since
+    
+    Clearing their group key takes them out of the unique index on open
+    groups, so a new notification of the group can be inserted.
+    
+    Args:
+        pairs (iterable): (user_id, group_key) pairs
+        since (datetime): Groups last updated before this time are closed
+    """
+    pairs = set(pairs)
+    db.session.execute(
+        update(Notification).where(
+            Notification.user_id.in_({user_id for user_id, _ in pairs}),
+            Notification.group_key.in_({group_key for _, group_key in pairs}),
+            Notification.read == False,
+            Notification.time < since
+        ).values(group_key=None).execution_options(synchronize_session=False)
+    )
+
+def _find_open_groups(pairs, since):
+    """
+    Find the unread notifications new ones of the same group are merged into
+    
+    Args:
+        pairs (iterable): (user_id, group_key) pairs
+        since (datetime): Only groups last updated after this time are open
+        
+    Returns:
+        dict: (notification_id, group_count) of the newest open row per pair
+    """
+    pairs = set(pairs)
+    rows = db.session.query(
+        Notification.notification_id,
+        Notification.user_id,
+        Notification.group_key,
+        Notification.group_count
+    ).filter(
+        Notification.user_id.in_({user_id for user_id, _ in pairs}),
+        Notification.group_key.in_({group_key for _, group_key in pairs}),
+        Notification.read == False,
+        Notification.time >= since
+    ).order_by(desc(Notification.time)).all()
+    
+    open_groups = {}
+    for notification_id, user_id, group_key, group_count in rows:
+        if (user_id, group_key) in pairs:
+            open_groups.setdefault((user_id, group_key), (notification_id, group_count or 1))
+    return open_groups
+
+def _resolve_notices(entries):
+    """
+    Render the Notice objects among entries into (user_id, message, group) triples
+    
+    The rides and users the notices refer to are loaded with one query each
+    for the whole batch. Notices whose ride or actor no longer exists are
+    skipped, as the routes used to skip them.
+    
+    Args:
+        entries (list): (user_id, message, group) triples and Notice objects
+        
+    Returns:
+        list: The entries with every notice rendered
+    """
+    notices = [entry for entry in entries if isinstance(entry, Notice)]
+    if not notices:
+        return entries
+    
+    ride_ids = {notice.ride_id for notice in notices if notice.ride_id is not None}
+    rides = {}
+    if ride_ids:
+        rides = {
+            ride_id: (driver_id, starting_location, dropoff_location)
+            for ride_id, driver_id, starting_location, dropoff_location in db.session.query(
+                Ride.ride_id,
+                Ride.driver_id,
+                Ride.starting_location,
+                Ride.dropoff_location
+            ).filter(Ride.ride_id.in_(ride_ids)).all()
+        }
+    
+    actor_ids = {notice.actor_id for notice in notices if notice.actor_id is not None}
+    names = {}
+    if actor_ids:
+        names = dict(db.session.query(User.user_id, User.name).filter(User.user_id.in_(actor_ids)).all())
+    
+    resolved = []
+    for entry in entries:
+        if not isinstance(entry, Notice):
+            resolved.append(entry)
+            continue
         
-        # Get the most recent notification for this user to return
-        notification = Notification.query.filter_by(user_id=user_id).order_by(desc(Notification.time)).first()
+        context = dict(entry.context)
+        recipient = entry.recipient
+        if entry.ride_id is not None:
+            ride = rides.get(entry.ride_id)
+            if ride is None:
+                logger.warning(f"Skipping {entry.kind} notification for unknown ride {entry.ride_id}")
+                continue
+            driver_id, context['from_location'], context['to_location'] = ride
+            if recipient == RIDE_DRIVER:
+                recipient = driver_id
+        if entry.actor_id is not None:
+            if entry.actor_id not in names:
+                logger.warning(f"Skipping {entry.kind} notification for unknown user {entry.actor_id}")
+                continue
+            context['actor'] = names[entry.actor_id]
         
-        return notification, None
+        template, digest_template = NOTICE_TEMPLATES[entry.kind]
+        group = None
+        if digest_template:
+            group = ride_group(
+                entry.kind, entry.ride_id,
+                lambda count, digest_template=digest_template, context=context:
+                    digest_template.format(count=count, **context)
+            )
+        resolved.append((recipient, template.format(**context), group))
+    
+    return resolved
+
+def _store_notifications(entries):
+    """
+    Insert notifications in the current transaction and commit
+    
+    Recipients are validated with one query and unknown users are skipped.
+    The rows are inserted together, so the cost no longer grows by a lookup,
+    an observer round and a commit per recipient. Errors are raised, so
+    callers can decide whether to retry.
+    
+    Grouped notifications are coalesced: an unread notification of the same
+    group updated within NOTIFICATION_COALESCE_WINDOW seconds is updated in
+    place with the new count and digest message and moved to the top,
+    instead of a row being added. Merging doesn't change the unread count.
+    
+    Args:
+        entries (list): (user_id, message, group) triples or Notice objects;
+            a user may appear more than once. group is None, or a
+            (group_key, digest) pair where digest(count) returns the message
+            standing for count notifications
+        
+    Returns:
+        list: (user_id, formatted notification) pairs for the stored or updated rows
+    """
+    entries = _resolve_notices(entries)
+    if not entries:
+        return []
+    
+    user_ids = list(dict.fromkeys(user_id for user_id, _, _ in entries))
+    existing = {
+        user_id for (user_id,) in
+        db.session.query(User.user_id).filter(User.user_id.in_(user_ids)).all()
+    }
+    missing = [user_id for user_id in user_ids if user_id not in existing]
+    if missing:
+        logger.warning(f"Skipping notifications for unknown users {missing}")
+    
+    window = current_app.config.get('NOTIFICATION_COALESCE_WINDOW', 0)
+    
+    # Grouped notifications in this batch are merged with each other first;
+    # each pending row is [user_id, message, group_key, group_count, digest]
+    pending = []
+    by_group = {}
+    for user_id, message, group in entries:
+        if user_id not in existing:
+            continue
+        # Without a window nothing is merged, so the group is not recorded
+        group_key, digest = group if group and window > 0 else (None, None)
+        row = by_group.get((user_id, group_key)) if group_key else None
+        if row:
+            row[3] += 1
+            row[1] = digest(row[3])
+            continue
+        row = [user_id, message, group_key, 1, digest]
+        pending.append(row)
+        if group_key:
+            by_group[(user_id, group_key)] = row
+    if not pending:
+        return []
+    
+    now = datetime.utcnow()
+    since = now - timedelta(seconds=window)
+    created = []
+    
+    if by_group:
+        _close_expired_groups(by_group.keys(), since)
+    
+    # A worker storing the same group concurrently can open it between the
+    # lookup and the insert; the unique index on open groups rejects the
+    # insert, and the lookup is repeated to merge into that worker's row
+    for attempt in range(1, MAX_GROUP_CONFLICT_ATTEMPTS + 1):
+        grouped = {(row[0], row[2]): row for row in pending if row[2]}
+        if grouped:
+            open_groups = _find_open_groups(grouped.keys(), since)
+            for pair, (notification_id, group_count) in open_groups.items():
+                row = grouped[pair]
+                count = group_count + row[3]
+                message = row[4](count)
+                # Only merged if the row is still unread and nobody merged into it meanwhile
+                result = db.session.execute(
+                    update(Notification).where(
+                        Notification.notification_id == notification_id,
+                        Notification.read == False,
+                        Notification.group_count == group_count
+                    ).values(
+                        message=message,
+                        group_count=count,
+                        time=now
+                    ).execution_options(synchronize_session=False)
+                )
+                if result.rowcount:
+                    pending.remove(row)
+                    created.append((row[0], {
+                        "id": notification_id,
+                        "message": message,
+                        "read": False,
+                        "time": now.isoformat(),
+                        "count": count
+                    }))
+        
+        if not pending:
+            break
+        
+        rows = [
+            {
+                'user_id': user_id,
+                'message': message,
+                'read': False,
+                'time': now,
+                'group_key': group_key,
+                'group_count': group_count
+            }
+            for user_id, message, group_key, group_count, _ in pending
+        ]
+        
+        try:
+            # One multi-row INSERT; each returned ID comes with its row's values, so
+            # the order the database returns them in does not matter
+            with db.session.begin_nested():
+                inserted = db.session.execute(
+                    insert(Notification).returning(
+                        Notification.notification_id,
+                        Notification.user_id,
+                        Notification.message,
+                        Notification.group_count
+                    ),
+                    rows
+                ).all()
+        except IntegrityError:
+            if attempt == MAX_GROUP_CONFLICT_ATTEMPTS:
+                raise
+            logger.info(f"Notification group opened concurrently, merging again (attempt {attempt})")
+            continue
+        
+        deltas = {}
+        for row in rows:
+            deltas[row['user_id']] = deltas.get(row['user_id'], 0) + 1
+        _adjust_unread_counts(deltas)
+        
+        created.extend(
+            (user_id, {
+                "id": notification_id,
+                "message": message,
+                "read": False,
+                "time": now.isoformat(),
+                "count": group_count
+            })
+            for notification_id, user_id, message, group_count in inserted
+        )
+        break
+    
+    db.session.commit()
+    return created
+
+def _publish_notifications(created):
+    """
+    Push stored notifications to their users' sockets and the wildcard observers
+    
+    Args:
+        created (list): (user_id, formatted notification) pairs from _store_notifications
+    """
+    if not created:
+        return
+    
+    try:
+        unread_counts = _count_unread_many(list({user_id for user_id, _ in created}))
     except Exception as e:
-        logger.error(f"Error creating notification: {str(e)}")
+        logger.error(f"Error counting unread notifications: {str(e)}")
+        unread_counts = {}
+    
+    notification_subject = get_notification_subject()
+    for user_id, formatted in created:
+        _push_to_user(user_id, 'notification', {'notification': formatted}, unread_counts.get(user_id))
+        # The rows are already stored, so only wildcard observers are told
+        notification_subject.notify(dict(formatted, user_id=user_id), topic=WILDCARD)
+
+def _insert_notifications(entries):
+    """
+    Store notifications in a single transaction and push them
+    
+    Args:
+        entries (list): (user_id, message, group) triples or Notice objects,
+            see _store_notifications
+        
+    Returns:
+        tuple: (notification_ids, error)
+            - notification_ids: Dict mapping each notified user ID to the new
+              notification's ID, or the ID of the notification it was merged into
+            - error: Error message if unsuccessful, None otherwise
+    """
+    try:
+        created = _store_notifications(entries)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error creating notifications: {str(e)}")
         return None, str(e)
+    
+    _publish_notifications(created)
+    
+    return {user_id: formatted["id"] for user_id, formatted in created}, None
+
+def notify_many(user_ids, message, group=None):
+    """
+    Send the same notification to several users at once
+    
+    Args:
+        user_ids (iterable): IDs of the recipients; duplicates are ignored
+        message (str): Notification message
+        group (tuple, optional): (group_key, digest) the notification is
+            coalesced by, see _store_notifications
+        
+    Returns:
+        tuple: (notification_ids, error)
+            - notification_ids: Dict mapping each notified user ID to the new
+              notification's ID; unknown users are left out
+            - error: Error message if unsuccessful, None otherwise
+    """
+    return _insert_notifications([(user_id, message, group) for user_id in dict.fromkeys(user_ids)])
+
+def notify_many_templated(template, recipients, **context):
+    """
+    Send a notification rendered per recipient from a template
+    
+    Args:
+        template (str): Message template in str.format syntax
+        recipients (dict): Template values for each recipient user ID,
+            overriding the shared context
+        **context: Template values shared by all recipients
+        
+    Returns:
+        tuple: (notification_ids, error), as for notify_many
+    """
+    try:
+        messages = {
+            user_id: template.format(**{**context, **(values or {})})
+            for user_id, values in recipients.items()
+        }
+    except (KeyError, IndexError) as e:
+        return None, f"Missing template value: {str(e)}"
+    
+    return _insert_notifications([(user_id, message, None) for user_id, message in messages.items()])
+
+def queue_notification(user_ids, message, group=None):
+    """
+    Hand notifications to the background dispatcher
+    
+    Routes use this so that storing and pushing notifications stays off the
+    request path. When the dispatcher is disabled, or its queue stays full,
+    the notifications are delivered right away with notify_many instead.
+    
+    Args:
+        user_ids (iterable): IDs of the recipients; duplicates are ignored
+        message (str): Notification message
+        group (tuple, optional): (group_key, digest) the notification is
+            coalesced by, see _store_notifications
+        
+    Returns:
+        tuple: (queued, error)
+            - queued: True if queued, or the notification IDs if delivered right away
+            - error: Error message if unsuccessful, None otherwise
+    """
+    from app.services.notification_dispatcher import get_notification_dispatcher
+    
+    user_ids = list(dict.fromkeys(user_ids))
+    dispatcher = get_notification_dispatcher()
+    if dispatcher and dispatcher.submit([(user_id, message, group) for user_id in user_ids]):
+        return True, None
+    
+    return notify_many(user_ids, message, group)
+
+def queue_notices(notices):
+    """
+    Hand notices to the background dispatcher, which fills in their text
+    
+    Like queue_notification, but the route passes only IDs and the lookups
+    needed to word the notification run on the dispatcher's worker.
+    
+    Args:
+        notices (list): Notice objects
+        
+    Returns:
+        tuple: (queued, error), as for queue_notification
+    """
+    from app.services.notification_dispatcher import get_notification_dispatcher
+    
+    dispatcher = get_notification_dispatcher()
+    if dispatcher and dispatcher.submit(notices):
+        return True, None
+    
+    return _insert_notifications(notices)
 
 def get_user_notifications(user_id, page=1, size=20, unread_only=False):
     """
@@ -86,25 +678,21 @@ def get_user_notifications(user_id, page=1, size=20, unread_only=False):
     # Create base query
     query = Notification.query.filter(Notification.user_id == user_id)
     
+    # The unread count comes from the user's counter instead of a count() query
+    unread_count = get_unread_count(user_id)
+    
     # Filter by read status if unread_only is True
     if unread_only:
         query = query.filter(Notification.read == False)
-    
-    # Get total count
-    total = query.count()
+        total = unread_count
+    else:
+        total = query.count()
     
     # Get paginated notifications
     notifications = query.order_by(desc(Notification.time)).offset(offset).limit(size).all()
     
     # Format notifications
-    formatted_notifications = []
-    for notification in notifications:
-        formatted_notifications.append({
-            "id": notification.notification_id,
-            "message": notification.message,
-            "read": notification.read,
-            "time": notification.time.isoformat()
-        })
+    formatted_notifications = [_format_notification(notification) for notification in notifications]
     
     # Calculate total pages
     total_pages = (total + size - 1) // size if total > 0 else 1
@@ -123,7 +711,7 @@ def get_user_notifications(user_id, page=1, size=20, unread_only=False):
             "nextPage": next_page,
             "prevPage": prev_page
         },
-        "unreadCount": query.filter(Notification.read == False).count()
+        "unreadCount": unread_count
     }
 
 def mark_notification_read(notification_id, user_id):
@@ -147,10 +735,17 @@ def mark_notification_read(notification_id, user_id):
         if notification.user_id != user_id:
             return False, "You do not have permission to access this notification"
         
-        # Update notification
-        notification.read = True
+        # Update notification; only the request that flips it adjusts the counter
+        updated = Notification.query.filter_by(
+            notification_id=notification_id,
+            read=False
+        ).update({Notification.read: True}, synchronize_session='fetch')
+        _adjust_unread_counts({user_id: -updated})
         db.session.commit()
         
+        # Keep the user's other open sockets in step
+        _push_to_user(user_id, 'notifications_read', {'ids': [notification_id]})
+        
         return True, None
     except Exception as e:
         db.session.rollback()
@@ -174,8 +769,11 @@ def mark_all_notifications_read(user_id):
             Notification.read == False
         ).update({Notification.read: True})
         
+        _adjust_unread_counts({user_id: -result})
         db.session.commit()
         
+        _push_to_user(user_id, 'notifications_read', {'all': True})
+        
         return result, None
     except Exception as e:
         db.session.rollback()
@@ -184,37 +782,131 @@ def mark_all_notifications_read(user_id):
 
 # Helper functions for creating notifications for specific actions
 
-def notify_ride_request(ride_id, driver_id, passenger_id, passenger_name, from_location, to_location):
-    """Create a notification for a ride request"""
-    message = f"New ride request from {passenger_name} for the trip from {from_location} to {to_location}"
-    return create_notification(driver_id, message)
+def ride_group(kind, ride_id, digest):
+    """
+    Build the group coalescing notifications of one kind about a ride
+    
+    Args:
+        kind (str): Kind of notification, e.g. 'ride_request'
+        ride_id (int): ID of the ride
+        digest (callable): Returns the message standing for a number of
+            merged notifications
+        
+    Returns:
+        tuple: (group_key, digest), or None without a ride ID
+    """
+    if ride_id is None:
+        return None
+    return (f"{kind}:{ride_id}", digest)
+
+# Recipient of a notice that is the driver of the notice's ride
+RIDE_DRIVER = 'driver'
+
+# Message and digest templates of each kind of notice. Templates can use
+# {actor}, {from_location} and {to_location} besides the notice's context;
+# digests also get {count} and coalesce the notices of a ride.
+NOTICE_TEMPLATES = {
+    'ride_request': (
+        "New ride request from {actor} for the trip from {from_location} to {to_location}",
+        "{count} new ride requests for the trip from {from_location} to {to_location}"
+    ),
+    'ride_request_approved': (
+        "Your ride request from {from_location} to {to_location} has been approved by driver {actor}",
+        None
+    ),
+    'ride_request_rejected': (
+        "Your ride request from {from_location} to {to_location} has been rejected by driver {actor}",
+        None
+    ),
+    'ride_request_cancelled': (
+        "Ride request from {actor} for the trip from {from_location} to {to_location} has been cancelled",
+        "{count} ride requests for the trip from {from_location} to {to_location} have been cancelled"
+    ),
+    'ride_published': (
+        "Your ride from {from_location} to {to_location} has been published successfully",
+        None
+    ),
+    'ride_request_submitted': (
+        "You have submitted a ride request from {from_location} to {to_location}",
+        None
+    ),
+    'ride_request_cancelled_passenger': (
+        "You have cancelled your ride request from {from_location} to {to_location}",
+        None
+    ),
+    'ride_completed': (
+        "{actor} has completed the ride from {from_location} to {to_location}.",
+        "{count} passengers have completed the ride from {from_location} to {to_location}."
+    ),
+    'donation_received': (
+        "You received a donation of RM {amount:.2f} from {actor} via {payment_method}.",
+        None
+    )
+}
 
-def notify_ride_request_approved(ride_id, driver_id, driver_name, passenger_id, from_location, to_location):
+class Notice:
+    """
+    A notification given by IDs, worded when it is stored
+    
+    Routes know the IDs involved but not the ride's locations or the users'
+    names; those are loaded for a whole batch of notices at once by
+    _store_notifications, on the dispatcher's worker.
+    """
+    def __init__(self, kind, recipient, ride_id=None, actor_id=None, **context):
+        """
+        Args:
+            kind (str): Key into NOTICE_TEMPLATES
+            recipient: ID of the user notified, or RIDE_DRIVER
+            ride_id (int, optional): Ride the notice is about
+            actor_id (int, optional): User whose name is the template's {actor}
+            **context: Other template values
+        
+        IDs may come straight from request JSON as strings; they are
+        converted here so they match the keys loaded from the database.
+        """
+        self.kind = kind
+        self.recipient = recipient if recipient == RIDE_DRIVER else int(recipient)
+        self.ride_id = int(ride_id) if ride_id is not None else None
+        self.actor_id = int(actor_id) if actor_id is not None else None
+        self.context = context
+
+def notify_ride_request(ride_id, passenger_id):
+    """Create a notification for the driver of a ride a passenger requested"""
+    return queue_notices([Notice('ride_request', RIDE_DRIVER, ride_id, passenger_id)])
+
+def notify_ride_request_approved(ride_id, driver_id, passenger_id):
     """Create a notification for an approved ride request"""
-    message = f"Your ride request from {from_location} to {to_location} has been approved by driver {driver_name}"
-    return create_notification(passenger_id, message)
+    return queue_notices([Notice('ride_request_approved', passenger_id, ride_id, driver_id)])
 
-def notify_ride_request_rejected(ride_id, driver_id, driver_name, passenger_id, from_location, to_location):
+def notify_ride_request_rejected(ride_id, driver_id, passenger_id):
     """Create a notification for a rejected ride request"""
-    message = f"Your ride request from {from_location} to {to_location} has been rejected by driver {driver_name}"
-    return create_notification(passenger_id, message)
+    return queue_notices([Notice('ride_request_rejected', passenger_id, ride_id, driver_id)])
 
-def notify_ride_request_cancelled(ride_id, driver_id, passenger_id, passenger_name, from_location, to_location):
-    """Create a notification for a cancelled ride request"""
-    message = f"Ride request from {passenger_name} for the trip from {from_location} to {to_location} has been cancelled"
-    return create_notification(driver_id, message)
+def notify_ride_request_cancelled(ride_id, passenger_id):
+    """Create a notification for the driver of a ride whose request was cancelled"""
+    return queue_notices([Notice('ride_request_cancelled', RIDE_DRIVER, ride_id, passenger_id)])
 
-def notify_ride_published(driver_id, driver_name, from_location, to_location):
+def notify_ride_published(ride_id, driver_id):
     """Create a notification for a published ride"""
-    message = f"Your ride from {from_location} to {to_location} has been published successfully"
-    return create_notification(driver_id, message)
+    return queue_notices([Notice('ride_published', driver_id, ride_id)])
 
-def notify_ride_request_submitted(passenger_id, from_location, to_location):
+def notify_ride_request_submitted(ride_id, passenger_id):
     """Create a notification for a passenger who submitted a ride request"""
-    message = f"You have submitted a ride request from {from_location} to {to_location}"
-    return create_notification(passenger_id, message)
+    return queue_notices([Notice('ride_request_submitted', passenger_id, ride_id)])
 
-def notify_ride_request_cancelled_passenger(passenger_id, from_location, to_location):
+def notify_ride_request_cancelled_passenger(ride_id, passenger_id):
     """Create a notification for a passenger who cancelled their ride request"""
-    message = f"You have cancelled your ride request from {from_location} to {to_location}"
-    return create_notification(passenger_id, message) 
\ No newline at end of file
+    return queue_notices([Notice('ride_request_cancelled_passenger', passenger_id, ride_id)])
+
+def notify_ride_completed(ride_id, passenger_id):
+    """Create a notification for a driver whose passenger completed the ride"""
+    return queue_notices([Notice('ride_completed', RIDE_DRIVER, ride_id, passenger_id)])
+
+def notify_donation_received(recipient_id, donor_id, amount, payment_method):
+    """Create a notification for a user who received a donation"""
+    return queue_notices([Notice(
+        'donation_received', recipient_id,
+        actor_id=donor_id,
+        amount=amount,
+        payment_method=payment_method.capitalize()
+    )])
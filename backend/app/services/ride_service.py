@@ -1,6 +1,12 @@
 from app.models import Ride, db, User, Driver, PassengerRide
-from sqlalchemy import desc, and_, asc
+from sqlalchemy import desc, and_, or_, asc, func, tuple_, select, literal, null, union_all
+from sqlalchemy.orm import joinedload, selectinload
 from app.utils.builders import RideBuilder, PassengerRideBuilder, Director
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils import location_index
+from app.utils.loaders import get_user_loader
+from app.utils.ride_rooms import ride_rooms
+from app.services.ride_updates import publish_ride_update
 from datetime import datetime, timedelta
 import logging
 from app import socketio
@@ -10,9 +16,206 @@ def format_time_simple(dt):
     """Format datetime to simple time format (e.g., '05:00 PM')"""
     return dt.strftime("%I:%M %p").lstrip("0")
 
-def get_all_rides(page=1, size=20, starting_location=None, dropoff_location=None, request_time=None, seats=None):
+def _approved_count_subquery():
+    """Build a subquery of approved passenger counts grouped by ride"""
+    return db.session.query(
+        PassengerRide.ride_id.label('ride_id'),
+        func.count(PassengerRide.user_id).label('approved_count')
+    ).filter(
+        PassengerRide.status == "approved"
+    ).group_by(
+        PassengerRide.ride_id
+    ).subquery()
+
+def adjust_seat_counters(ride_id, delta):
     """
-    Get all rides with pagination and filtering, excluding completed rides
+    Adjust a ride's seat counters by the change in approved passengers
+    
+    The update is a single SQL statement in the caller's transaction, so it is
+    committed or rolled back together with the passenger status change. Seats
+    are only claimed while enough of them are available: the capacity check is
+    part of the UPDATE's WHERE clause, so concurrent approvals cannot overbook
+    a ride and approvals for different rides never wait on each other.
+    
+    Args:
+        ride_id (int): ID of the ride
+        delta (int): Change in the number of approved passengers
+        
+    Returns:
+        bool: False if the seats could not be claimed
+    """
+    query = db.session.query(Ride).filter(Ride.ride_id == ride_id)
+    if delta > 0:
+        query = query.filter(Ride.available_seats >= delta)
+    
+    updated = query.update({
+        Ride.approved_count: Ride.approved_count + delta,
+        Ride.available_seats: Ride.available_seats - delta
+    })
+    
+    return updated == 1
+
+def _set_passenger_ride_status(passenger_ride, status):
+    """
+    Compare-and-set a passenger ride status, keeping the ride's seat counters in step
+    
+    The status only changes if it still has the value that was read, so retried
+    or concurrent requests cannot apply the same transition twice.
+    
+    Returns:
+        tuple: (success, error)
+    """
+    previous_status = passenger_ride.status
+    
+    updated = PassengerRide.query.filter_by(
+        user_id=passenger_ride.user_id,
+        ride_id=passenger_ride.ride_id,
+        status=previous_status
+    ).update({PassengerRide.status: status})
+    
+    if updated != 1:
+        return False, "Ride request was modified by another request, please try again"
+    
+    delta = int(status == "approved") - int(previous_status == "approved")
+    if delta and not adjust_seat_counters(passenger_ride.ride_id, delta):
+        ride = Ride.query.get(passenger_ride.ride_id)
+        return False, f"Cannot approve request: Ride has reached maximum capacity of {ride.passenger_count} passengers"
+    
+    return True, None
+
+def reconcile_seat_counters(dry_run=False):
+    """
+    Rebuild ride seat counters from approved passenger_ride rows
+    
+    Args:
+        dry_run (bool): Only report drift without fixing it (default: False)
+        
+    Returns:
+        list: Drift found, one entry per ride whose counters were wrong
+    """
+    approved_counts = _approved_count_subquery()
+    actual_approved = func.coalesce(approved_counts.c.approved_count, 0)
+    expected_available = func.coalesce(Ride.passenger_count, 0) - actual_approved
+    
+    drifted = db.session.query(
+        Ride.ride_id,
+        Ride.approved_count,
+        Ride.available_seats,
+        actual_approved,
+        expected_available
+    ).outerjoin(
+        approved_counts, approved_counts.c.ride_id == Ride.ride_id
+    ).filter(
+        or_(
+            Ride.approved_count.is_(None),
+            Ride.available_seats.is_(None),
+            Ride.approved_count != actual_approved,
+            Ride.available_seats != expected_available
+        )
+    ).all()
+    
+    drift = []
+    for ride_id, approved_count, available_seats, expected_approved_count, expected_available_seats in drifted:
+        drift.append({
+            "rideID": ride_id,
+            "approvedCount": approved_count,
+            "expectedApprovedCount": expected_approved_count,
+            "availableSeats": available_seats,
+            "expectedAvailableSeats": expected_available_seats
+        })
+        
+        if not dry_run:
+            db.session.query(Ride).filter(Ride.ride_id == ride_id).update({
+                Ride.approved_count: expected_approved_count,
+                Ride.available_seats: expected_available_seats
+            })
+    
+    if not dry_run:
+        db.session.commit()
+    
+    return drift
+
+def _location_matches(starting_location=None, dropoff_location=None, search_mode=None):
+    """Build the full-text location match subquery, or None when substring matching applies"""
+    if search_mode != 'fulltext' or not location_index.is_available():
+        return None
+    
+    match_query = location_index.build_match_query(starting_location, dropoff_location)
+    if not match_query:
+        return None
+    
+    return location_index.location_match_subquery(match_query)
+
+def _ride_search_filters(starting_location=None, dropoff_location=None, seats=None):
+    """Build the SQL filters shared by the offset and cursor ride searches"""
+    # Only get rides that are not completed, scheduled in the future and not fully booked
+    current_time = datetime.now()
+    filters = [
+        Ride.status != "completed",
+        Ride.request_time >= current_time,
+        Ride.available_seats > 0
+    ]
+    
+    # Apply additional filters if provided
+    if starting_location:
+        filters.append(Ride.starting_location.ilike(f'%{starting_location}%'))
+    
+    if dropoff_location:
+        filters.append(Ride.dropoff_location.ilike(f'%{dropoff_location}%'))
+    
+    if seats and seats.isdigit():
+        filters.append(Ride.available_seats >= int(seats))
+    
+    return filters
+
+def _ride_search_query(filters, location_matches=None, ranked=False):
+    """Build the ride search query returning (Ride, driver_name) rows"""
+    query = db.session.query(
+        Ride,
+        User.name.label('driver_name')
+    )
+    
+    # Restrict to full-text location matches, best matches first when ranked
+    order_by = [asc(Ride.request_time), asc(Ride.ride_id)]
+    if location_matches is not None:
+        query = query.join(location_matches, location_matches.c.ride_id == Ride.ride_id)
+        if ranked:
+            order_by.insert(0, asc(location_matches.c.rank))
+    
+    return query.outerjoin(Driver, Ride.driver_id == Driver.user_id)\
+        .outerjoin(User, Driver.user_id == User.user_id)\
+        .filter(*filters)\
+        .order_by(*order_by)
+
+def _count_search_rides(filters, location_matches=None):
+    """Count the rides matching the search filters"""
+    query = db.session.query(func.count(Ride.ride_id))
+    if location_matches is not None:
+        query = query.join(location_matches, location_matches.c.ride_id == Ride.ride_id)
+    
+    return query.filter(*filters).scalar()
+
+def _format_search_ride(ride, driver_name):
+    """Format a ride search row for the ride board"""
+    return {
+        "rideID": ride.ride_id,
+        "driverID": ride.driver_id,
+        "startingLocation": ride.starting_location,
+        "dropoffLocation": ride.dropoff_location,
+        "requestTime": ride.request_time.isoformat(),
+        "status": ride.status,
+        "Passenger_count": ride.passenger_count,
+        "approvedPassengerCount": ride.approved_count,
+        "availableSeats": ride.available_seats,
+        "driverName": driver_name or "Unknown Driver"
+    }
+
+def get_all_rides(page=1, size=20, starting_location=None, dropoff_location=None, request_time=None, seats=None, search_mode=None):
+    """
+    Get all rides with pagination and filtering, excluding completed and fully booked rides
+    
+    Seat availability is read from the ride's maintained seat counters, so a
+    page costs one count query and one page query regardless of ride count.
     
     Args:
         page (int): Page number (default: 1)
@@ -21,6 +224,8 @@ def get_all_rides(page=1, size=20, starting_location=None, dropoff_location=None
         dropoff_location (str, optional): Filter by dropoff location
         request_time (str, optional): Filter by request time (not used anymore - automatic current time is used)
         seats (int, optional): Filter by available seats
+        search_mode (str, optional): 'fulltext' to match location tokens through the
+            location index and rank rides by relevance (default: substring matching)
         
     Returns:
         dict: Dictionary containing rides and pagination info
@@ -28,79 +233,27 @@ def get_all_rides(page=1, size=20, starting_location=None, dropoff_location=None
     # Calculate offset
     offset = (page - 1) * size
     
-    # Start building the query with the base filter
-    # Only get rides that are not completed and scheduled in the future
-    current_time = datetime.now()
-    query = Ride.query.filter(
-        and_(
-            Ride.status != "completed",
-            Ride.request_time >= current_time
-        )
-    )
-    
-    # Apply additional filters if provided
-    if starting_location:
-        query = query.filter(Ride.starting_location.ilike(f'%{starting_location}%'))
-    
-    if dropoff_location:
-        query = query.filter(Ride.dropoff_location.ilike(f'%{dropoff_location}%'))
+    # Location terms are matched by the full-text index when requested and available
+    location_matches = _location_matches(starting_location, dropoff_location, search_mode)
+    if location_matches is not None:
+        starting_location = dropoff_location = None
     
-    if seats and seats.isdigit():
-        seats_num = int(seats)
-        query = query.filter(Ride.passenger_count >= seats_num)
+    filters = _ride_search_filters(starting_location, dropoff_location, seats)
     
     # Get total count with filters applied
-    total = query.count()
+    total = _count_search_rides(filters, location_matches)
     
     # Calculate total pages
     total_pages = (total + size - 1) // size if total > 0 else 1
     
     # Get rides and their drivers with all filters applied
-    rides_query = db.session.query(Ride, User.name.label('driver_name'))\
-        .filter(Ride.ride_id.in_([r.ride_id for r in query.all()]))\
-        .outerjoin(Driver, Ride.driver_id == Driver.user_id)\
-        .outerjoin(User, Driver.user_id == User.user_id)\
-        .order_by(asc(Ride.request_time))\
+    rides = _ride_search_query(filters, location_matches, ranked=True)\
         .offset(offset)\
-        .limit(size)
-    
-    rides = rides_query.all()
+        .limit(size)\
+        .all()
     
     # Format rides
-    formatted_rides = []
-    for ride_info in rides:
-        ride = ride_info[0]  # The Ride object
-        driver_name = ride_info[1] or "Unknown Driver"  # The driver name, with default if None
-        
-        # Get count of approved passengers for this ride
-        approved_passenger_count = PassengerRide.query.filter_by(
-            ride_id=ride.ride_id,
-            status="approved"
-        ).count()
-        
-        # Skip rides that are fully booked (all seats are taken)
-        if ride.passenger_count == approved_passenger_count:
-            continue
-        
-        # Calculate available seats
-        available_seats = ride.passenger_count - approved_passenger_count
-        
-        # Skip rides that don't have enough available seats for the requested number
-        if seats and seats.isdigit() and available_seats < int(seats):
-            continue
-        
-        formatted_rides.append({
-            "rideID": ride.ride_id,
-            "driverID": ride.driver_id,
-            "startingLocation": ride.starting_location,
-            "dropoffLocation": ride.dropoff_location,
-            "requestTime": ride.request_time.isoformat(),
-            "status": ride.status,
-            "Passenger_count": ride.passenger_count,
-            "approvedPassengerCount": approved_passenger_count,  # Add approved passenger count
-            "availableSeats": available_seats,  # Add available seats count
-            "driverName": driver_name
-        })
+    formatted_rides = [_format_search_ride(*ride_info) for ride_info in rides]
     
     # Calculate pagination values
     next_page = page + 1 if page < total_pages else None
@@ -118,6 +271,68 @@ def get_all_rides(page=1, size=20, starting_location=None, dropoff_location=None
         }
     }
 
+def get_rides_by_cursor(cursor=None, size=20, starting_location=None, dropoff_location=None, seats=None, include_total=False, search_mode=None):
+    """
+    Get rides using keyset pagination ordered by (request_time, ride_id)
+    
+    Each page seeks past the last row of the previous page with a range
+    predicate instead of an OFFSET, so page cost does not grow with depth.
+    
+    Args:
+        cursor (str, optional): Opaque cursor returned as nextCursor by the previous page
+        size (int): Page size (default: 20)
+        starting_location (str, optional): Filter by starting location
+        dropoff_location (str, optional): Filter by dropoff location
+        seats (int, optional): Filter by available seats
+        include_total (bool): Also count all matching rides (default: False)
+        search_mode (str, optional): 'fulltext' to match location tokens through the
+            location index; results keep the keyset order rather than relevance order
+        
+    Returns:
+        tuple: (rides_data, error)
+    """
+    try:
+        location_matches = _location_matches(starting_location, dropoff_location, search_mode)
+        if location_matches is not None:
+            starting_location = dropoff_location = None
+        
+        filters = _ride_search_filters(starting_location, dropoff_location, seats)
+        
+        # Total is optional since it is the only part that scans every match
+        total = _count_search_rides(filters, location_matches) if include_total else None
+        
+        # Seek past the last ride of the previous page
+        if cursor:
+            last_request_time, last_ride_id = decode_cursor(cursor, datetime, int)
+            filters.append(tuple_(Ride.request_time, Ride.ride_id) > (last_request_time, last_ride_id))
+        
+        # Fetch one extra row to find out whether there is a next page
+        rides = _ride_search_query(filters, location_matches)\
+            .limit(size + 1)\
+            .all()
+        
+        has_more = len(rides) > size
+        rides = rides[:size]
+        
+        next_cursor = None
+        if has_more:
+            last_ride = rides[-1][0]
+            next_cursor = encode_cursor(last_ride.request_time, last_ride.ride_id)
+        
+        pagination = {
+            "pageSize": size,
+            "nextCursor": next_cursor
+        }
+        if include_total:
+            pagination["totalRides"] = total
+        
+        return {
+            "rides": [_format_search_ride(*ride_info) for ride_info in rides],
+            "pagination": pagination
+        }, None
+    except ValueError as e:
+        return None, str(e)
+
 def get_driver_ride_requests(driver_id):
     """
     Get all pending ride requests for a specific driver
@@ -211,18 +426,15 @@ def approve_ride_request(ride_id, passenger_id, driver_id):
         if not passenger_ride:
             return None, f"No pending ride request found for passenger {passenger_id} on ride {ride_id}"
         
-        # Check if current approved passengers + 1 would exceed the ride's capacity
-        current_approved_count = PassengerRide.query.filter_by(
-            ride_id=ride_id,
-            status="approved"
-        ).count()
-        
-        if current_approved_count >= ride.passenger_count:
-            return None, f"Cannot approve request: Ride has reached maximum capacity of {ride.passenger_count} passengers"
+        # Approve the request and claim a seat in one transaction; the seat is only
+        # claimed if one is still free when the update runs
+        success, error = _set_passenger_ride_status(passenger_ride, "approved")
+        if not success:
+            db.session.rollback()
+            return None, error
         
-        # Update the status to approved
-        passenger_ride.status = "approved"
         db.session.commit()
+        publish_ride_update(ride_id)
         
         # Format response
         approval_data = {
@@ -568,23 +780,143 @@ def create_ride(driver_id, starting_location, dropoff_location, passenger_count,
             'status': new_ride.status
         }
         
-        # Emit the new ride to all clients in the rides room
-        socketio.emit('new_ride', ride_data, room='rides')
+        # Emit the new ride to the global rides room and to the rooms of its
+        # starting location, so clients browsing one area only get its rides
+        for room in ride_rooms(new_ride.starting_location, new_ride.request_time):
+            socketio.emit('new_ride', ride_data, room=room)
         
         return ride_data, None
     except Exception as e:
         db.session.rollback()
         return None, str(e)
 
-def get_user_ride_history(user_id, page=1, size=20, role=None):
+def _ride_history_branches(user_id, role=None):
+    """Build the passenger and driver branches of a user's ride history"""
+    branches = []
+    
+    # Rides where user is a passenger, with their passenger-specific status
+    if role is None or role == 'passenger':
+        branches.append(
+            select(
+                Ride.ride_id.label('ride_id'),
+                Ride.driver_id.label('driver_id'),
+                User.name.label('driver_name'),
+                Ride.starting_location.label('starting_location'),
+                Ride.dropoff_location.label('dropoff_location'),
+                Ride.request_time.label('request_time'),
+                PassengerRide.status.label('status'),
+                literal('passenger').label('ride_type'),
+                Ride.passenger_count.label('passenger_count')
+            ).join_from(
+                PassengerRide, Ride, PassengerRide.ride_id == Ride.ride_id
+            ).join(
+                Driver, Ride.driver_id == Driver.user_id
+            ).join(
+                User, Driver.user_id == User.user_id
+            ).where(
+                PassengerRide.user_id == user_id
+            )
+        )
+    
+    # Rides where user is the driver
+    if role is None or role == 'driver':
+        branches.append(
+            select(
+                Ride.ride_id.label('ride_id'),
+                Ride.driver_id.label('driver_id'),
+                null().label('driver_name'),
+                Ride.starting_location.label('starting_location'),
+                Ride.dropoff_location.label('dropoff_location'),
+                Ride.request_time.label('request_time'),
+                Ride.status.label('status'),
+                literal('driver').label('ride_type'),
+                Ride.passenger_count.label('passenger_count')
+            ).where(
+                Ride.driver_id == user_id
+            )
+        )
+    
+    return branches
+
+def _ride_history_subquery(user_id, role=None, ride_filter=None, after=None, limit=None):
+    """
+    Build a UNION ALL of the passenger and driver rides of a user
+    
+    Args:
+        user_id (int): ID of the user
+        role (str, optional): Restrict to one role ('driver' or 'passenger')
+        ride_filter (callable, optional): Builds a SQL predicate from a branch's columns
+        after (tuple, optional): Keyset (request_time, ride_id, ride_type) to seek past
+        limit (int, optional): Rows each branch needs to contribute at most
+        
+    Returns:
+        Subquery: The combined ride history rows
+    """
+    selects = []
+    for branch in _ride_history_branches(user_id, role):
+        columns = branch.selected_columns
+        
+        if ride_filter is not None:
+            branch = branch.where(ride_filter(columns))
+        
+        if after is not None:
+            branch = branch.where(
+                tuple_(columns.request_time, columns.ride_id, columns.ride_type) < after
+            )
+        
+        # Each branch only needs to contribute its first rows in history order
+        if limit is not None:
+            branch = branch.order_by(
+                desc(columns.request_time), desc(columns.ride_id)
+            ).limit(limit)
+        
+        selects.append(branch.subquery().select())
+    
+    if len(selects) == 1:
+        return selects[0].subquery('ride_history')
+    
+    return union_all(*selects).subquery('ride_history')
+
+def _format_history_ride(row):
+    """Format a ride history row"""
+    ride = {
+        "rideID": row.ride_id,
+        "driverID": row.driver_id,
+        "startingLocation": row.starting_location,
+        "dropoffLocation": row.dropoff_location,
+        "requestTime": row.request_time.isoformat(),
+        "status": row.status,
+        "rideType": row.ride_type,
+        "passengerCount": row.passenger_count
+    }
+    
+    if row.ride_type == "passenger":
+        ride["driverName"] = row.driver_name or "Unknown Driver"
+    
+    return ride
+
+def _history_order(history):
+    """Most recent rides first, with a stable tie-breaker for keyset pagination"""
+    return [
+        desc(history.c.request_time),
+        desc(history.c.ride_id),
+        desc(history.c.ride_type)
+    ]
+
+def get_user_ride_history(user_id, page=1, size=20, role=None, ride_filter=None):
     """
     Get ride history for a specific user (either as passenger or driver)
     
+    Passenger and driver rides are merged with a single UNION ALL query that is
+    ordered (most recent first) and paginated in SQL.
+    
     Args:
         user_id (int): ID of the user
         page (int): Page number (default: 1)
         size (int): Page size (default: 20)
         role (str, optional): Filter by role ('driver' or 'passenger')
+        ride_filter (callable, optional): Builds a SQL predicate from the history
+            columns (request_time, status, ...), e.g. FilterContext.to_predicate
         
     Returns:
         dict: Dictionary containing ride history and pagination info
@@ -592,105 +924,18 @@ def get_user_ride_history(user_id, page=1, size=20, role=None):
     # Calculate offset
     offset = (page - 1) * size
     
-    # If no role specified or role is passenger, get passenger rides
-    passenger_rides = []
-    if role is None or role == 'passenger':
-        # Get rides where user is a passenger
-        passenger_query = db.session.query(
-            Ride,
-            PassengerRide.status.label('passenger_status'),
-            User.name.label('driver_name')
-        ).join(
-            PassengerRide, Ride.ride_id == PassengerRide.ride_id
-        ).join(
-            Driver, Ride.driver_id == Driver.user_id
-        ).join(
-            User, Driver.user_id == User.user_id
-        ).filter(
-            PassengerRide.user_id == user_id
-        ).order_by(
-            desc(Ride.request_time)
-        )
-        
-        # Count total passenger rides
-        passenger_total = passenger_query.count()
-        
-        # Get paginated passenger rides
-        if role is None:
-            # If querying both roles, split the page size
-            p_size = size // 2 if role is None else size
-            passenger_results = passenger_query.offset(offset).limit(p_size).all()
-        else:
-            passenger_results = passenger_query.offset(offset).limit(size).all()
-        
-        # Format passenger rides
-        for result in passenger_results:
-            ride = result[0]
-            passenger_status = result[1]
-            driver_name = result[2] or "Unknown Driver"
-            
-            passenger_rides.append({
-                "rideID": ride.ride_id,
-                "driverID": ride.driver_id,
-                "driverName": driver_name,
-                "startingLocation": ride.starting_location,
-                "dropoffLocation": ride.dropoff_location,
-                "requestTime": ride.request_time.isoformat(),
-                "status": passenger_status,  # Use passenger-specific status
-                "rideType": "passenger",
-                "passengerCount": ride.passenger_count
-            })
-    
-    # If no role specified or role is driver, get driver rides
-    driver_rides = []
-    driver_total = 0
-    if role is None or role == 'driver':
-        # Get rides where user is the driver
-        driver_query = db.session.query(
-            Ride
-        ).join(
-            Driver, Ride.driver_id == Driver.user_id
-        ).filter(
-            Driver.user_id == user_id
-        ).order_by(
-            desc(Ride.request_time)
-        )
-        
-        # Count total driver rides
-        driver_total = driver_query.count()
-        
-        # Get paginated driver rides
-        if role is None:
-            # If querying both roles, split the page size and adjust offset
-            d_size = size // 2 if role is None else size
-            # If there are more passenger rides than the half page size, adjust driver offset
-            d_offset = max(0, offset - max(0, passenger_total - p_size)) if role is None else offset
-            driver_results = driver_query.offset(d_offset).limit(d_size).all()
-        else:
-            driver_results = driver_query.offset(offset).limit(size).all()
-        
-        # Format driver rides
-        for ride in driver_results:
-            driver_rides.append({
-                "rideID": ride.ride_id,
-                "driverID": ride.driver_id,
-                "startingLocation": ride.starting_location,
-                "dropoffLocation": ride.dropoff_location,
-                "requestTime": ride.request_time.isoformat(),
-                "status": ride.status,
-                "rideType": "driver",
-                "passengerCount": ride.passenger_count
-            })
-    
-    # Combine and sort rides by request time
-    all_rides = passenger_rides + driver_rides
-    all_rides.sort(key=lambda x: x["requestTime"], reverse=True)
-    
-    # Reverse the order of rides (so row 3 becomes row 1, etc.)
-    all_rides = all_rides[::-1]
+    # Count total rides across both roles
+    total = db.session.query(func.count()).select_from(
+        _ride_history_subquery(user_id, role, ride_filter)
+    ).scalar()
     
-    # Calculate total across both types
-    total = passenger_total + driver_total if role is None else (passenger_total if role == 'passenger' else driver_total)
+    # Get the page, letting each role contribute at most offset + size rows
+    history = _ride_history_subquery(user_id, role, ride_filter, limit=offset + size)
+    rows = db.session.query(history)\
+        .order_by(*_history_order(history))\
+        .offset(offset)\
+        .limit(size)\
+        .all()
     
     # Calculate total pages
     total_pages = (total + size - 1) // size if total > 0 else 1
@@ -700,7 +945,7 @@ def get_user_ride_history(user_id, page=1, size=20, role=None):
     prev_page = page - 1 if page > 1 else None
     
     return {
-        "rides": all_rides[:size],  # Limit to page size after sorting
+        "rides": [_format_history_ride(row) for row in rows],
         "pagination": {
             "currentPage": page,
             "pageSize": size,
@@ -711,28 +956,112 @@ def get_user_ride_history(user_id, page=1, size=20, role=None):
         }
     }
 
-def get_ride_details_with_passengers(ride_id, user_role='passenger'):
+def get_user_ride_history_by_cursor(user_id, cursor=None, size=20, role=None, ride_filter=None, include_total=False):
+    """
+    Get ride history for a specific user using keyset pagination
+    
+    Args:
+        user_id (int): ID of the user
+        cursor (str, optional): Opaque cursor returned as nextCursor by the previous page
+        size (int): Page size (default: 20)
+        role (str, optional): Filter by role ('driver' or 'passenger')
+        ride_filter (callable, optional): Builds a SQL predicate from the history columns
+        include_total (bool): Also count all matching rides (default: False)
+        
+    Returns:
+        tuple: (history_data, error)
+    """
+    try:
+        after = decode_cursor(cursor, datetime, int, str) if cursor else None
+        
+        # Fetch one extra row to find out whether there is a next page
+        history = _ride_history_subquery(user_id, role, ride_filter, after=after, limit=size + 1)
+        rows = db.session.query(history)\
+            .order_by(*_history_order(history))\
+            .limit(size + 1)\
+            .all()
+        
+        has_more = len(rows) > size
+        rows = rows[:size]
+        
+        next_cursor = None
+        if has_more:
+            last_row = rows[-1]
+            next_cursor = encode_cursor(last_row.request_time, last_row.ride_id, last_row.ride_type)
+        
+        pagination = {
+            "pageSize": size,
+            "nextCursor": next_cursor
+        }
+        if include_total:
+            pagination["totalRides"] = db.session.query(func.count()).select_from(
+                _ride_history_subquery(user_id, role, ride_filter)
+            ).scalar()
+        
+        return {
+            "rides": [_format_history_ride(row) for row in rows],
+            "pagination": pagination
+        }, None
+    except ValueError as e:
+        return None, str(e)
+
+def load_ride_aggregate(ride_id):
+    """
+    Load a ride together with its driver, car and passenger requests
+    
+    The driver and the driver's user row are joined into the ride query, and
+    the passenger requests with their users are fetched by one extra selectin
+    query, so the cost is two round trips however many passengers there are.
+    
+    Args:
+        ride_id (int): ID of the ride to load
+        
+    Returns:
+        Ride: The ride with driver, driver.user and passenger_rides[].user
+            loaded, or None if it doesn't exist
+    """
+    ride = Ride.query.options(
+        joinedload(Ride.driver).joinedload(Driver.user),
+        selectinload(Ride.passenger_rides).joinedload(PassengerRide.user)
+    ).filter(
+        Ride.ride_id == ride_id
+    ).first()
+    
+    # Share the loaded users with later lookups in the same request
+    if ride:
+        user_loader = get_user_loader()
+        if ride.driver and ride.driver.user:
+            user_loader.prime(ride.driver.user_id, ride.driver.user)
+        for passenger_ride in ride.passenger_rides:
+            if passenger_ride.user:
+                user_loader.prime(passenger_ride.user_id, passenger_ride.user)
+    
+    return ride
+
+def get_ride_details_with_passengers(ride_id, user_role='passenger', ride=None):
     """
     Get detailed information about a ride including all passenger details
     
     Args:
         ride_id (int): ID of the ride to retrieve
         user_role (str): Role of the requesting user ('driver' or 'passenger')
+        ride (Ride, optional): Aggregate already returned by load_ride_aggregate
         
     Returns:
         dict: Dictionary containing ride details and passenger information
     """
-    # Get the ride details
-    ride = Ride.query.get(ride_id)
+    # Get the ride with its driver and passengers
+    if ride is None:
+        ride = load_ride_aggregate(ride_id)
     if not ride:
         return None
     
     # Get driver details
     driver_info = None
     car_info = None
-    if ride.driver_id:
-        driver = User.query.join(Driver, User.user_id == Driver.user_id).filter(Driver.user_id == ride.driver_id).first()
-        driver_details = Driver.query.filter_by(user_id=ride.driver_id).first()
+    driver_details = ride.driver
+    if driver_details:
+        driver = driver_details.user
         
         if driver:
             driver_info = {
@@ -742,19 +1071,15 @@ def get_ride_details_with_passengers(ride_id, user_role='passenger'):
                 "phone": driver.phone
             }
         
-        if driver_details:
-            car_info = {
-                "carNumber": driver_details.car_number,
-                "carType": driver_details.car_type,
-                "carColor": driver_details.car_color
-            }
-    
-    # Get all passenger rides for this ride
-    passenger_rides = PassengerRide.query.filter_by(ride_id=ride_id).all()
+        car_info = {
+            "carNumber": driver_details.car_number,
+            "carType": driver_details.car_type,
+            "carColor": driver_details.car_color
+        }
     
     # Get passenger details for each passenger ride
     passengers = []
-    for passenger_ride in passenger_rides:
+    for passenger_ride in ride.passenger_rides:
         # Filter passengers based on user role
         if user_role == 'driver':
             # For drivers, include approved/accepted/active/completed passengers
@@ -763,7 +1088,7 @@ def get_ride_details_with_passengers(ride_id, user_role='passenger'):
                 continue
         
         # Get passenger information
-        passenger = User.query.get(passenger_ride.user_id)
+        passenger = passenger_ride.user
         if passenger:
             # Create a unique identifier for this passenger ride 
             # using the composite key (user_id and ride_id)
@@ -817,8 +1142,13 @@ def reject_ride_request(ride_id, passenger_id):
             return None, "Ride request not found or already processed"
         
         # Update the passenger ride status
-        passenger_ride.status = 'rejected'
+        success, error = _set_passenger_ride_status(passenger_ride, 'rejected')
+        if not success:
+            db.session.rollback()
+            return None, error
+        
         db.session.commit()
+        publish_ride_update(ride_id)
         
         return passenger_ride, None
     except Exception as e:
@@ -848,8 +1178,13 @@ def cancel_ride_request(ride_id, passenger_id):
             return None, "Ride request not found or already processed"
         
         # Update the passenger ride status to cancelled
-        passenger_ride.status = 'cancelled'
+        success, error = _set_passenger_ride_status(passenger_ride, 'cancelled')
+        if not success:
+            db.session.rollback()
+            return None, error
+        
         db.session.commit()
+        publish_ride_update(ride_id)
         
         return passenger_ride, None
     except Exception as e:
@@ -896,7 +1231,11 @@ def complete_ride(ride_id, passenger_id):
             return None, f"Ride request with status '{passenger_ride.status}' cannot be completed"
         
         # Update the passenger ride status to completed
-        passenger_ride.status = "completed"
+        success, error = _set_passenger_ride_status(passenger_ride, "completed")
+        if not success:
+            db.session.rollback()
+            return None, error
+        
         db.session.commit()
         
         # Check if all passengers have completed the ride
@@ -911,6 +1250,8 @@ def complete_ride(ride_id, passenger_id):
             ride.status = "completed"
             db.session.commit()
         
+        publish_ride_update(ride_id)
+        
         return {
             "message": "Ride marked as completed successfully",
             "rideID": ride_id,
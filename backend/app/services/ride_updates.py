@@ -0,0 +1,112 @@
+import logging
+import threading
+from flask import current_app
+from app import socketio
+from app.models import db, Ride
+from app.utils.ride_rooms import ride_rooms
+
+logger = logging.getLogger(__name__)
+
+class RideUpdatePublisher:
+    """
+    Push ride_updated delta events, coalescing bursts per ride
+
+    Mutators call publish() after committing. The first change to a ride
+    schedules a flush window seconds later; changes to the same ride in the
+    meantime are folded into that flush. Each flush reads the current seat
+    counters and status of every changed ride with one query, so clients
+    always receive the latest committed state, never an intermediate one.
+    """
+    def __init__(self, app, window=0.25):
+        """
+        Args:
+            app (Flask): Application whose database holds the rides
+            window (float): Seconds changes are collected before sending;
+                0 sends every change right away
+        """
+        self.app = app
+        self.window = window
+        self._pending = set()
+        self._scheduled = False
+        self._lock = threading.Lock()
+
+    def publish(self, ride_id):
+        """
+        Announce that a ride's seats or status changed
+
+        Args:
+            ride_id (int): ID of the changed ride
+        """
+        with self._lock:
+            self._pending.add(ride_id)
+            if self._scheduled:
+                return
+            self._scheduled = self.window > 0
+
+        if self.window > 0:
+            socketio.start_background_task(self._flush_later)
+        else:
+            self.flush()
+
+    def _flush_later(self):
+        socketio.sleep(self.window)
+        self.flush()
+
+    def flush(self):
+        """Send the pending updates now"""
+        with self._lock:
+            ride_ids = self._pending
+            self._pending = set()
+            self._scheduled = False
+
+        if not ride_ids:
+            return
+
+        try:
+            with self.app.app_context():
+                rides = db.session.query(
+                    Ride.ride_id,
+                    Ride.available_seats,
+                    Ride.status,
+                    Ride.starting_location,
+                    Ride.request_time
+                ).filter(Ride.ride_id.in_(ride_ids)).all()
+
+            for ride_id, available_seats, status, starting_location, request_time in rides:
+                update = {
+                    'rideID': ride_id,
+                    'availableSeats': available_seats,
+                    'status': status
+                }
+                for room in ride_rooms(starting_location, request_time):
+                    socketio.emit('ride_updated', update, room=room)
+        except Exception as e:
+            logger.error(f"Sending ride updates for rides {sorted(ride_ids)} failed: {str(e)}")
+
+# Publisher shared by the ride service, created on first use
+_publisher = None
+_publisher_lock = threading.Lock()
+
+def get_ride_update_publisher():
+    """Get the publisher for the current application, creating it if needed"""
+    global _publisher
+
+    with _publisher_lock:
+        if _publisher is None:
+            app = current_app._get_current_object()
+            _publisher = RideUpdatePublisher(app, window=app.config.get('RIDE_UPDATE_COALESCE_WINDOW', 0.25))
+        return _publisher
+
+def publish_ride_update(ride_id):
+    """
+    Send a ride_updated event for a committed change to a ride
+
+    Never raises, so a failed push cannot fail the request that changed the ride.
+
+    Args:
+        ride_id (int): ID of the changed ride
+    """
+    try:
+        get_ride_update_publisher().publish(ride_id)
+    except Exception as e:
+        logger.error(f"Cannot publish update for ride {ride_id}: {str(e)}")
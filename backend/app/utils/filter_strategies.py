@@ -1,10 +1,24 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlalchemy import and_, extract, false, func, true
 import re
 
 # Strategy Interface
 class FilterStrategy:
     def filter(self, rides, criteria):
         pass
+    
+    def to_predicate(self, columns, criteria):
+        """
+        Compile the filter into a SQL predicate
+        
+        Args:
+            columns: Column collection exposing request_time and status
+            criteria: The filter criteria value
+            
+        Returns:
+            A SQLAlchemy boolean expression
+        """
+        pass
 
 # Concrete Strategies
 class FilterByStatus(FilterStrategy):
@@ -12,15 +26,21 @@ class FilterByStatus(FilterStrategy):
         if not criteria:
             return rides
         return [ride for ride in rides if ride.get('status', '').lower() == criteria.lower()]
+    
+    def to_predicate(self, columns, criteria):
+        if not criteria:
+            return true()
+        return func.lower(columns.status) == criteria.lower()
 
 class FilterByTime(FilterStrategy):
+    # Criteria should be in format "HH:MM"
+    time_pattern = re.compile(r'^([0-1]?[0-9]|2[0-3]):([0-5][0-9])$')
+    
     def filter(self, rides, criteria):
         if not criteria:
             return rides
         
-        # Criteria should be in format "HH:MM"
-        time_pattern = re.compile(r'^([0-1]?[0-9]|2[0-3]):([0-5][0-9])$')
-        if not time_pattern.match(criteria):
+        if not self.time_pattern.match(criteria):
             return []
         
         # Extract the hour and minute from the criteria
@@ -42,6 +62,19 @@ class FilterByTime(FilterStrategy):
                     continue
         
         return filtered_rides
+    
+    def to_predicate(self, columns, criteria):
+        if not criteria:
+            return true()
+        
+        if not self.time_pattern.match(criteria):
+            return false()
+        
+        hour, minute = criteria.split(':')
+        return and_(
+            extract('hour', columns.request_time) == int(hour),
+            extract('minute', columns.request_time) == int(minute)
+        )
 
 class FilterByDate(FilterStrategy):
     def filter(self, rides, criteria):
@@ -69,6 +102,38 @@ class FilterByDate(FilterStrategy):
                     continue
         
         return filtered_rides
+    
+    def to_predicate(self, columns, criteria):
+        if not criteria:
+            return true()
+        
+        try:
+            day_start = datetime.strptime(criteria, "%Y-%m-%d")
+        except ValueError:
+            return false()
+        
+        # A range over the day keeps the predicate usable by an index on request_time
+        return and_(
+            columns.request_time >= day_start,
+            columns.request_time < day_start + timedelta(days=1)
+        )
+
+# Composite Strategy
+class AllOfFilter(FilterStrategy):
+    """Matches rides that satisfy every (strategy, criteria) pair"""
+    def __init__(self, filters):
+        self.filters = list(filters)
+    
+    def filter(self, rides, criteria=None):
+        for strategy, strategy_criteria in self.filters:
+            rides = strategy.filter(rides, strategy_criteria)
+        return rides
+    
+    def to_predicate(self, columns, criteria=None):
+        return and_(true(), *[
+            strategy.to_predicate(columns, strategy_criteria)
+            for strategy, strategy_criteria in self.filters
+        ])
 
 # Context (FilterContext)
 class FilterContext:
@@ -80,15 +145,25 @@ class FilterContext:
     
     def filter_rides(self, rides, criteria):
         return self.filter_strategy.filter(rides, criteria)
+    
+    def to_predicate(self, columns, criteria):
+        return self.filter_strategy.to_predicate(columns, criteria)
 
-# Singleton instance of FilterContext
-filter_context_instance = None
-
-def get_filter_context_instance():
-    global filter_context_instance
-    if filter_context_instance is None:
-        filter_context_instance = FilterContext(FilterByStatus())  # Default strategy
-    return filter_context_instance
+def build_filter_context(filters):
+    """
+    Create a filter context for a single request
+    
+    Contexts are not shared between requests, so concurrent requests cannot
+    overwrite each other's strategy.
+    
+    Args:
+        filters (list): (filter_type, criteria) pairs, combined with AND
+        
+    Returns:
+        FilterContext: A new context using the matching strategies
+    """
+    strategies = [(FILTER_STRATEGY_MAP[filter_type](), criteria) for filter_type, criteria in filters]
+    return FilterContext(AllOfFilter(strategies))
 
 # Mapping filter types to strategy classes
 FILTER_STRATEGY_MAP = {
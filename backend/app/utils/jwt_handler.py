@@ -3,7 +3,7 @@ import logging
 import inspect
 from functools import wraps
 from flask import request, jsonify, current_app, g
-from app.models import User, UserRole
+from app.utils.principal_cache import resolve_principal
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -45,7 +45,16 @@ def decode_token(token):
         return None, f"Token validation error: {str(e)}"
 
 def token_required(f):
-    """Decorator to protect routes with JWT authentication"""
+    """
+    Decorator to protect routes with JWT authentication
+    
+    The authenticated user is set as request.user and g.user, and passed as
+    current_user if the route takes it. It is a Principal resolved from the
+    principal cache or the token's claims, so most requests make no query.
+    """
+    # Inspected once here instead of on every request
+    wants_current_user = 'current_user' in inspect.signature(f).parameters
+    
     @wraps(f)
     def decorated(*args, **kwargs):
         logger.info(f"Request to protected endpoint: {request.method} {request.path}")
@@ -75,7 +84,7 @@ def token_required(f):
                 return jsonify({"error": "Invalid user ID format in token"}), 401
                 
             logger.info(f"Looking up user with ID: {user_id}")
-            user = User.query.filter_by(user_id=user_id).first()
+            user = resolve_principal(user_id, payload)
             
             if not user:
                 logger.warning(f"User not found for user_id: {user_id}")
@@ -89,8 +98,7 @@ def token_required(f):
             g.user = user
             
             # Check if the function expects a current_user parameter
-            sig = inspect.signature(f)
-            if 'current_user' in sig.parameters:
+            if wants_current_user:
                 # Pass the authenticated user as the current_user parameter
                 kwargs['current_user'] = user
             
@@ -107,8 +115,7 @@ def role_required(roles):
         @token_required
         def decorated_function(*args, **kwargs):
             user = request.user  # Always use request.user for role checks
-            user_roles = UserRole.query.filter_by(user_id=user.user_id).all()
-            user_role_names = [role.role_name for role in user_roles]
+            user_role_names = list(user.roles)
             
             logger.info(f"User {user.user_id} has roles: {user_role_names}")
             logger.info(f"Required roles: {roles}")
@@ -0,0 +1,82 @@
+from flask import g, has_app_context
+from app.models import User
+
+class DataLoader:
+    """
+    Batch and memoize lookups by key
+
+    Keys requested together are resolved by a single call to the batch
+    function, and every resolved key (including misses) is remembered, so
+    asking for the same key again costs nothing.
+    """
+    def __init__(self, batch_load_fn, max_batch_size=500):
+        """
+        Args:
+            batch_load_fn (callable): Takes a list of keys and returns a dict
+                mapping the keys that were found to their values
+            max_batch_size (int): Largest number of keys sent in one batch
+        """
+        self.batch_load_fn = batch_load_fn
+        self.max_batch_size = max_batch_size
+        self._cache = {}
+
+    def prime(self, key, value):
+        """Remember a value that was already loaded elsewhere"""
+        self._cache[key] = value
+
+    def clear(self, key=None):
+        """Forget one key, or every key if none is given"""
+        if key is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(key, None)
+
+    def load_many(self, keys):
+        """
+        Load several keys at once
+
+        Args:
+            keys (iterable): Keys to load; None and duplicates are ignored
+
+        Returns:
+            dict: Mapping of each requested key to its value, or None if missing
+        """
+        keys = [key for key in dict.fromkeys(keys) if key is not None]
+        missing = [key for key in keys if key not in self._cache]
+
+        for start in range(0, len(missing), self.max_batch_size):
+            batch = missing[start:start + self.max_batch_size]
+            found = self.batch_load_fn(batch)
+            for key in batch:
+                self._cache[key] = found.get(key)
+
+        return {key: self._cache[key] for key in keys}
+
+    def load(self, key):
+        """Load a single key, or None if it doesn't exist"""
+        if key is None:
+            return None
+        return self.load_many([key])[key]
+
+def _load_users(user_ids):
+    """Fetch users with one IN query"""
+    users = User.query.filter(User.user_id.in_(user_ids)).all()
+    return {user.user_id: user for user in users}
+
+def get_user_loader():
+    """
+    Get the user loader for the current request
+
+    The loader lives on flask.g, so it is shared by every service called while
+    handling one request and discarded afterwards. Outside an application
+    context a fresh loader is returned.
+
+    Returns:
+        DataLoader: Loader of User objects keyed by user_id
+    """
+    if not has_app_context():
+        return DataLoader(_load_users)
+
+    if 'user_loader' not in g:
+        g.user_loader = DataLoader(_load_users)
+    return g.user_loader
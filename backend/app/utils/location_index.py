@@ -0,0 +1,162 @@
+import logging
+import re
+from sqlalchemy import text, Integer, Float
+from app.models import db
+
+logger = logging.getLogger(__name__)
+
+# Name of the SQLite FTS5 shadow table indexing ride locations
+FTS_TABLE = 'ride_location_fts'
+
+# Statements creating the external-content FTS5 table and the triggers that keep it
+# in sync with every insert, update and delete on the ride table
+_CREATE_STATEMENTS = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        starting_location,
+        dropoff_location,
+        content='ride',
+        content_rowid='ride_id'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON ride BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, starting_location, dropoff_location)
+        VALUES (new.ride_id, new.starting_location, new.dropoff_location);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON ride BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, starting_location, dropoff_location)
+        VALUES ('delete', old.ride_id, old.starting_location, old.dropoff_location);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF starting_location, dropoff_location ON ride BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, starting_location, dropoff_location)
+        VALUES ('delete', old.ride_id, old.starting_location, old.dropoff_location);
+        INSERT INTO {FTS_TABLE}(rowid, starting_location, dropoff_location)
+        VALUES (new.ride_id, new.starting_location, new.dropoff_location);
+    END
+    """
+]
+
+# Database URLs whose index is known to exist; absence is not remembered, so
+# an index created after the first check is picked up
+_available = set()
+
+def ensure_location_index():
+    """
+    Create the location search index if the database supports it
+
+    The index is built from the existing rides the first time it is created.
+    Databases other than SQLite, or SQLite builds without FTS5, keep using
+    substring matching.
+
+    Returns:
+        bool: True if the index is available
+    """
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return False
+
+    try:
+        with engine.begin() as connection:
+            if not _table_exists(connection, 'ride'):
+                # Created along with the tables, by whoever creates them
+                return False
+            existed = _table_exists(connection)
+            for statement in _CREATE_STATEMENTS:
+                connection.execute(text(statement))
+            if not existed:
+                # Index the rides created before the index existed
+                connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+                logger.info(f"Built {FTS_TABLE} from existing rides")
+    except Exception as e:
+        logger.warning(f"Location search index unavailable, falling back to substring search: {str(e)}")
+        _available.discard(str(engine.url))
+        return False
+
+    _available.add(str(engine.url))
+    return True
+
+def drop_location_index():
+    """Drop the location search index and its triggers; searches fall back to substring matching"""
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return
+
+    with engine.begin() as connection:
+        for suffix in ('ai', 'ad', 'au'):
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}"))
+        connection.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+    _available.discard(str(engine.url))
+
+def is_available():
+    """Check whether the location search index can be queried"""
+    engine = db.engine
+    key = str(engine.url)
+    if key in _available:
+        return True
+    if engine.dialect.name != 'sqlite':
+        return False
+
+    with engine.connect() as connection:
+        if not _table_exists(connection):
+            return False
+    _available.add(key)
+    return True
+
+def _table_exists(connection, name=FTS_TABLE):
+    """Check whether a table, by default the FTS table, exists on the given connection"""
+    return connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE name = :name"),
+        {'name': name}
+    ).first() is not None
+
+def _column_expression(column, term):
+    """Build an FTS5 expression requiring every token of the term as a prefix in the column"""
+    tokens = re.findall(r'\w+', term or '')
+    if not tokens:
+        return None
+    prefixes = ' AND '.join(f'"{token}"*' for token in tokens)
+    return f'{column} : ({prefixes})'
+
+def build_match_query(starting_location=None, dropoff_location=None):
+    """
+    Build an FTS5 MATCH query from the location search terms
+
+    Args:
+        starting_location (str, optional): Starting location search term
+        dropoff_location (str, optional): Dropoff location search term
+
+    Returns:
+        str: The MATCH query, or None if neither term contains a searchable token
+    """
+    expressions = [
+        expression for expression in (
+            _column_expression('starting_location', starting_location),
+            _column_expression('dropoff_location', dropoff_location)
+        ) if expression
+    ]
+    return ' AND '.join(expressions) if expressions else None
+
+def location_match_subquery(match_query):
+    """
+    Build a subquery of rides matching an FTS5 query with their relevance
+
+    Args:
+        match_query (str): Query produced by build_match_query
+
+    Returns:
+        Subquery: Columns ride_id and rank, where a lower rank is a better match
+    """
+    return text(
+        f"SELECT rowid AS ride_id, bm25({FTS_TABLE}) AS rank "
+        f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match_query"
+    ).bindparams(
+        match_query=match_query
+    ).columns(
+        ride_id=Integer,
+        rank=Float
+    ).subquery('location_matches')
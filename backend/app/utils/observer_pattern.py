@@ -1,4 +1,6 @@
+import threading
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from typing import List, Dict, Any
 
 # Observer Interface
@@ -45,42 +47,137 @@ class Subject(ABC):
         """
         pass
 
+# Topic that receives every notification
+WILDCARD = '*'
+
 # Concrete Subject - NotificationSubject
 class NotificationSubject(Subject):
-    def __init__(self):
-        self._observers: List[Observer] = []
+    """
+    Route notifications to the observers of their topic
     
-    def attach(self, observer: Observer) -> None:
-        if observer not in self._observers:
-            self._observers.append(observer)
+    Observers subscribe to a topic (a user ID) or to WILDCARD for every
+    notification. notify() finds the topic's observers with one dict lookup,
+    so its cost does not depend on how many users are registered.
     
-    def detach(self, observer: Observer) -> None:
-        self._observers.remove(observer)
+    Topics are kept in least recently used order and the oldest are dropped
+    beyond max_topics, so registering every user ever notified does not grow
+    memory forever. A dropped topic's observers silently stop receiving, so
+    observers are only told about notifications that are already stored and
+    must not be relied on to store them. Wildcard observers are never dropped.
+    """
+    def __init__(self, max_topics: int = 10000):
+        self.max_topics = max_topics
+        self._topics: "OrderedDict[Any, List[Observer]]" = OrderedDict()
+        self._wildcard: List[Observer] = []
+        self._subscribers = 0
+        self._evictions = 0
+        self._notifications = 0
+        self._deliveries = 0
+        self._lock = threading.RLock()
     
-    def notify(self, data: Dict[str, Any]) -> None:
-        for observer in self._observers:
-            observer.update(data)
-
-# Concrete Observer - UserNotificationObserver
-class UserNotificationObserver(Observer):
-    def __init__(self, user_id: int):
-        self.user_id = user_id
+    def attach(self, observer: Observer, topic: Any = None) -> None:
+        """
+        Subscribe an observer to a topic
+        
+        Args:
+            observer: The observer to attach
+            topic: Topic to follow; defaults to the observer's topic attribute,
+                or WILDCARD if it has none
+        """
+        if topic is None:
+            topic = getattr(observer, 'topic', WILDCARD)
+        
+        with self._lock:
+            if topic == WILDCARD:
+                if observer not in self._wildcard:
+                    self._wildcard.append(observer)
+                return
+            
+            observers = self._topics.get(topic)
+            if observers is None:
+                observers = self._topics[topic] = []
+                while len(self._topics) > self.max_topics:
+                    _, evicted = self._topics.popitem(last=False)
+                    self._subscribers -= len(evicted)
+                    self._evictions += 1
+            else:
+                self._topics.move_to_end(topic)
+            
+            if observer not in observers:
+                observers.append(observer)
+                self._subscribers += 1
     
-    def update(self, data: Dict[str, Any]) -> None:
-        # Check if this notification is for this user
-        if data.get('user_id') == self.user_id:
-            from app.models import Notification, db
+    def detach(self, observer: Observer, topic: Any = None) -> None:
+        if topic is None:
+            topic = getattr(observer, 'topic', WILDCARD)
+        
+        with self._lock:
+            if topic == WILDCARD:
+                if observer in self._wildcard:
+                    self._wildcard.remove(observer)
+                return
             
-            # Create a new notification in the database
-            notification = Notification(
-                user_id=self.user_id,
-                message=data.get('message', ''),
-                read=False
-            )
+            observers = self._topics.get(topic)
+            if observers and observer in observers:
+                observers.remove(observer)
+                self._subscribers -= 1
+                if not observers:
+                    del self._topics[topic]
+    
+    def get_observers(self, topic: Any) -> List[Observer]:
+        """
+        Get the observers subscribed to a topic, excluding wildcard observers
+        
+        Args:
+            topic: The topic
             
-            # Add and commit to the database
-            db.session.add(notification)
-            db.session.commit()
+        Returns:
+            list: The topic's observers
+        """
+        with self._lock:
+            return list(self._topics.get(topic, ()))
+    
+    def notify(self, data: Dict[str, Any], topic: Any = None) -> None:
+        """
+        Deliver a notification to its topic's observers and the wildcard observers
+        
+        Args:
+            data: Dictionary containing notification data
+            topic: Topic to deliver to; defaults to data['user_id']
+        """
+        if topic is None:
+            topic = data.get('user_id')
+        
+        with self._lock:
+            observers = self._topics.get(topic)
+            if observers is not None:
+                self._topics.move_to_end(topic)
+                observers = list(observers)
+            observers = (observers or []) + self._wildcard
+            self._notifications += 1
+            self._deliveries += len(observers)
+        
+        for observer in observers:
+            observer.update(data)
+    
+    def metrics(self) -> Dict[str, int]:
+        """
+        Get subscriber and delivery counts
+        
+        Returns:
+            dict: Topics and subscribers registered, wildcard subscribers,
+                topics evicted, notifications sent and observer deliveries
+        """
+        with self._lock:
+            return {
+                'topics': len(self._topics),
+                'maxTopics': self.max_topics,
+                'subscribers': self._subscribers,
+                'wildcardSubscribers': len(self._wildcard),
+                'evictions': self._evictions,
+                'notifications': self._notifications,
+                'deliveries': self._deliveries
+            }
 
 # Global notification subject instance
 notification_subject = NotificationSubject()
@@ -0,0 +1,56 @@
+import base64
+import json
+from datetime import datetime
+
+def encode_cursor(*values):
+    """
+    Encode keyset values into an opaque, URL-safe cursor string
+
+    Args:
+        *values: Keyset values (datetime, int or str) in sort order
+
+    Returns:
+        str: The encoded cursor
+    """
+    raw = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    payload = json.dumps(raw, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, *types):
+    """
+    Decode a cursor produced by encode_cursor
+
+    Args:
+        cursor (str): The encoded cursor
+        *types: Expected type of each keyset value (datetime, int or str)
+
+    Returns:
+        tuple: The decoded keyset values
+
+    Raises:
+        ValueError: If the cursor is malformed or does not match the expected types
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError("Invalid cursor")
+
+    if not isinstance(raw, list) or len(raw) != len(types):
+        raise ValueError("Invalid cursor")
+
+    values = []
+    try:
+        for value, value_type in zip(raw, types):
+            if value_type is datetime:
+                values.append(datetime.fromisoformat(value))
+            elif value_type is int:
+                if isinstance(value, bool) or not isinstance(value, int):
+                    raise ValueError("Invalid cursor")
+                values.append(value)
+            else:
+                values.append(value_type(value))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+    return tuple(values)
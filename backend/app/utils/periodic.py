@@ -0,0 +1,121 @@
+import atexit
+import logging
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from app.models import db, PeriodicJobRun
+
+# Timers of different processes drift apart, so a run claimed slightly less
+# than an interval ago still counts as this interval's run
+CLAIM_TOLERANCE = 0.9
+
+logger = logging.getLogger(__name__)
+
+class PeriodicJob:
+    """
+    Run a maintenance function at a fixed interval on a background thread
+
+    The function runs inside an application context. Errors are logged and
+    the job carries on at the next interval. Every serving process starts
+    the job, but each interval's run is claimed in the periodic_job_run
+    table, so only one of them runs it; if that process stops, another one
+    takes over at the next interval.
+    """
+    def __init__(self, app, name, interval, function):
+        """
+        Args:
+            app (Flask): Application the job runs for
+            name (str): Name used for the thread and in logs
+            interval (float): Seconds between runs
+            function (callable): Called without arguments on every run
+        """
+        self.app = app
+        self.name = name
+        self.interval = interval
+        self.function = function
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start running the job; the first run is one interval from now"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def stop(self):
+        """Stop the job after the current run finishes"""
+        self._stop_event.set()
+
+    def run_once(self):
+        """Run the job now"""
+        with self.app.app_context():
+            try:
+                return self.function()
+            except Exception as e:
+                logger.error(f"Periodic job {self.name} failed: {str(e)}")
+
+    def claim(self):
+        """
+        Claim this interval's run for this process
+
+        Returns:
+            bool: True if no process ran the job within the last interval
+        """
+        now = datetime.utcnow()
+        due = now - timedelta(seconds=self.interval * CLAIM_TOLERANCE)
+        try:
+            with self.app.app_context():
+                engine = db.engine
+
+            with engine.begin() as connection:
+                result = connection.execute(
+                    update(PeriodicJobRun).where(
+                        PeriodicJobRun.name == self.name,
+                        PeriodicJobRun.last_run_at <= due
+                    ).values(last_run_at=now)
+                )
+                if result.rowcount == 1:
+                    return True
+
+                claimed = connection.execute(
+                    select(PeriodicJobRun.name).where(PeriodicJobRun.name == self.name)
+                ).first()
+                if claimed is not None:
+                    return False
+
+                connection.execute(insert(PeriodicJobRun).values(name=self.name, last_run_at=now))
+                return True
+        except IntegrityError:
+            # Another process claimed the first run
+            return False
+        except Exception as e:
+            logger.error(f"Cannot claim periodic job {self.name}: {str(e)}")
+            return False
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            if self.claim():
+                self.run_once()
+
+def start_periodic_job(app, name, interval, function):
+    """
+    Start a periodic job unless its interval is disabled
+
+    Args:
+        app (Flask): The application
+        name (str): Name of the job
+        interval (float): Seconds between runs; 0 or less disables the job
+        function (callable): The job
+
+    Returns:
+        PeriodicJob: The started job, or None if disabled
+    """
+    if not interval or interval <= 0:
+        return None
+
+    job = PeriodicJob(app, name, interval, function)
+    job.start()
+    logger.info(f"Started periodic job {name} every {interval}s")
+    return job
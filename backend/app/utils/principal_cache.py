@@ -0,0 +1,284 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from flask import current_app
+from app.models import db, User, UserRole, Driver
+
+logger = logging.getLogger(__name__)
+
+class Principal:
+    """
+    The authenticated user as seen by token_required and role_required
+
+    A plain object rather than a User row, so it can be kept between requests
+    without being bound to a database session.
+    """
+    def __init__(self, user_id, name=None, email=None, roles=(), driver_status=None):
+        """
+        Args:
+            user_id (int): ID of the user
+            name (str): Name of the user
+            email (str): Email of the user
+            roles (iterable): Names of the user's roles
+            driver_status (str): Verification status if the user is a driver
+        """
+        self.user_id = user_id
+        self.name = name
+        self.email = email
+        self.roles = tuple(roles)
+        self.driver_status = driver_status
+
+    def has_role(self, *roles):
+        """Check whether the user has any of the given roles"""
+        return any(role in self.roles for role in roles)
+
+    @classmethod
+    def from_claims(cls, user_id, payload):
+        """
+        Build a principal from the claims of a token
+
+        Returns:
+            Principal: The principal, or None if the token carries no role
+                claims (tokens issued before they were added)
+        """
+        if not isinstance(payload.get('roles'), list):
+            return None
+        return cls(
+            user_id,
+            name=payload.get('name'),
+            email=payload.get('email'),
+            roles=payload['roles'],
+            driver_status=payload.get('driverStatus')
+        )
+
+def load_principal(user_id):
+    """
+    Load a principal from the database with a single query
+
+    Returns:
+        Principal: The principal, or None if the user does not exist
+    """
+    rows = db.session.query(
+        User.name,
+        User.email,
+        UserRole.role_name,
+        Driver.verification_status
+    ).outerjoin(
+        UserRole, UserRole.user_id == User.user_id
+    ).outerjoin(
+        Driver, Driver.user_id == User.user_id
+    ).filter(User.user_id == user_id).all()
+
+    if not rows:
+        return None
+
+    name, email, _, driver_status = rows[0]
+    roles = list(dict.fromkeys(role_name for _, _, role_name, _ in rows if role_name))
+    return Principal(user_id, name=name, email=email, roles=roles, driver_status=driver_status)
+
+class PrincipalCache:
+    """
+    In-process LRU cache of principals with a time to live
+
+    Entries expire ttl seconds after they were stored, and the least recently
+    used are dropped beyond max_size. invalidate() drops a user's entry and
+    remembers when the user changed, so principals loaded and tokens issued
+    before the change are not trusted any more.
+    """
+    def __init__(self, ttl=60, max_size=10000, change_ttl=86400):
+        """
+        Args:
+            ttl (float): Seconds a principal is served from the cache; 0 disables caching
+            max_size (int): Most principals kept
+            change_ttl (float): Seconds a change is remembered; at least the
+                lifetime of the tokens whose claims are trusted
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self.change_ttl = change_ttl
+        self._entries = OrderedDict()
+        self._changed_at = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def get(self, user_id):
+        """Get a cached principal, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[user_id]
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(user_id)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, principal, as_of):
+        """
+        Cache a principal unless the user changed after it was read
+
+        Args:
+            principal (Principal): The principal
+            as_of (float): Time the principal's data was read, as time.time()
+        """
+        if self.ttl <= 0:
+            return
+
+        with self._lock:
+            if not self._trusted(principal.user_id, as_of):
+                return
+
+            self._entries[principal.user_id] = (principal, time.time() + self.ttl)
+            self._entries.move_to_end(principal.user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def trusts(self, user_id, as_of):
+        """Check whether data read at as_of is newer than the user's last change"""
+        with self._lock:
+            return self._trusted(user_id, as_of)
+
+    def _trusted(self, user_id, as_of):
+        changed_at = self._changed_at.get(user_id)
+        return changed_at is None or as_of > changed_at
+
+    def invalidate(self, user_id):
+        """Forget a user's principal after their profile, roles or driver status changed"""
+        now = time.time()
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._changed_at[user_id] = now
+            self._invalidations += 1
+
+            # Changes older than any trusted token no longer matter
+            expired = [
+                changed_user_id for changed_user_id, changed_at in self._changed_at.items()
+                if changed_at < now - self.change_ttl
+            ]
+            for changed_user_id in expired:
+                del self._changed_at[changed_user_id]
+
+    def clear(self):
+        """Forget every cached principal"""
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self):
+        """
+        Get cache size and hit counts
+
+        Returns:
+            dict: size, maxSize, ttlSeconds, hits, misses and invalidations
+        """
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxSize': self.max_size,
+                'ttlSeconds': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'invalidations': self._invalidations
+            }
+
+# Cache shared by the auth decorators, created on first use
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_principal_cache():
+    """Get the principal cache for the current application, creating it if needed"""
+    global _cache
+
+    with _cache_lock:
+        if _cache is None:
+            config = current_app.config
+            _cache = PrincipalCache(
+                ttl=config.get('PRINCIPAL_CACHE_TTL', 60),
+                max_size=config.get('PRINCIPAL_CACHE_SIZE', 10000)
+            )
+        return _cache
+
+def _changed_at(user_id):
+    """
+    Get when a user's principal last changed, from any process
+
+    Returns:
+        tuple: (exists, changed_at) where changed_at is a time.time() value
+            or None if the user never changed
+    """
+    row = db.session.query(User.principal_changed_at).filter(User.user_id == user_id).first()
+    if row is None:
+        return False, None
+    if row.principal_changed_at is None:
+        return True, None
+    return True, row.principal_changed_at.replace(tzinfo=timezone.utc).timestamp()
+
+def resolve_principal(user_id, payload):
+    """
+    Get the principal for a decoded token with as little database work as possible
+
+    The cached principal is used first. Otherwise the token's role claims are
+    used if the user still exists and did not change after the token was
+    issued, which costs one primary key lookup; only then is the principal
+    loaded from the database.
+
+    Changes are recorded on the user row, so every process stops trusting
+    older claims at once. A principal another process cached before the
+    change is served until it expires, PRINCIPAL_CACHE_TTL seconds at most.
+
+    Args:
+        user_id (int): ID of the user from the token
+        payload (dict): Decoded token
+
+    Returns:
+        Principal: The principal, or None if the user does not exist
+    """
+    cache = get_principal_cache()
+
+    principal = cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    issued_at = payload.get('iat')
+    if isinstance(issued_at, (int, float)) and cache.trusts(user_id, issued_at):
+        exists, changed_at = _changed_at(user_id)
+        if not exists:
+            return None
+
+        principal = Principal.from_claims(user_id, payload) if changed_at is None or issued_at > changed_at else None
+        if principal is not None:
+            cache.put(principal, issued_at)
+            return principal
+
+    loaded_at = time.time()
+    principal = load_principal(user_id)
+    if principal is not None:
+        cache.put(principal, loaded_at)
+    return principal
+
+def invalidate_principal(user_id):
+    """
+    Record a change to a user's profile, roles or driver status
+
+    Call after the change is committed. The change time is stored on the
+    user row, so tokens issued before it are no longer authorized from their
+    claims in any process, and this process forgets its cached principal.
+    Other processes serve their cached principal until it expires.
+    """
+    try:
+        User.query.filter_by(user_id=user_id).update({User.principal_changed_at: datetime.utcnow()})
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Cannot record principal change of user {user_id}: {str(e)}")
+
+    try:
+        get_principal_cache().invalidate(user_id)
+    except Exception as e:
+        logger.error(f"Cannot invalidate principal of user {user_id}: {str(e)}")
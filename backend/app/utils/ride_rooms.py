@@ -0,0 +1,96 @@
+import re
+from datetime import date, datetime
+
+# Room every ride event is still sent to, for clients that browse all rides
+GLOBAL_RIDES_ROOM = 'rides'
+
+# Most buckets a client can subscribe to with one join_rides
+MAX_BUCKETS_PER_JOIN = 20
+
+def normalize_location(location):
+    """
+    Normalize a location name into a room key
+
+    Case, punctuation and spacing are ignored, so "KL Sentral" and
+    "kl  sentral," share a bucket.
+    """
+    tokens = re.findall(r'\w+', (location or '').lower())
+    return '-'.join(tokens)
+
+def _day_key(day):
+    """Format a departure day as YYYY-MM-DD, accepting dates, datetimes or strings"""
+    if isinstance(day, datetime):
+        return day.date().isoformat()
+    if isinstance(day, date):
+        return day.isoformat()
+    try:
+        return datetime.strptime(day, '%Y-%m-%d').date().isoformat()
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid date {day!r}, expected YYYY-MM-DD")
+
+def bucket_room(starting_location, day=None):
+    """
+    Name the room of a ride bucket
+
+    Args:
+        starting_location (str): Starting location of the rides
+        day (date, datetime or str, optional): Departure day; None for every day
+
+    Returns:
+        str: Room name such as 'rides:kl-sentral' or 'rides:kl-sentral:2030-01-01'
+
+    Raises:
+        ValueError: If the location is empty or the day is not a valid date
+    """
+    location_key = normalize_location(starting_location)
+    if not location_key:
+        raise ValueError("Starting location is required")
+
+    if day is None:
+        return f'{GLOBAL_RIDES_ROOM}:{location_key}'
+    return f'{GLOBAL_RIDES_ROOM}:{location_key}:{_day_key(day)}'
+
+def ride_rooms(starting_location, request_time):
+    """
+    Get every room an event about a ride is sent to
+
+    Args:
+        starting_location (str): The ride's starting location
+        request_time (datetime): The ride's departure time
+
+    Returns:
+        list: The global room, the location room and the location-and-day room
+    """
+    rooms = [GLOBAL_RIDES_ROOM]
+    if normalize_location(starting_location):
+        rooms.append(bucket_room(starting_location))
+        if request_time:
+            rooms.append(bucket_room(starting_location, request_time))
+    return rooms
+
+def rooms_from_buckets(buckets):
+    """
+    Resolve the buckets a client asked for in join_rides or leave_rides
+
+    Args:
+        buckets (list): Dicts with startingLocation and an optional date (YYYY-MM-DD)
+
+    Returns:
+        list: Room names, without duplicates
+
+    Raises:
+        ValueError: If a bucket is malformed or too many are requested
+    """
+    if not isinstance(buckets, list):
+        raise ValueError("buckets must be a list")
+    if len(buckets) > MAX_BUCKETS_PER_JOIN:
+        raise ValueError(f"At most {MAX_BUCKETS_PER_JOIN} buckets can be joined at once")
+
+    rooms = []
+    for bucket in buckets:
+        if not isinstance(bucket, dict):
+            raise ValueError("Each bucket must be an object")
+        room = bucket_room(bucket.get('startingLocation'), bucket.get('date'))
+        if room not in rooms:
+            rooms.append(room)
+    return rooms
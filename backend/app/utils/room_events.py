@@ -0,0 +1,131 @@
+import threading
+import uuid
+from collections import OrderedDict, deque
+from socketio import Manager
+
+# Rooms whose events are numbered and kept for replay
+SEQUENCED_ROOM_PREFIXES = ('rides', 'chat_', 'user_')
+
+def is_sequenced_room(room):
+    """Check whether events sent to a room are numbered and kept for replay"""
+    return isinstance(room, str) and room.startswith(SEQUENCED_ROOM_PREFIXES)
+
+def user_room(user_id):
+    """Name the private room of a user's sockets"""
+    return f'user_{user_id}'
+
+class RoomEventLog:
+    """
+    Per-room sequence numbers and ring buffers of recent events
+
+    Sequence numbers start at 1 in every room and are only meaningful
+    together with the log's epoch, which changes whenever the process
+    restarts, so clients can tell a stale sequence number from a gap.
+    """
+    def __init__(self, buffer_size=100, max_rooms=10000):
+        """
+        Args:
+            buffer_size (int): Events kept per room
+            max_rooms (int): Rooms tracked at once; the least recently used
+                room is forgotten first
+        """
+        self.buffer_size = buffer_size
+        self.max_rooms = max_rooms
+        self.epoch = uuid.uuid4().hex
+        self._rooms = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _room(self, room):
+        """Get the sequence state of a room, creating it if needed (lock held)"""
+        state = self._rooms.get(room)
+        if state is None:
+            state = {'seq': 0, 'events': deque(maxlen=self.buffer_size)}
+            self._rooms[room] = state
+            while len(self._rooms) > self.max_rooms:
+                self._rooms.popitem(last=False)
+        else:
+            self._rooms.move_to_end(room)
+        return state
+
+    def record(self, room, event, data):
+        """
+        Number an event and keep it for replay
+
+        Args:
+            room (str): Room the event is sent to
+            event (str): Event name
+            data (dict): Event payload
+
+        Returns:
+            dict: The payload with its sequence number added as seq and the
+                room it was numbered in as room
+        """
+        with self._lock:
+            state = self._room(room)
+            state['seq'] += 1
+            data = dict(data, seq=state['seq'], room=room)
+            state['events'].append((state['seq'], event, data))
+            return data
+
+    def current_seq(self, room):
+        """Sequence number of the last event sent to a room"""
+        with self._lock:
+            state = self._rooms.get(room)
+            return state['seq'] if state else 0
+
+    def since(self, room, since_seq, epoch=None):
+        """
+        Get the events a client missed
+
+        Args:
+            room (str): The room
+            since_seq (int): Last sequence number the client received
+            epoch (str, optional): Epoch the client's sequence number belongs to
+
+        Returns:
+            list: (seq, event, data) tuples after since_seq, or None if they
+                are no longer all buffered and the client has to resync
+        """
+        with self._lock:
+            state = self._rooms.get(room)
+            current = state['seq'] if state else 0
+
+            if epoch is not None and epoch != self.epoch:
+                return None
+            if since_seq < 0 or since_seq > current:
+                return None
+            if since_seq == current:
+                return []
+
+            events = list(state['events'])
+            if not events or events[0][0] > since_seq + 1:
+                return None
+            return [entry for entry in events if entry[0] > since_seq]
+
+# Log shared by the client manager and the join handlers
+room_event_log = RoomEventLog()
+
+class SequencingManager(Manager):
+    """
+    Client manager that numbers every event sent to a sequenced room
+
+    Numbering happens where events are delivered to local clients, so with a
+    message queue each worker numbers the events it delivers, including
+    those emitted by other workers.
+    """
+    def emit(self, event, data, namespace, room=None, skip_sid=None,
+             callback=None, to=None, **kwargs):
+        room = to or room
+        if is_sequenced_room(room) and isinstance(data, dict):
+            data = room_event_log.record(room, event, data)
+        return super().emit(event, data, namespace, room=room, skip_sid=skip_sid,
+                            callback=callback, **kwargs)
+
+def sequenced_manager_class(manager_class):
+    """
+    Combine a pub/sub client manager with event numbering
+
+    The sequencing class is placed right before Manager in the MRO, so it
+    sees exactly the emits delivered to this process's clients.
+    """
+    return type(f'Sequenced{manager_class.__name__}', (manager_class, SequencingManager), {})
@@ -0,0 +1,300 @@
+import logging
+import pickle
+import socket
+import socketserver
+import threading
+import time
+from urllib.parse import urlparse
+import socketio
+from socketio import PubSubManager
+from app.utils.room_events import SequencingManager, sequenced_manager_class, room_event_log
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCAL_QUEUE_URL = 'local://127.0.0.1:6380'
+
+# Redis serialization protocol (RESP), limited to what pub/sub needs
+
+def _encode_command(*parts):
+    """Encode a command or reply as a RESP array of bulk strings"""
+    encoded = [b'*%d\r\n' % len(parts)]
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        elif isinstance(part, int):
+            part = str(part).encode('ascii')
+        encoded.append(b'$%d\r\n%s\r\n' % (len(part), part))
+    return b''.join(encoded)
+
+def _read_reply(stream):
+    """
+    Read one RESP value from a buffered stream
+
+    Raises:
+        ConnectionError: If the peer closed the connection
+    """
+    line = stream.readline()
+    if not line:
+        raise ConnectionError("Connection closed")
+
+    kind, body = line[:1], line[1:-2]
+    if kind == b'+':
+        return body.decode('utf-8')
+    if kind == b'-':
+        raise RuntimeError(body.decode('utf-8'))
+    if kind == b':':
+        return int(body)
+    if kind == b'$':
+        length = int(body)
+        if length < 0:
+            return None
+        data = stream.read(length + 2)
+        if len(data) < length + 2:
+            raise ConnectionError("Connection closed")
+        return data[:-2]
+    if kind == b'*':
+        return [_read_reply(stream) for _ in range(int(body))]
+    raise ConnectionError(f"Unexpected reply type {kind!r}")
+
+class _BrokerHandler(socketserver.StreamRequestHandler):
+    """Serve one broker connection"""
+    def setup(self):
+        super().setup()
+        self.send_lock = threading.Lock()
+        self.channels = set()
+
+    def send(self, payload):
+        with self.send_lock:
+            self.wfile.write(payload)
+            self.wfile.flush()
+
+    def handle(self):
+        broker = self.server
+        try:
+            while True:
+                command = _read_reply(self.rfile)
+                if not isinstance(command, list) or not command:
+                    self.send(b'-ERR invalid command\r\n')
+                    continue
+
+                name = command[0].decode('utf-8').upper()
+                args = command[1:]
+
+                if name == 'PUBLISH' and len(args) == 2:
+                    delivered = broker.publish(args[0], args[1])
+                    self.send(b':%d\r\n' % delivered)
+                elif name == 'SUBSCRIBE' and args:
+                    for channel in args:
+                        broker.subscribe(channel, self)
+                        self.channels.add(channel)
+                        self.send(_encode_command('subscribe', channel, len(self.channels)))
+                elif name == 'UNSUBSCRIBE':
+                    for channel in (args or list(self.channels)):
+                        broker.unsubscribe(channel, self)
+                        self.channels.discard(channel)
+                        self.send(_encode_command('unsubscribe', channel, len(self.channels)))
+                elif name == 'PING':
+                    self.send(b'+PONG\r\n')
+                else:
+                    self.send(b'-ERR unknown command\r\n')
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            for channel in self.channels:
+                broker.unsubscribe(channel, self)
+
+class LocalPubSubBroker(socketserver.ThreadingTCPServer):
+    """
+    Minimal pub/sub broker for running several workers on one machine
+
+    It speaks the PUBLISH/SUBSCRIBE subset of the Redis protocol, so the
+    workers can later be pointed at a real Redis server by changing the
+    message queue URL. Messages are delivered to the subscribers connected at
+    the time of publishing; nothing is stored.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=6380):
+        super().__init__((host, port), _BrokerHandler)
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel, handler):
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(handler)
+
+    def unsubscribe(self, channel, handler):
+        with self._lock:
+            subscribers = self._subscribers.get(channel)
+            if subscribers:
+                subscribers.discard(handler)
+
+    def publish(self, channel, message):
+        """Send a message to every subscriber of a channel and return how many got it"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+
+        payload = _encode_command('message', channel, message)
+        delivered = 0
+        for handler in subscribers:
+            try:
+                handler.send(payload)
+                delivered += 1
+            except OSError:
+                self.unsubscribe(channel, handler)
+        return delivered
+
+def start_broker(host='127.0.0.1', port=6380):
+    """
+    Start a broker on a background thread
+
+    Returns:
+        LocalPubSubBroker: The running broker; call shutdown() to stop it
+    """
+    broker = LocalPubSubBroker(host, port)
+    thread = threading.Thread(target=broker.serve_forever, name='socketio-broker', daemon=True)
+    thread.start()
+    logger.info(f"Socket.IO broker listening on {host}:{broker.server_address[1]}")
+    return broker
+
+class LocalPubSubClient:
+    """Client for LocalPubSubBroker (or Redis) with the publish/subscribe calls of redis-py"""
+    def __init__(self, host='127.0.0.1', port=6380, timeout=5):
+        self._socket = socket.create_connection((host, port), timeout=timeout)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._stream = self._socket.makefile('rb')
+        self._lock = threading.Lock()
+
+    def _command(self, *parts):
+        self._socket.sendall(_encode_command(*parts))
+        return _read_reply(self._stream)
+
+    def publish(self, channel, message):
+        """Publish a message and return the number of subscribers that received it"""
+        with self._lock:
+            return self._command('PUBLISH', channel, message)
+
+    def subscribe(self, *channels):
+        """Subscribe to channels; messages are then read with listen()"""
+        with self._lock:
+            self._socket.sendall(_encode_command('SUBSCRIBE', *channels))
+            # Subscribing blocks until a message arrives, however long that takes
+            self._socket.settimeout(None)
+
+    def listen(self):
+        """Yield pub/sub events as dicts with type, channel and data"""
+        while True:
+            reply = _read_reply(self._stream)
+            kind, channel, data = reply
+            yield {'type': kind.decode('utf-8'), 'channel': channel.decode('utf-8'), 'data': data}
+
+    def close(self):
+        try:
+            self._stream.close()
+            self._socket.close()
+        except OSError:
+            pass
+
+class LocalPubSubManager(PubSubManager):
+    """
+    Socket.IO client manager sharing events through a LocalPubSubBroker
+
+    Every worker connected to the same broker receives the events emitted
+    by the others, so clients attached to any worker get room broadcasts.
+
+    Use a URL of the form local://host:port.
+    """
+    name = 'local'
+
+    def __init__(self, url=DEFAULT_LOCAL_QUEUE_URL, channel='flask-socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        parsed = urlparse(url)
+        self.host = parsed.hostname or '127.0.0.1'
+        self.port = parsed.port or 6380
+        self._publisher = None
+        self._publish_lock = threading.Lock()
+
+    def _publish(self, data):
+        payload = pickle.dumps(data)
+        with self._publish_lock:
+            for attempt in range(2):
+                try:
+                    if self._publisher is None:
+                        self._publisher = LocalPubSubClient(self.host, self.port)
+                    return self._publisher.publish(self.channel, payload)
+                except (ConnectionError, OSError) as e:
+                    if self._publisher is not None:
+                        self._publisher.close()
+                        self._publisher = None
+                    if attempt:
+                        self._get_logger().error(f"Cannot publish to Socket.IO broker: {str(e)}")
+                except RuntimeError as e:
+                    # The broker answered with an error; the connection itself is still usable
+                    self._get_logger().error(f"Socket.IO broker rejected a publish: {str(e)}")
+                    return None
+
+    def _listen(self):
+        retry_delay = 0.5
+        while True:
+            subscriber = None
+            try:
+                subscriber = LocalPubSubClient(self.host, self.port)
+                subscriber.subscribe(self.channel)
+                retry_delay = 0.5
+                for message in subscriber.listen():
+                    if message['type'] == 'message':
+                        yield message['data']
+            except (ConnectionError, OSError) as e:
+                self._get_logger().warning(
+                    f"Socket.IO broker connection lost, retrying in {retry_delay}s: {str(e)}"
+                )
+                time.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 10)
+            except RuntimeError as e:
+                # An -ERR reply, e.g. a server refusing the subscription; reconnect rather than stop listening
+                self._get_logger().error(
+                    f"Socket.IO broker returned an error, reconnecting in {retry_delay}s: {str(e)}"
+                )
+                time.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 10)
+            finally:
+                if subscriber is not None:
+                    subscriber.close()
+
+def _queue_manager_class(url):
+    """Pick the client manager class Flask-SocketIO would use for a queue URL"""
+    if url.startswith('local://'):
+        return LocalPubSubManager
+    if url.startswith(('redis://', 'rediss://')):
+        return socketio.RedisManager
+    if url.startswith('kafka://'):
+        return socketio.KafkaManager
+    if url.startswith('zmq'):
+        return socketio.ZmqManager
+    return socketio.KombuManager
+
+def socketio_options(config):
+    """
+    Build the SocketIO.init_app options for the configured message queue
+
+    SOCKETIO_MESSAGE_QUEUE selects the backend: empty for a single process,
+    local://host:port for LocalPubSubBroker, or any URL Flask-SocketIO
+    understands (redis://, kafka://, amqp://, zmq+tcp://). The client manager
+    always numbers room events for replay (see app.utils.room_events).
+
+    Args:
+        config (dict): Application configuration
+
+    Returns:
+        dict: Keyword arguments for SocketIO.init_app
+    """
+    url = config.get('SOCKETIO_MESSAGE_QUEUE')
+    channel = config.get('SOCKETIO_CHANNEL') or 'flask-socketio'
+    room_event_log.buffer_size = config.get('SOCKETIO_REPLAY_BUFFER', room_event_log.buffer_size)
+
+    if not url:
+        return {'client_manager': SequencingManager()}
+
+    manager_class = sequenced_manager_class(_queue_manager_class(url))
+    return {'client_manager': manager_class(url, channel=channel)}
@@ -24,7 +24,56 @@ class Config:
                 'MAIL_USE_TLS': os.environ.get('MAIL_USE_TLS', 'True').lower() == 'true',
                 'MAIL_USERNAME': os.environ.get('MAIL_USERNAME', 'noreply@ride2gather.com'),
                 'MAIL_PASSWORD': os.environ.get('MAIL_PASSWORD', 'password'),
-                'MAIL_DEFAULT_SENDER': os.environ.get('MAIL_DEFAULT_SENDER', 'noreply@ride2gather.com')
+                'MAIL_DEFAULT_SENDER': os.environ.get('MAIL_DEFAULT_SENDER', 'noreply@ride2gather.com'),
+                
+                # Write-behind chat persistence: messages are emitted immediately and
+                # written in batches by a background thread
+                'MESSAGE_WRITE_BEHIND': os.environ.get('MESSAGE_WRITE_BEHIND', 'False').lower() == 'true',
+                'MESSAGE_WRITE_BATCH_SIZE': int(os.environ.get('MESSAGE_WRITE_BATCH_SIZE', 200)),
+                'MESSAGE_WRITE_FLUSH_INTERVAL': float(os.environ.get('MESSAGE_WRITE_FLUSH_INTERVAL', 0.05)),
+                'MESSAGE_WRITE_QUEUE_SIZE': int(os.environ.get('MESSAGE_WRITE_QUEUE_SIZE', 10000)),
+                # Message IDs each process reserves per round trip to the id_sequence table
+                'MESSAGE_ID_BLOCK_SIZE': int(os.environ.get('MESSAGE_ID_BLOCK_SIZE', 1000)),
+                
+                # Store and push notifications on background workers instead of in the request
+                'NOTIFICATION_ASYNC': os.environ.get('NOTIFICATION_ASYNC', 'True').lower() == 'true',
+                'NOTIFICATION_WORKERS': int(os.environ.get('NOTIFICATION_WORKERS', 2)),
+                'NOTIFICATION_BATCH_SIZE': int(os.environ.get('NOTIFICATION_BATCH_SIZE', 200)),
+                'NOTIFICATION_FLUSH_INTERVAL': float(os.environ.get('NOTIFICATION_FLUSH_INTERVAL', 0.05)),
+                'NOTIFICATION_QUEUE_SIZE': int(os.environ.get('NOTIFICATION_QUEUE_SIZE', 10000)),
+                # Unread notifications of the same kind about the same ride are merged
+                # into one row if the next one arrives within this many seconds; 0 disables
+                'NOTIFICATION_COALESCE_WINDOW': float(os.environ.get('NOTIFICATION_COALESCE_WINDOW', 900)),
+                # Seconds between rebuilds of the unread notification counters; 0 disables
+                'UNREAD_COUNT_RECONCILE_INTERVAL': float(os.environ.get('UNREAD_COUNT_RECONCILE_INTERVAL', 3600)),
+                
+                # Notification retention: days read and unread notifications stay in the
+                # notification table (0 keeps them), whether expired ones are moved to the
+                # monthly archive or deleted, and months the archive keeps (0 keeps all)
+                'NOTIFICATION_READ_RETENTION_DAYS': int(os.environ.get('NOTIFICATION_READ_RETENTION_DAYS', 30)),
+                'NOTIFICATION_UNREAD_RETENTION_DAYS': int(os.environ.get('NOTIFICATION_UNREAD_RETENTION_DAYS', 180)),
+                'NOTIFICATION_ARCHIVE': os.environ.get('NOTIFICATION_ARCHIVE', 'True').lower() == 'true',
+                'NOTIFICATION_ARCHIVE_RETENTION_MONTHS': int(os.environ.get('NOTIFICATION_ARCHIVE_RETENTION_MONTHS', 12)),
+                # The purge runs every NOTIFICATION_PURGE_INTERVAL seconds (0 disables) in
+                # chunks of NOTIFICATION_PURGE_BATCH_SIZE rows
+                'NOTIFICATION_PURGE_INTERVAL': float(os.environ.get('NOTIFICATION_PURGE_INTERVAL', 3600)),
+                'NOTIFICATION_PURGE_BATCH_SIZE': int(os.environ.get('NOTIFICATION_PURGE_BATCH_SIZE', 500)),
+                'NOTIFICATION_PURGE_PAUSE': float(os.environ.get('NOTIFICATION_PURGE_PAUSE', 0.05)),
+                
+                # Socket.IO message queue shared by all workers: empty for a single process,
+                # local://host:port for the bundled broker (flask socketio-broker), or redis://...
+                'SOCKETIO_MESSAGE_QUEUE': os.environ.get('SOCKETIO_MESSAGE_QUEUE', ''),
+                'SOCKETIO_CHANNEL': os.environ.get('SOCKETIO_CHANNEL', 'flask-socketio'),
+                # Recent events kept per room for clients rejoining with since_seq
+                'SOCKETIO_REPLAY_BUFFER': int(os.environ.get('SOCKETIO_REPLAY_BUFFER', 100)),
+                # Seconds ride_updated events for the same ride are coalesced; 0 sends them at once
+                'RIDE_UPDATE_COALESCE_WINDOW': float(os.environ.get('RIDE_UPDATE_COALESCE_WINDOW', 0.25)),
+                
+                # Authenticated users are cached in process for PRINCIPAL_CACHE_TTL seconds
+                # (0 disables), up to PRINCIPAL_CACHE_SIZE users; other processes see a user's
+                # changes once their cached principal expires
+                'PRINCIPAL_CACHE_TTL': float(os.environ.get('PRINCIPAL_CACHE_TTL', 60)),
+                'PRINCIPAL_CACHE_SIZE': int(os.environ.get('PRINCIPAL_CACHE_SIZE', 10000))
             }
                 
         return cls._instance
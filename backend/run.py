@@ -5,6 +5,21 @@ from app import mail, create_app, socketio
 from config import Config
 from werkzeug.security import generate_password_hash
 from app import events  # Import WebSocket event handlers
+from app.utils.location_index import ensure_location_index
+from app.models.migrations import upgrade_schema
+from app.services.ride_service import reconcile_seat_counters
+from app.services.chat_service import reconcile_chat_summaries
+from app.services.message_writer import init_message_writer
+from app.cli import register_commands
+from app.services.notification_dispatcher import init_notification_dispatcher
+from app.services.notification_service import reconcile_unread_counts
+from app.services.notification_retention import purge_notifications
+from app.utils.periodic import start_periodic_job
+from app.utils.socket_queue import socketio_options
+from sqlalchemy import inspect
+import click
+import signal
+import sys
 
 # Initialize Config singleton
 config = Config()
@@ -12,7 +27,7 @@ config = Config()
 # Setup Flask application
 app = Flask(__name__)
 app.config.from_mapping(config.settings)
-socketio.init_app(app, cors_allowed_origins="*")
+socketio.init_app(app, cors_allowed_origins="*", **socketio_options(app.config))
 
 # Enable CORS with specific configurations that work for all requests including OPTIONS/preflight
 CORS(app, resources={r"/*": {"origins": ["http://localhost:5173", "https://jasonow718.github.io"]}})
@@ -23,8 +38,25 @@ mail.init_app(app)
 
 # Create database tables if they don't exist
 with app.app_context():
+    had_chat_summaries = inspect(db.engine).has_table('chat_summary')
+    had_unread_counts = inspect(db.engine).has_table('unread_notification_count')
     db.create_all()
     
+    # Add columns and indexes introduced after an existing database was created
+    schema_changes = upgrade_schema()
+    if 'ride.approved_count' in schema_changes['columns']:
+        # Seat counters of rides created before they existed have to be backfilled
+        reconcile_seat_counters()
+    if not had_chat_summaries:
+        # Chats created before the inbox summary existed need a summary row
+        reconcile_chat_summaries()
+    if not had_unread_counts:
+        # Users notified before the unread counters existed need one
+        reconcile_unread_counts()
+    
+    # Create the full-text location search index (SQLite FTS5) if supported
+    ensure_location_index()
+    
     # Create admin user if not exists
     admin_email = "admin@ride2gather.com"
     admin = User.query.filter_by(email=admin_email).first()
@@ -71,6 +103,111 @@ app.register_blueprint(donation_bp, url_prefix='/api/donations')
 app.register_blueprint(admin_bp, url_prefix='/api/admin')
 app.register_blueprint(feedback_bp, url_prefix='/api/feedback')
 
+# Benchmark and broker commands
+register_commands(app)
+
+def start_background_services():
+    """
+    Start the background workers of a process that serves requests
+    
+    Importing this module, as every flask CLI command does, starts nothing;
+    a WSGI server has to call this from each worker once it has started.
+    """
+    # Start the background chat message writer if write-behind is enabled
+    init_message_writer(app)
+    
+    # Start the background notification workers if NOTIFICATION_ASYNC is enabled
+    init_notification_dispatcher(app)
+    
+    # Periodically repair unread notification counters that drifted
+    start_periodic_job(
+        app,
+        'unread-count-reconciler',
+        app.config.get('UNREAD_COUNT_RECONCILE_INTERVAL'),
+        reconcile_unread_counts
+    )
+    
+    # Periodically move expired notifications out of the notification table
+    start_periodic_job(
+        app,
+        'notification-retention',
+        app.config.get('NOTIFICATION_PURGE_INTERVAL'),
+        purge_notifications
+    )
+
+
+@app.cli.command('upgrade-schema')
+def upgrade_schema_command():
+    """Add missing columns and indexes to an existing database and drop obsolete indexes"""
+    schema_changes = upgrade_schema()
+    
+    for column in schema_changes['columns']:
+        click.echo(f"Added column {column}")
+    for index in schema_changes['indexes']:
+        click.echo(f"Created index {index}")
+    for index in schema_changes['dropped_indexes']:
+        click.echo(f"Dropped index {index}")
+    
+    click.echo(f"{len(schema_changes['columns'])} column(s) and {len(schema_changes['indexes'])} index(es) added, "
+               f"{len(schema_changes['dropped_indexes'])} index(es) dropped")
+
+@app.cli.command('reconcile-seats')
+@click.option('--dry-run', is_flag=True, help='Only report drift without fixing it')
+def reconcile_seats_command(dry_run):
+    """Rebuild ride seat counters from passenger_ride and report any drift"""
+    drift = reconcile_seat_counters(dry_run=dry_run)
+    
+    for entry in drift:
+        click.echo(
+            f"Ride {entry['rideID']}: approved {entry['approvedCount']} -> {entry['expectedApprovedCount']}, "
+            f"available {entry['availableSeats']} -> {entry['expectedAvailableSeats']}"
+        )
+    
+    action = "found" if dry_run else "fixed"
+    click.echo(f"{len(drift)} ride(s) with drifted seat counters {action}")
+
+@app.cli.command('reconcile-chats')
+@click.option('--dry-run', is_flag=True, help='Only report drift without fixing it')
+def reconcile_chats_command(dry_run):
+    """Rebuild chat inbox summaries from the message table and report any drift"""
+    drift = reconcile_chat_summaries(dry_run=dry_run)
+    
+    for entry in drift:
+        if entry['missing']:
+            click.echo(f"Chat {entry['chatID']}: summary missing")
+        else:
+            click.echo(
+                f"Chat {entry['chatID']}: messages {entry['messageCount']} -> {entry['expectedMessageCount']}, "
+                f"last message {entry['lastMessageID']} -> {entry['expectedLastMessageID']}"
+            )
+    
+    action = "found" if dry_run else "fixed"
+    click.echo(f"{len(drift)} chat(s) with drifted summaries {action}")
+
+@app.cli.command('reconcile-notifications')
+@click.option('--dry-run', is_flag=True, help='Only report drift without fixing it')
+def reconcile_notifications_command(dry_run):
+    """Rebuild unread notification counters from the notification table"""
+    drift = reconcile_unread_counts(dry_run=dry_run)
+    for entry in drift:
+        if entry['missing']:
+            click.echo(f"User {entry['userID']}: counter missing, expected {entry['expectedUnreadCount']}")
+        else:
+            click.echo(f"User {entry['userID']}: unread {entry['unreadCount']} -> {entry['expectedUnreadCount']}")
+    
+    action = "found" if dry_run else "fixed"
+    click.echo(f"{len(drift)} user(s) with drifted unread counters {action}")
+
+@app.cli.command('purge-notifications')
+@click.option('--dry-run', is_flag=True, help='Only count what would be purged')
+def purge_notifications_command(dry_run):
+    """Apply the notification retention policies now"""
+    stats = purge_notifications(dry_run=dry_run)
+    
+    action = "to move" if dry_run else "moved"
+    click.echo(f"Read notifications {action}: {stats['read']}")
+    click.echo(f"Unread notifications {action}: {stats['unread']}")
+    click.echo(f"Archived notifications {'to delete' if dry_run else 'deleted'}: {stats['archivePurged']}")
 
 # Sample route to test the application
 @app.route('/')
@@ -78,4 +215,7 @@ def index():
     return {'message': 'Welcome to Ride2Gather API!'}
 
 if __name__ == '__main__':
+    # Exit normally on SIGTERM so atexit handlers (the message writer) still run
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    start_background_services()
     socketio.run(app, debug=False, host="0.0.0.0", port=5000, allow_unsafe_werkzeug=True)
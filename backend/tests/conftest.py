@@ -0,0 +1,76 @@
+import os
+import sys
+import pytest
+from flask import Flask
+from werkzeug.security import generate_password_hash
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from app import socketio
+from app.models import db, User, UserRole, Driver, Passenger, Donor
+from app.routes import register_routes
+from app.utils import location_index
+from app.utils.socket_queue import socketio_options
+
+# Hashed once, hashing is slow and tests create many users
+PASSWORD_HASH = generate_password_hash('secret')
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    """Application on a throwaway SQLite database, with background workers off"""
+    app = Flask('ride2gather_tests')
+    app.config.from_mapping(Config().settings)
+    app.config.update(
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI='sqlite:///' + str(tmp_path_factory.mktemp('db') / 'test.sqlite'),
+        SOCKETIO_MESSAGE_QUEUE='',
+        NOTIFICATION_ASYNC=False,
+        MESSAGE_WRITE_BEHIND=False,
+        RIDE_UPDATE_COALESCE_WINDOW=0
+    )
+    db.init_app(app)
+    socketio.init_app(app, **socketio_options(app.config))
+    register_routes(app)
+    return app
+
+@pytest.fixture
+def database(app):
+    """Fresh tables for each test, inside an application context"""
+    with app.app_context():
+        db.create_all()
+        location_index.ensure_location_index()
+        yield db
+        db.session.remove()
+        location_index.drop_location_index()
+        db.drop_all()
+
+@pytest.fixture
+def make_user(database):
+    """Create users with a role and its profile row"""
+    def make_user(name, role='passenger'):
+        user = User(name=name, email=f'{name}@example.com', phone='0123456789', password=PASSWORD_HASH)
+        database.session.add(user)
+        database.session.flush()
+        
+        user_role = UserRole(role_name=role)
+        user_role.user_id = user.user_id
+        database.session.add(user_role)
+        
+        if role == 'driver':
+            database.session.add(Driver(
+                user_id=user.user_id,
+                license_number='D1234567',
+                car_number='WXY 1234',
+                car_type='Myvi',
+                car_color='Blue',
+                verification_status='approved'
+            ))
+        elif role == 'donor':
+            database.session.add(Donor(user_id=user.user_id))
+        else:
+            database.session.add(Passenger(user_id=user.user_id))
+        
+        database.session.commit()
+        return user
+    return make_user
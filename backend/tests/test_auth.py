@@ -0,0 +1,109 @@
+import datetime
+import jwt
+import pytest
+from flask import jsonify, request
+from sqlalchemy import event
+from app.models import db, UserRole
+from app.services import admin_service, auth_service
+from app.utils import principal_cache
+from app.utils.jwt_handler import role_required, token_required
+
+@token_required
+def whoami():
+    return jsonify({'id': request.user.user_id, 'name': request.user.name, 'roles': list(request.user.roles)})
+
+@role_required(['driver'])
+def drivers_only():
+    return jsonify({'id': request.user.user_id})
+
+@pytest.fixture(autouse=True)
+def principal_cache_per_test(monkeypatch):
+    """Each test starts with an empty cache, as a freshly started process would"""
+    monkeypatch.setattr(principal_cache, '_cache', None)
+
+def _restart_process(monkeypatch):
+    """Drop this process's cache, as if the request reached another worker"""
+    monkeypatch.setattr(principal_cache, '_cache', None)
+
+def _call(app, view, token):
+    """Call a view with a bearer token and return (status, json, queries issued)"""
+    statements = []
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        with app.test_request_context(headers={'Authorization': f'Bearer {token}'}):
+            response = app.make_response(view())
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return response.status_code, response.get_json(), statements
+
+def _legacy_token(app, user_id):
+    """Token issued before role claims were added"""
+    issued = datetime.datetime.utcnow()
+    return jwt.encode(
+        {'sub': str(user_id), 'iat': issued, 'exp': issued + datetime.timedelta(hours=1)},
+        app.config['SECRET_KEY'],
+        algorithm='HS256'
+    )
+
+def test_claims_authorize_without_loading_the_user(app, make_user, monkeypatch):
+    driver = make_user('driver', 'driver')
+    token = auth_service.generate_token(driver)
+    def load_principal(user_id):
+        raise AssertionError("principal loaded from the database")
+    monkeypatch.setattr(principal_cache, 'load_principal', load_principal)
+
+    status, body, statements = _call(app, drivers_only, token)
+
+    assert (status, body) == (200, {'id': driver.user_id})
+    # Only the primary key lookup of the user's change time
+    assert len(statements) == 1
+
+def test_cached_principal_makes_no_query(app, make_user):
+    rider = make_user('rider')
+    token = auth_service.generate_token(rider)
+    _call(app, whoami, token)
+
+    status, body, statements = _call(app, whoami, token)
+
+    assert (status, body) == (200, {'id': rider.user_id, 'name': 'rider', 'roles': ['passenger']})
+    assert statements == []
+
+def test_role_change_applies_to_older_tokens_in_every_process(app, database, make_user, monkeypatch):
+    driver = make_user('driver', 'driver')
+    token = auth_service.generate_token(driver)
+    assert _call(app, drivers_only, token)[0] == 200
+
+    UserRole.query.filter_by(user_id=driver.user_id, role_name='driver').delete()
+    database.session.commit()
+    principal_cache.invalidate_principal(driver.user_id)
+    assert _call(app, drivers_only, token)[0] == 403
+
+    # The change is read from the user row, not from this process's memory
+    _restart_process(monkeypatch)
+    assert _call(app, drivers_only, token)[0] == 403
+
+def test_deleted_user_is_refused_in_every_process(app, make_user, monkeypatch):
+    rider = make_user('rider')
+    token = auth_service.generate_token(rider)
+    assert _call(app, whoami, token)[0] == 200
+
+    success, error = admin_service.delete_user(rider.user_id)
+    assert success, error
+
+    _restart_process(monkeypatch)
+    status, body, _ = _call(app, whoami, token)
+    assert (status, body) == (404, {'error': 'User not found'})
+
+def test_legacy_token_is_authorized_from_the_database(app, make_user):
+    driver = make_user('driver', 'driver')
+    token = _legacy_token(app, driver.user_id)
+
+    assert _call(app, drivers_only, token)[0] == 200
+    status, body, _ = _call(app, whoami, token)
+    assert (status, body) == (200, {'id': driver.user_id, 'name': 'driver', 'roles': ['driver']})
+
+    rider = make_user('rider')
+    assert _call(app, drivers_only, _legacy_token(app, rider.user_id))[0] == 403
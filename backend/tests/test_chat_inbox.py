@@ -0,0 +1,48 @@
+from app.models import db, Ride, PassengerRide
+from app.services import auth_service, chat_service
+
+CHATS = 25
+
+def _user_with_chats(make_user, count):
+    driver = make_user('driver', 'driver')
+    passenger = make_user('passenger')
+    for _ in range(count):
+        ride = Ride(driver_id=driver.user_id, starting_location='KL Sentral', dropoff_location='Sunway', passenger_count=3)
+        db.session.add(ride)
+        db.session.flush()
+        db.session.add(PassengerRide(user_id=passenger.user_id, ride_id=ride.ride_id, status='approved'))
+        db.session.commit()
+        chat_service.create_chat_for_ride(ride.ride_id)
+    return passenger
+
+def test_inbox_is_paged_by_default(app, make_user):
+    passenger = _user_with_chats(make_user, CHATS)
+    headers = {'Authorization': f'Bearer {auth_service.generate_token(passenger)}'}
+    client = app.test_client()
+    
+    response = client.get(f'/chats/user/{passenger.user_id}/chats', headers=headers)
+    assert response.status_code == 200
+    inbox = response.get_json()
+    assert len(inbox['chats']) == 20
+    
+    # The rest of the inbox is reached by following nextPage
+    chat_ids = [chat['chat_id'] for chat in inbox['chats']]
+    while inbox['pagination']['nextPage']:
+        inbox = client.get(
+            f'/chats/user/{passenger.user_id}/chats?page={inbox["pagination"]["nextPage"]}',
+            headers=headers
+        ).get_json()
+        chat_ids += [chat['chat_id'] for chat in inbox['chats']]
+    assert len(set(chat_ids)) == len(chat_ids) == CHATS
+
+def test_inbox_pages_when_asked(app, make_user):
+    passenger = _user_with_chats(make_user, CHATS)
+    headers = {'Authorization': f'Bearer {auth_service.generate_token(passenger)}'}
+    client = app.test_client()
+    
+    first = client.get(f'/chats/user/{passenger.user_id}/chats?size=20', headers=headers).get_json()
+    second = client.get(f'/chats/user/{passenger.user_id}/chats?page=2&size=20', headers=headers).get_json()
+    
+    assert len(first['chats']) == 20 and first['pagination']['nextPage'] == 2
+    assert len(second['chats']) == CHATS - 20 and second['pagination']['nextPage'] is None
+    assert {chat['chat_id'] for chat in first['chats']}.isdisjoint(chat['chat_id'] for chat in second['chats'])
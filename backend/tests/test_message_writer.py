@@ -0,0 +1,83 @@
+import time
+from datetime import datetime
+from app.models import Chat, ChatSummary, Message, MessageDeadLetter
+from app.services import chat_service
+from app.services.message_writer import IdAllocator, MessageWriter
+
+WORKERS = 3
+MESSAGES_PER_WORKER = 6
+
+def test_messages_from_interleaved_id_blocks_keep_send_order(app, database, make_user):
+    """Processes reserve separate ID blocks; history still follows send time"""
+    sender = make_user('sender')
+    chat = Chat()
+    database.session.add(chat)
+    database.session.commit()
+
+    # One allocator per simulated worker process, sharing the sequence row
+    allocators = [IdAllocator(app, 'message', Message.message_id, block_size=100) for _ in range(WORKERS)]
+    batches = {index: [] for index in range(WORKERS)}
+    sent = []
+    for number in range(WORKERS * MESSAGES_PER_WORKER):
+        index = number % WORKERS
+        message_id, send_time = allocators[index].allocate()
+        batches[index].append({
+            'message_id': message_id,
+            'chat_id': chat.chat_id,
+            'ride_id': None,
+            'user_id': sender.user_id,
+            'content': f'message {number}',
+            'send_time': send_time
+        })
+        sent.append(message_id)
+        # Keep send times apart on clocks with coarse resolution
+        time.sleep(0.001)
+
+    # Each process writes its own batches, in any order
+    writer = MessageWriter(app)
+    for index in reversed(range(WORKERS)):
+        writer._write_batch(batches[index])
+    assert sent != sorted(sent)
+
+    latest, _ = chat_service.get_messages(chat.chat_id, limit=5)
+    assert [message['message_id'] for message in latest['messages']] == sent[-5:]
+    older, _ = chat_service.get_messages(chat.chat_id, before=sent[-5], limit=5)
+    assert [message['message_id'] for message in older['messages']] == sent[-10:-5]
+    newer, _ = chat_service.get_messages(chat.chat_id, after=sent[3], limit=5)
+    assert [message['message_id'] for message in newer['messages']] == sent[4:9]
+
+    summary = database.session.get(ChatSummary, chat.chat_id)
+    assert summary.last_message_id == sent[-1]
+    assert chat_service.reconcile_chat_summaries(dry_run=True) == []
+
+def test_rejected_messages_are_isolated_and_dead_lettered(app, database):
+    """One bad row in a batch does not cost the other messages"""
+    chat = Chat()
+    database.session.add(chat)
+    database.session.commit()
+
+    writer = MessageWriter(app)
+    batch = [
+        {
+            'message_id': message_id,
+            'chat_id': chat.chat_id,
+            'ride_id': None,
+            'user_id': None,
+            # content is NOT NULL
+            'content': None if message_id in (3, 6) else f'message {message_id}',
+            'send_time': datetime.utcnow()
+        }
+        for message_id in range(1, 9)
+    ]
+    writer._write_batch(batch)
+
+    written = [message_id for (message_id,) in database.session.query(Message.message_id).order_by(Message.message_id)]
+    assert written == [1, 2, 4, 5, 7, 8]
+
+    dead_letters = database.session.query(MessageDeadLetter).order_by(MessageDeadLetter.message_id).all()
+    assert [dead_letter.message_id for dead_letter in dead_letters] == [3, 6]
+    assert all(dead_letter.error for dead_letter in dead_letters)
+
+    summary = database.session.get(ChatSummary, chat.chat_id)
+    assert summary.message_count == 6
+    assert summary.last_message_id == 8
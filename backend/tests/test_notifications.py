@@ -0,0 +1,118 @@
+from app.models import Notification
+from app.services import auth_service, notification_service, ride_service
+from app.services.notification_dispatcher import NotificationDispatcher
+from app.services.notification_service import Notice, RIDE_DRIVER
+from app.utils.observer_pattern import Observer, get_notification_subject
+
+class RecordingObserver(Observer):
+    def __init__(self):
+        self.received = []
+
+    def update(self, data):
+        self.received.append(data)
+
+def test_create_notification_stores_without_registered_observers(database, make_user):
+    user = make_user('rider')
+    database.session.commit()
+    subject = get_notification_subject()
+    observer = RecordingObserver()
+    subject.attach(observer)
+    try:
+        # Nothing is registered for the user's topic, as after an eviction
+        assert subject.get_observers(user.user_id) == []
+
+        notification, error = notification_service.create_notification(user.user_id, 'Ride approved')
+    finally:
+        subject.detach(observer)
+
+    assert error is None
+    assert notification.message == 'Ride approved'
+    assert Notification.query.filter_by(user_id=user.user_id).count() == 1
+    assert notification_service.get_unread_count(user.user_id) == 1
+    assert [(data['user_id'], data['id']) for data in observer.received] == [(user.user_id, notification.notification_id)]
+
+def test_create_notification_for_unknown_user(database):
+    notification, error = notification_service.create_notification(9999, 'Ride approved')
+
+    assert notification is None
+    assert error == 'User with ID 9999 not found'
+
+def _ride(make_user, database):
+    driver = make_user('driver', 'driver')
+    database.session.commit()
+    ride, error = ride_service.create_ride(driver.user_id, 'KL Sentral', 'Sunway', 4)
+    assert error is None
+    return driver, ride['rideID']
+
+def test_notices_are_worded_from_ids_when_stored(app, database, make_user):
+    driver, ride_id = _ride(make_user, database)
+    passengers = [make_user(f'passenger{number}') for number in range(3)]
+    database.session.commit()
+
+    dispatcher = NotificationDispatcher(app, workers=1)
+    dispatcher.start()
+    try:
+        for passenger in passengers:
+            assert dispatcher.submit([
+                Notice('ride_request', RIDE_DRIVER, ride_id, passenger.user_id),
+                Notice('ride_request_submitted', passenger.user_id, ride_id)
+            ])
+        # Unknown rides are skipped without failing the batch
+        assert dispatcher.submit([Notice('ride_request_submitted', passengers[0].user_id, 9999)])
+        dispatcher.flush()
+    finally:
+        dispatcher.stop()
+
+    database.session.expire_all()
+    driver_messages = [notification.message for notification in Notification.query.filter_by(user_id=driver.user_id)]
+    # The requests are coalesced, whichever batches they were stored in
+    assert driver_messages == ['3 new ride requests for the trip from KL Sentral to Sunway']
+
+    for passenger in passengers:
+        assert [notification.message for notification in Notification.query.filter_by(user_id=passenger.user_id)] == [
+            'You have submitted a ride request from KL Sentral to Sunway'
+        ]
+    assert dispatcher.metrics()['failed'] == 0
+
+def test_group_opened_concurrently_is_merged_into(database, make_user, monkeypatch):
+    driver, ride_id = _ride(make_user, database)
+    group = notification_service.ride_group('ride_request', ride_id, lambda count: f'{count} new ride requests')
+    notification_service._store_notifications([(driver.user_id, 'New ride request', group)])
+
+    # The second worker looked before the first one's row was committed
+    find_open_groups = notification_service._find_open_groups
+    lookups = []
+    def stale_find_open_groups(pairs, since):
+        lookups.append(pairs)
+        return {} if len(lookups) == 1 else find_open_groups(pairs, since)
+    monkeypatch.setattr(notification_service, '_find_open_groups', stale_find_open_groups)
+
+    created = notification_service._store_notifications([(driver.user_id, 'New ride request', group)])
+
+    assert len(lookups) == 2
+    notifications = Notification.query.filter_by(user_id=driver.user_id).all()
+    assert [(notification.message, notification.group_count) for notification in notifications] == [('2 new ride requests', 2)]
+    assert [formatted['id'] for _, formatted in created] == [notifications[0].notification_id]
+    assert notification_service.get_unread_count(driver.user_id) == 1
+
+def test_ride_request_with_string_ids_notifies_driver_and_passenger(app, database, make_user):
+    driver, ride_id = _ride(make_user, database)
+    passenger = make_user('passenger')
+    database.session.commit()
+    headers = {'Authorization': f'Bearer {auth_service.generate_token(passenger)}'}
+
+    # The frontend sends the ride ID from the route params, as a string
+    response = app.test_client().post('/rides/requests', json={
+        'rideID': str(ride_id),
+        'passengerID': str(passenger.user_id),
+        'seatCount': 1
+    }, headers=headers)
+    assert response.status_code == 201
+
+    database.session.expire_all()
+    assert [notification.message for notification in Notification.query.filter_by(user_id=driver.user_id)] == [
+        'New ride request from passenger for the trip from KL Sentral to Sunway'
+    ]
+    assert [notification.message for notification in Notification.query.filter_by(user_id=passenger.user_id)] == [
+        'You have submitted a ride request from KL Sentral to Sunway'
+    ]
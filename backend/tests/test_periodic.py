@@ -0,0 +1,20 @@
+from datetime import datetime, timedelta
+from app.models import PeriodicJobRun
+from app.utils.periodic import PeriodicJob
+
+def test_one_process_runs_each_interval(app, database):
+    # The same job started by two serving processes
+    jobs = [PeriodicJob(app, 'reconciler', 3600, lambda: None) for _ in range(2)]
+
+    assert [job.claim() for job in jobs] == [True, False]
+    assert [job.claim() for job in jobs] == [False, False]
+
+    # The interval passed, so whichever process wakes first runs the job
+    run = database.session.get(PeriodicJobRun, 'reconciler')
+    run.last_run_at = datetime.utcnow() - timedelta(seconds=3600)
+    database.session.commit()
+    assert [job.claim() for job in reversed(jobs)] == [True, False]
+
+def test_jobs_are_claimed_separately(app, database):
+    assert PeriodicJob(app, 'reconciler', 3600, lambda: None).claim()
+    assert PeriodicJob(app, 'retention', 3600, lambda: None).claim()
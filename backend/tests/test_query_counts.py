@@ -0,0 +1,151 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event
+from app.models import db, Ride, PassengerRide, Chat, Message, Donation, Feedback
+from app.services import chat_service, donation_service, feedback_service, ride_service
+
+# Sizes the listings are measured at; each must cost the same number of queries
+SIZES = (2, 10, 30)
+
+def _count_queries(app, call):
+    """
+    Run a call in a fresh application context and count its SQL statements
+    
+    A new context means a new session and a new request-scoped user loader,
+    so nothing cached while preparing the data is reused.
+    """
+    statements = []
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            result = call()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+            db.session.remove()
+    return len(statements), result
+
+def _assert_constant(app, grow, call, size_of):
+    """Grow the data to each size and check the query count never changes"""
+    counts = {}
+    for size in SIZES:
+        grow(size)
+        counts[size], result = _count_queries(app, call)
+        assert size_of(result) == size
+    
+    assert len(set(counts.values())) == 1, f"Query count grows with N: {counts}"
+
+def _grower(make_rows):
+    """Wrap a row factory so that each call tops the data up to the given size"""
+    made = []
+    
+    def grow(size):
+        while len(made) < size:
+            made.append(make_rows(len(made)))
+            db.session.commit()
+    return grow
+
+@pytest.fixture
+def ride(make_user):
+    driver = make_user('driver', 'driver')
+    ride = Ride(
+        driver_id=driver.user_id,
+        starting_location='KL Sentral',
+        dropoff_location='Sunway',
+        passenger_count=100,
+        request_time=datetime.utcnow() + timedelta(days=1)
+    )
+    db.session.add(ride)
+    db.session.commit()
+    return ride
+
+def test_get_messages_query_count_is_constant(app, make_user, ride):
+    chat = Chat(ride_id=ride.ride_id)
+    db.session.add(chat)
+    db.session.commit()
+    chat_id = chat.chat_id
+    
+    def add_message(number):
+        sender = make_user(f'sender{number}')
+        db.session.add(Message(chat_id=chat_id, user_id=sender.user_id, content=f'message {number}'))
+    
+    _assert_constant(
+        app,
+        _grower(add_message),
+        lambda: chat_service.get_messages(chat_id),
+        lambda result: len(result[0]['messages'])
+    )
+
+def test_get_user_donations_query_count_is_constant(app, make_user):
+    recipient_id = make_user('recipient').user_id
+    
+    def add_donation(number):
+        donor = make_user(f'donor{number}', 'donor')
+        db.session.add(Donation(user_id=recipient_id, donor_id=donor.user_id, amount=5.0))
+    
+    _assert_constant(
+        app,
+        _grower(add_donation),
+        lambda: donation_service.get_user_donations(recipient_id, size=100),
+        lambda result: len(result['donations'])
+    )
+
+def test_get_donor_donations_query_count_is_constant(app, make_user):
+    donor_id = make_user('donor', 'donor').user_id
+    
+    def add_donation(number):
+        recipient = make_user(f'recipient{number}')
+        db.session.add(Donation(user_id=recipient.user_id, donor_id=donor_id, amount=5.0))
+    
+    _assert_constant(
+        app,
+        _grower(add_donation),
+        lambda: donation_service.get_donor_donations(donor_id, size=100),
+        lambda result: len(result['donations'])
+    )
+
+def test_get_system_donations_query_count_is_constant(app, make_user):
+    def add_donation(number):
+        donor = make_user(f'donor{number}', 'donor')
+        # System donations have no recipient
+        db.session.add(Donation(user_id=None, donor_id=donor.user_id, amount=5.0))
+    
+    _assert_constant(
+        app,
+        _grower(add_donation),
+        lambda: donation_service.get_system_donations(size=100),
+        lambda result: len(result['donations'])
+    )
+
+def test_get_all_feedback_query_count_is_constant(app, make_user):
+    def add_feedback(number):
+        driver = make_user(f'driver{number}', 'driver')
+        passenger = make_user(f'passenger{number}')
+        ride = Ride(driver_id=driver.user_id, starting_location='A', dropoff_location='B', passenger_count=1)
+        db.session.add(ride)
+        db.session.flush()
+        db.session.add(Feedback(user_id=passenger.user_id, ride_id=ride.ride_id, issue_type='Late', comments='Late'))
+    
+    _assert_constant(
+        app,
+        _grower(add_feedback),
+        feedback_service.get_all_feedback,
+        lambda result: len(result[0])
+    )
+
+def test_get_ride_details_with_passengers_query_count_is_constant(app, make_user, ride):
+    ride_id = ride.ride_id
+    
+    def add_passenger(number):
+        passenger = make_user(f'passenger{number}')
+        db.session.add(PassengerRide(user_id=passenger.user_id, ride_id=ride_id, status='approved'))
+    
+    _assert_constant(
+        app,
+        _grower(add_passenger),
+        lambda: ride_service.get_ride_details_with_passengers(ride_id),
+        lambda result: len(result['passengers'])
+    )
@@ -0,0 +1,166 @@
+import re
+import pytest
+from sqlalchemy import event, inspect, text
+from app.models import db
+from app.models.migrations import upgrade_schema
+from app.services import ride_service, chat_service, notification_service, donation_service
+
+# Statements whose plans are checked; inserts never read through an index
+EXPLAINED_STATEMENTS = ('SELECT', 'UPDATE', 'DELETE', 'WITH')
+
+def _capture_statements(call):
+    """Run a service call and return the SELECT/UPDATE/DELETE statements it issued"""
+    statements = []
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().split()[0].upper() in EXPLAINED_STATEMENTS:
+            statements.append((statement, parameters))
+    
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        call()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return statements
+
+def _query_plans(statements):
+    """Run each statement through EXPLAIN QUERY PLAN and return the plan lines"""
+    with db.engine.connect() as connection:
+        return [
+            (statement, [row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()])
+            for statement, parameters in statements
+        ]
+
+def _table_scans(plan):
+    """Plan lines that scan a real table instead of searching an index"""
+    tables = set(db.metadata.tables)
+    scans = []
+    for line in plan:
+        match = re.match(r'SCAN (?:TABLE )?(\w+)', line)
+        # Derived tables (count() subqueries, CTEs) are scanned by design
+        if match and match.group(1) in tables:
+            scans.append(line)
+    return scans
+
+@pytest.fixture
+def sample(make_user):
+    """A ride with an approved passenger, chat messages, notifications and a donation"""
+    driver = make_user('driver', 'driver')
+    passenger = make_user('passenger')
+    donor = make_user('donor', 'donor')
+    
+    ride_data, _ = ride_service.create_ride(driver.user_id, 'KL Sentral', 'Sunway', 3)
+    ride_id = ride_data['rideID']
+    ride_service.request_ride(ride_id, passenger.user_id, 1)
+    ride_service.approve_ride_request(ride_id, passenger.user_id, driver.user_id)
+    
+    chat_data, _ = chat_service.get_chat_by_ride_id(ride_id)
+    for number in range(3):
+        message_data, _ = chat_service.send_message(chat_data['chat_id'], passenger.user_id, f'message {number}')
+    
+    notification_service.notify_many([passenger.user_id, driver.user_id], 'Welcome')
+    donation_service.create_donation(passenger.user_id, donor.user_id, 5.0)
+    
+    return {
+        'driver_id': driver.user_id,
+        'passenger_id': passenger.user_id,
+        'donor_id': donor.user_id,
+        'ride_id': ride_id,
+        'chat_id': chat_data['chat_id'],
+        'message_id': message_data['message_id']
+    }
+
+# Service call and an index its queries are expected to use
+SERVICE_QUERIES = {
+    'ride_service.get_driver_ride_requests': (
+        lambda s: ride_service.get_driver_ride_requests(s['driver_id']),
+        'ix_passenger_ride_ride_id_status'
+    ),
+    'ride_service.get_passenger_ride_requests': (
+        lambda s: ride_service.get_passenger_ride_requests(s['passenger_id']),
+        'ix_passenger_ride_user_id_status'
+    ),
+    'ride_service.get_ride_details_with_passengers': (
+        lambda s: ride_service.get_ride_details_with_passengers(s['ride_id']),
+        'ix_passenger_ride_ride_id_status'
+    ),
+    'ride_service.get_user_ride_history': (
+        lambda s: ride_service.get_user_ride_history(s['driver_id']),
+        'ix_ride_driver_id'
+    ),
+    'ride_service.get_homepage_data': (
+        lambda s: ride_service.get_homepage_data(s['passenger_id']),
+        'ix_passenger_ride_user_id_status'
+    ),
+    'ride_service.get_all_rides': (
+        lambda s: ride_service.get_all_rides(),
+        'ix_ride_request_time_ride_id'
+    ),
+    'ride_service.get_rides_by_cursor': (
+        lambda s: ride_service.get_rides_by_cursor(),
+        'ix_ride_request_time_ride_id'
+    ),
+    'chat_service.get_messages': (
+        lambda s: chat_service.get_messages(s['chat_id']),
+        'ix_message_chat_id_send_time'
+    ),
+    'chat_service.get_messages (before)': (
+        lambda s: chat_service.get_messages(s['chat_id'], before=s['message_id']),
+        'ix_message_chat_id_send_time'
+    ),
+    'chat_service.get_user_chats': (
+        lambda s: chat_service.get_user_chats(s['passenger_id']),
+        'ix_chat_summary_ride_id_last_send_time'
+    ),
+    'notification_service.get_user_notifications': (
+        lambda s: notification_service.get_user_notifications(s['passenger_id']),
+        'ix_notification_user_id_read_time'
+    ),
+    'notification_service.get_user_notifications(unread_only)': (
+        lambda s: notification_service.get_user_notifications(s['passenger_id'], unread_only=True),
+        'ix_notification_user_id_read_time'
+    ),
+    'notification_service.mark_all_notifications_read': (
+        lambda s: notification_service.mark_all_notifications_read(s['passenger_id']),
+        'ix_notification_user_id_read_time'
+    ),
+    'donation_service.get_user_donations': (
+        lambda s: donation_service.get_user_donations(s['passenger_id']),
+        'ix_donation_user_id_date'
+    ),
+    'donation_service.get_donor_donations': (
+        lambda s: donation_service.get_donor_donations(s['donor_id']),
+        'ix_donation_donor_id_date'
+    ),
+    'donation_service.get_donor_stats': (
+        lambda s: donation_service.get_donor_stats(s['donor_id']),
+        'ix_donation_donor_id_date'
+    ),
+}
+
+@pytest.mark.parametrize('name', list(SERVICE_QUERIES))
+def test_service_queries_use_indexes(sample, name):
+    call, expected_index = SERVICE_QUERIES[name]
+    
+    plans = _query_plans(_capture_statements(lambda: call(sample)))
+    assert plans, f"{name} issued no queries"
+    
+    for statement, plan in plans:
+        assert not _table_scans(plan), f"{name} scans a table:\n{statement}\n" + "\n".join(plan)
+    
+    plan_lines = [line for _, plan in plans for line in plan]
+    assert any(
+        f'USING INDEX {expected_index}' in line or f'USING COVERING INDEX {expected_index}' in line
+        for line in plan_lines
+    ), f"{name} does not use {expected_index}:\n" + "\n".join(plan_lines)
+
+def test_upgrade_drops_obsolete_indexes(database):
+    with db.engine.begin() as connection:
+        connection.execute(text(
+            'CREATE INDEX ix_ride_status_request_time_available_seats ON ride (status, request_time, available_seats)'
+        ))
+    
+    schema_changes = upgrade_schema()
+    
+    assert schema_changes['dropped_indexes'] == ['ix_ride_status_request_time_available_seats']
+    assert 'ix_ride_status_request_time_available_seats' not in {index['name'] for index in inspect(db.engine).get_indexes('ride')}
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app.models import db
+from app.services import ride_service
+from app.utils import location_index
+
+def _rides(make_user, *routes):
+    driver = make_user('driver', 'driver')
+    tomorrow = datetime.now() + timedelta(days=1)
+    ride_ids = []
+    for starting_location, dropoff_location in routes:
+        ride, error = ride_service.create_ride(driver.user_id, starting_location, dropoff_location, 3, tomorrow)
+        assert error is None
+        ride_ids.append(ride['rideID'])
+    return ride_ids
+
+def _found(result):
+    return [ride['rideID'] for ride in result['rides']]
+
+def test_fulltext_search_matches_location_tokens(make_user):
+    sentral_to_sunway, subang_to_sentral = _rides(
+        make_user,
+        ('KL Sentral', 'Sunway Pyramid'),
+        ('Subang Jaya', 'KL Sentral')
+    )
+
+    statements = []
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        # Token prefixes in any order, which substring matching can't find
+        result = ride_service.get_all_rides(starting_location='sentral kl', search_mode='fulltext')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+    assert _found(result) == [sentral_to_sunway]
+    assert any(f'{location_index.FTS_TABLE} MATCH' in statement for statement in statements)
+    assert _found(ride_service.get_all_rides(starting_location='sentral kl')) == []
+
+    result = ride_service.get_all_rides(dropoff_location='sent', search_mode='fulltext')
+    assert _found(result) == [subang_to_sentral]
+
+def test_index_created_after_the_first_check_is_used(make_user, monkeypatch):
+    location_index.drop_location_index()
+    ride_id, = _rides(make_user, ('KL Sentral', 'Sunway Pyramid'))
+
+    assert not location_index.is_available()
+    # Without the index, full-text requests fall back to substring matching
+    assert _found(ride_service.get_all_rides(starting_location='Sentral', search_mode='fulltext')) == [ride_id]
+
+    # Another process creates the index; this one finds it on the next search
+    assert location_index.ensure_location_index()
+    monkeypatch.setattr(location_index, '_available', set())
+    assert location_index.is_available()
+    # Rides created before the index are indexed when it is built
+    assert _found(ride_service.get_all_rides(starting_location='sentral kl', search_mode='fulltext')) == [ride_id]
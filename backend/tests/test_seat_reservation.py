@@ -0,0 +1,94 @@
+import threading
+from app.models import db, Ride, PassengerRide
+from app.services import ride_service
+
+PASSENGERS = 24
+SEATS = 3
+
+def _run_concurrently(app, calls):
+    """Run each call on its own thread with its own application context, all released at once"""
+    barrier = threading.Barrier(len(calls))
+    results = [None] * len(calls)
+    
+    def worker(index, call):
+        with app.app_context():
+            barrier.wait()
+            try:
+                results[index] = call()
+            finally:
+                db.session.remove()
+    
+    threads = [threading.Thread(target=worker, args=(index, call)) for index, call in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def _ride_with_requests(make_user, passengers):
+    driver = make_user('driver', 'driver')
+    ride_data, error = ride_service.create_ride(driver.user_id, 'KL Sentral', 'Sunway', SEATS)
+    assert error is None
+    
+    passenger_ids = []
+    for number in range(passengers):
+        passenger = make_user(f'passenger{number}')
+        _, error = ride_service.request_ride(ride_data['rideID'], passenger.user_id, 1)
+        assert error is None
+        passenger_ids.append(passenger.user_id)
+    
+    return driver.user_id, ride_data['rideID'], passenger_ids
+
+def _assert_capacity_held(ride_id):
+    db.session.expire_all()
+    ride = Ride.query.get(ride_id)
+    approved = PassengerRide.query.filter_by(ride_id=ride_id, status='approved').count()
+    
+    assert ride.approved_count <= ride.passenger_count
+    assert ride.available_seats >= 0
+    assert ride.approved_count == approved
+    assert ride.available_seats == ride.passenger_count - approved
+    return approved
+
+def test_concurrent_approvals_never_overbook(app, make_user):
+    driver_id, ride_id, passenger_ids = _ride_with_requests(make_user, PASSENGERS)
+    
+    results = _run_concurrently(app, [
+        lambda passenger_id=passenger_id: ride_service.approve_ride_request(ride_id, passenger_id, driver_id)
+        for passenger_id in passenger_ids
+    ])
+    
+    approved = _assert_capacity_held(ride_id)
+    assert approved == sum(1 for data, _ in results if data)
+    assert approved == SEATS
+
+def test_concurrent_approvals_of_one_request_apply_once(app, make_user):
+    driver_id, ride_id, passenger_ids = _ride_with_requests(make_user, 1)
+    
+    results = _run_concurrently(app, [
+        lambda: ride_service.approve_ride_request(ride_id, passenger_ids[0], driver_id)
+        for _ in range(8)
+    ])
+    
+    assert _assert_capacity_held(ride_id) == 1
+    assert sum(1 for data, _ in results if data) == 1
+
+def test_concurrent_approvals_and_cancellations_keep_counters(app, make_user):
+    driver_id, ride_id, passenger_ids = _ride_with_requests(make_user, PASSENGERS)
+    approving, cancelling = passenger_ids[::2], passenger_ids[1::2]
+    
+    results = _run_concurrently(app, [
+        lambda passenger_id=passenger_id: ride_service.approve_ride_request(ride_id, passenger_id, driver_id)
+        for passenger_id in approving
+    ] + [
+        lambda passenger_id=passenger_id: ride_service.cancel_ride_request(ride_id, passenger_id)
+        for passenger_id in cancelling
+    ])
+    
+    approved = _assert_capacity_held(ride_id)
+    assert approved == sum(1 for data, _ in results[:len(approving)] if data)
+    assert PassengerRide.query.filter(
+        PassengerRide.ride_id == ride_id,
+        PassengerRide.user_id.in_(cancelling),
+        PassengerRide.status == 'approved'
+    ).count() == 0
@@ -0,0 +1,45 @@
+from app import socketio
+from app import events  # noqa: F401 - registers the event handlers
+from app.services import admin_service, auth_service
+from app.utils.room_events import room_event_log
+
+def _events(client, name):
+    return [event['args'][0] for event in client.get_received() if event['name'] == name]
+
+def test_chat_join_and_leave_are_not_broadcast_or_sequenced(app):
+    first = socketio.test_client(app)
+    second = socketio.test_client(app)
+    seq_before = room_event_log.current_seq('chat_41')
+
+    first.emit('join', {'chat_id': 41})
+    assert [joined['chat_id'] for joined in _events(first, 'joined')] == [41]
+
+    second.emit('join', {'chat_id': 41})
+    second.emit('leave', {'chat_id': 41})
+    assert _events(first, 'joined') == []
+    assert _events(first, 'left') == []
+    assert [left['chat_id'] for left in _events(second, 'left')] == [41]
+
+    # Control events take no room sequence numbers or replay buffer slots
+    assert room_event_log.current_seq('chat_41') == seq_before
+    assert room_event_log.since('chat_41', seq_before, room_event_log.epoch) == []
+
+    first.disconnect()
+    second.disconnect()
+
+def test_join_user_refuses_tokens_of_deleted_users(app, database, make_user):
+    user = make_user('rider')
+    database.session.commit()
+    token = auth_service.generate_token(user)
+    user_id = user.user_id
+
+    client = socketio.test_client(app)
+    client.emit('join_user', {'token': token})
+    assert [joined['status'] for joined in _events(client, 'joined_user')] == ['success']
+
+    success, error = admin_service.delete_user(user_id)
+    assert success, error
+
+    client.emit('join_user', {'token': token})
+    assert _events(client, 'joined_user') == [{'status': 'error', 'message': 'User not found'}]
+    client.disconnect()
@@ -0,0 +1,92 @@
+import multiprocessing
+import queue
+import threading
+import socketio
+from app.utils import socket_queue
+from app.utils.socket_queue import LocalPubSubClient, LocalPubSubManager, _encode_command, start_broker
+
+# Worker processes are forked so they share this module without re-importing it
+context = multiprocessing.get_context('fork')
+
+class RecordingManager(LocalPubSubManager):
+    """Manager that reports emits received from other workers instead of sending them to clients"""
+    def __init__(self, url, received):
+        super().__init__(url)
+        self.received = received
+
+    def _handle_emit(self, message):
+        self.received.put((message['event'], message['data'], message.get('room')))
+
+def _run_worker(url, received, stop):
+    """Worker process listening on the broker until stopped"""
+    server = socketio.Server(async_mode='threading', client_manager=RecordingManager(url, received))
+    server.manager.initialize()
+    stop.wait()
+
+def _run_emitter(url, stop):
+    """Worker process emitting a room event until stopped"""
+    server = socketio.Server(async_mode='threading', client_manager=LocalPubSubManager(url, write_only=True))
+    # The listener may not have subscribed yet, and the broker keeps nothing
+    while not stop.wait(0.1):
+        server.emit('ride_updated', {'ride_id': 7}, room='rides')
+
+def test_event_emitted_by_one_worker_reaches_another():
+    broker = start_broker(port=0)
+    url = f'local://127.0.0.1:{broker.server_address[1]}'
+    listener_received = context.Queue()
+    stop = context.Event()
+    workers = [
+        context.Process(target=_run_worker, args=(url, listener_received, stop), daemon=True),
+        context.Process(target=_run_emitter, args=(url, stop), daemon=True)
+    ]
+    try:
+        for worker in workers:
+            worker.start()
+
+        assert listener_received.get(timeout=10) == ('ride_updated', {'ride_id': 7}, 'rides')
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join(5)
+            if worker.is_alive():
+                worker.terminate()
+        broker.shutdown()
+        broker.server_close()
+
+def test_listener_reconnects_after_an_error_reply(monkeypatch):
+    broker = start_broker(port=0)
+    port = broker.server_address[1]
+    subscribe = LocalPubSubClient.subscribe
+    attempts = []
+
+    def subscribe_rejected_once(client, *channels):
+        attempts.append(channels)
+        if len(attempts) == 1:
+            # The broker answers an unknown command with -ERR
+            client._socket.sendall(_encode_command('SUBSCRIBE-REJECTED', *channels))
+            client._socket.settimeout(None)
+        else:
+            subscribe(client, *channels)
+    monkeypatch.setattr(socket_queue.LocalPubSubClient, 'subscribe', subscribe_rejected_once)
+
+    manager = LocalPubSubManager(f'local://127.0.0.1:{port}')
+    received = queue.Queue()
+    threading.Thread(target=lambda: [received.put(data) for data in manager._listen()], daemon=True).start()
+
+    publisher = LocalPubSubClient('127.0.0.1', port)
+    try:
+        # Published until the listener is subscribed again
+        for _ in range(50):
+            publisher.publish(manager.channel, b'event')
+            try:
+                assert received.get(timeout=0.2) == b'event'
+                break
+            except queue.Empty:
+                continue
+        else:
+            raise AssertionError("Listener did not resubscribe after the error reply")
+        assert len(attempts) == 2
+    finally:
+        publisher.close()
+        broker.shutdown()
+        broker.server_close()
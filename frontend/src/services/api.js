@@ -162,6 +162,9 @@ export const notificationService = {
   // Get notifications for the current user
   getNotifications: (params) => api.get('/notifications', { params }),
   
+  // Get the unread notification count for the badge
+  getUnreadCount: () => api.get('/notifications/unread-count'),
+  
   // Mark a notification as read
   markAsRead: (notificationId) => withToast(
     () => api.put(`/notifications/read/${notificationId}`),
@@ -292,14 +295,15 @@ export const chatService = {
   // Get chat for a ride
   getChatByRideId: (rideId) => api.get(`/chats/ride/${rideId}`),
   
-  // Get messages for a chat
-  getMessages: (chatId) => api.get(`/chats/${chatId}/messages`),
+  // Get messages for a chat (params: before, after, limit)
+  getMessages: (chatId, params) => api.get(`/chats/${chatId}/messages`, { params }),
   
   // Send a message in a chat
   sendMessage: (chatId, content) => api.post(`/chats/${chatId}/messages`, { content }),
   
-  // Get all chats for a user
-  getUserChats: (userId) => api.get(`/chats/user/${userId}/chats`),
+  // Get a page of a user's chats, most recently active first (params: page, size; 20 per page by default).
+  // Request pagination.nextPage for more until it is null
+  getUserChats: (userId, params) => api.get(`/chats/user/${userId}/chats`, { params }),
   
   // Create a new chat for a ride
   createChat: (rideId) => withToast(
@@ -6,7 +6,15 @@ export const useSocketStore = defineStore('socket', {
   state: () => ({
     socket: null,
     isConnected: false,
-    rideUpdates: []
+    rideUpdates: [],
+    // Ride buckets ({ startingLocation, date }) to follow instead of every ride
+    rideBuckets: null,
+    // Last event seq received per ride room, sent back on rejoin to replay missed events
+    ridesSeqs: {},
+    ridesEpoch: null,
+    // Last push received in the user's private room
+    userSeq: null,
+    userEpoch: null
   }),
 
   actions: {
@@ -33,6 +41,7 @@ export const useSocketStore = defineStore('socket', {
         console.log('Connected to WebSocket server')
         this.isConnected = true
         this.joinRidesRoom()
+        this.joinUserRoom()
       })
 
       this.socket.on('disconnect', () => {
@@ -48,24 +57,121 @@ export const useSocketStore = defineStore('socket', {
       // Handle new ride updates
       this.socket.on('new_ride', (rideData) => {
         console.log('New ride received:', rideData)
+        this.trackRidesSeq(rideData.room, rideData.seq)
         this.rideUpdates.push(rideData)
       })
+
+      // Seat and status changes of rides already announced
+      this.socket.on('ride_updated', (update) => {
+        this.trackRidesSeq(update.room, update.seq)
+      })
+
+      // Notification pushes; components listen for them to update their views
+      this.socket.on('notification', (data) => {
+        this.trackUserSeq(data.seq)
+      })
+
+      this.socket.on('notifications_read', (data) => {
+        this.trackUserSeq(data.seq)
+      })
+
+      this.socket.on('joined_user', (data) => {
+        if (data.status !== 'success') {
+          console.error('Cannot join user room:', data.message)
+          return
+        }
+        if (this.userEpoch !== data.epoch) {
+          this.userSeq = null
+        }
+        this.userEpoch = data.epoch
+        this.trackUserSeq(data.seq)
+      })
+
+      this.socket.on('joined_rides', (data) => {
+        if (data.status !== 'success') {
+          console.error('Cannot join ride rooms:', data.message)
+          return
+        }
+        if (this.ridesEpoch !== data.epoch) {
+          this.ridesSeqs = {}
+        }
+        this.ridesEpoch = data.epoch
+        for (const [room, seq] of Object.entries(data.seqs || {})) {
+          this.trackRidesSeq(room, seq)
+        }
+      })
+
+      // Missed events are no longer buffered on the server; views refetch over REST
+      this.socket.on('resync', (data) => {
+        console.log('Resync requested for room:', data.room)
+        if (data.room.startsWith('user_')) {
+          this.userSeq = data.seq
+          this.userEpoch = data.epoch
+        } else if (data.room.startsWith('rides')) {
+          this.ridesSeqs = { ...this.ridesSeqs, [data.room]: data.seq }
+          this.ridesEpoch = data.epoch
+        }
+      })
+    },
+
+    trackRidesSeq(room, seq) {
+      if (!room || typeof seq !== 'number') {
+        return
+      }
+      const current = this.ridesSeqs[room]
+      if (current === undefined || seq > current) {
+        this.ridesSeqs = { ...this.ridesSeqs, [room]: seq }
+      }
+    },
+
+    trackUserSeq(seq) {
+      if (typeof seq === 'number' && (this.userSeq === null || seq > this.userSeq)) {
+        this.userSeq = seq
+      }
+    },
+
+    joinUserRoom() {
+      const userStore = useUserStore()
+      if (this.socket && this.isConnected && userStore.token) {
+        const payload = { token: userStore.token }
+        if (this.userSeq !== null) {
+          payload.since_seq = this.userSeq
+          payload.epoch = this.userEpoch
+        }
+        this.socket.emit('join_user', payload)
+      }
     },
 
     joinRidesRoom() {
       if (this.socket && this.isConnected) {
-        console.log('Joining rides room')
-        this.socket.emit('join_rides')
+        console.log('Joining rides room', this.rideBuckets || 'rides')
+        const payload = {}
+        if (this.rideBuckets) {
+          payload.buckets = this.rideBuckets
+        }
+        if (this.ridesEpoch !== null) {
+          payload.since = this.ridesSeqs
+          payload.epoch = this.ridesEpoch
+        }
+        this.socket.emit('join_rides', payload)
       } else {
         console.warn('Cannot join rides room: socket not connected')
       }
     },
 
+    // Follow only the rides leaving from the given buckets, also after reconnecting
+    joinRideBuckets(buckets) {
+      this.leaveRidesRoom()
+      this.rideBuckets = buckets
+      this.joinRidesRoom()
+    },
+
     leaveRidesRoom() {
       if (this.socket && this.isConnected) {
         console.log('Leaving rides room')
-        this.socket.emit('leave_rides')
+        this.socket.emit('leave_rides', this.rideBuckets ? { buckets: this.rideBuckets } : {})
       }
+      this.rideBuckets = null
     },
 
     disconnect() {